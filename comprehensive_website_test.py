@@ -10,6 +10,17 @@ This script performs complete end-to-end testing of:
 4. API endpoint functionality
 5. Complete user workflows
 
+The database group runs first, since seeding creates the test users; the
+other test groups then run in parallel on a thread pool, each printing its
+output as one block. Each group has its own connection-pooled session, and
+each user role logs in on another. Results can be exported as JUnit XML or
+JSON with per-test timings.
+
+It also has a load-testing mode (--load) that ramps concurrent virtual
+users against the search, documents and dashboard APIs and checks
+latency and error-rate SLOs. It targets http://localhost:3000 unless
+given --base-url, or the built-in stub server with --stub.
+
 Author: Claude AI Assistant
 Date: August 19, 2025
 """
@@ -17,8 +28,20 @@ Date: August 19, 2025
 import requests
 import json
 import time
+import random
+import argparse
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from requests.adapters import HTTPAdapter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+DEFAULT_BASE_URL = "https://risk.johnnycchung.com"
+# Load tests never default to the production site
+LOAD_TEST_BASE_URL = "http://localhost:3000"
 
 @dataclass
 class TestResult:
@@ -27,6 +50,7 @@ class TestResult:
     message: str
     details: Optional[str] = None
     response_time: float = 0.0
+    duration: float = 0.0
 
 @dataclass
 class UserAccount:
@@ -35,19 +59,57 @@ class UserAccount:
     role: str
     name: str
 
+# Test user accounts, created by the seed endpoint
+TEST_USERS = [
+    UserAccount("admin@example.com", "password123", "ADMIN", "System Admin"),
+    UserAccount("manager@example.com", "password123", "MANAGER", "Risk Manager"),
+    UserAccount("user@example.com", "password123", "USER", "John User"),
+    UserAccount("viewer@example.com", "password123", "VIEWER", "Jane Viewer")
+]
+
+def sign_in(session: requests.Session, base_url: str, user: UserAccount,
+            timeout: float = 10) -> Tuple[Optional[requests.Response], Optional[str]]:
+    """Log a session in with the credentials provider; returns the response or an error"""
+    # Get signin page
+    signin_response = session.get(f"{base_url}/auth/signin", timeout=timeout)
+    if signin_response.status_code != 200:
+        return None, f"Signin page unreachable: HTTP {signin_response.status_code}"
+
+    # Extract CSRF token or other auth requirements
+    # Note: This is a simplified version - real implementation would parse the signin form
+
+    # Attempt login via API
+    login_data = {
+        "email": user.email,
+        "password": user.password
+    }
+    auth_response = session.post(
+        f"{base_url}/api/auth/callback/credentials",
+        data=login_data,
+        allow_redirects=False,
+        timeout=timeout
+    )
+
+    # Check if login was successful (redirect or 200)
+    if auth_response.status_code in [200, 302, 307]:
+        return auth_response, None
+    return auth_response, f"HTTP {auth_response.status_code}: {auth_response.text[:200]}"
+
 class RiskDocumentationHubTester:
-    def __init__(self, base_url: str = "https://risk.johnnycchung.com"):
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, workers: int = 8):
         self.base_url = base_url
-        self.session = requests.Session()
+        self.workers = max(1, workers)
+        # Anonymous session outside test groups; each group gets its own
+        self._session = self._pooled_session()
         self.test_results: List[TestResult] = []
+        self._results_lock = threading.Lock()
+        self._local = threading.local()
         
         # Test user accounts
-        self.users = [
-            UserAccount("admin@example.com", "password123", "ADMIN", "System Admin"),
-            UserAccount("manager@example.com", "password123", "MANAGER", "Risk Manager"),
-            UserAccount("user@example.com", "password123", "USER", "John User"),
-            UserAccount("viewer@example.com", "password123", "VIEWER", "Jane Viewer")
-        ]
+        self.users = list(TEST_USERS)
+        
+        # One pooled session per role so logins don't share cookies
+        self.sessions = {user.role: self._pooled_session() for user in self.users}
         
         # Pages to test
         self.protected_pages = [
@@ -67,19 +129,78 @@ class RiskDocumentationHubTester:
             "/api/dashboard/stats"
         ]
 
+    def _pooled_session(self) -> requests.Session:
+        """Session with a connection pool sized for the worker count"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        """The running test group's anonymous session"""
+        return getattr(self._local, 'session', None) or self._session
+
+    def _start_timer(self):
+        self._local.started = time.perf_counter()
+
+    def _run_parallel(self, func, items) -> List:
+        """Run func over items on a thread pool, timing each call"""
+        output = getattr(self._local, 'output', None)
+        session = getattr(self._local, 'session', None)
+
+        def timed(item):
+            # Workers report into the calling group's output and use its session
+            self._local.output = output
+            self._local.session = session
+            self._start_timer()
+            return func(item)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(timed, items))
+
+    def _emit(self, line: str):
+        """Print a line, or hold it for the group running on this thread"""
+        output = getattr(self._local, 'output', None)
+        if output is None:
+            print(line)
+        else:
+            output.append(line)
+
+    def _run_group(self, func):
+        """Run a test group on its own session, then print its output as one block"""
+        self._local.output = []
+        self._local.session = self._pooled_session()
+        self._start_timer()
+        try:
+            return func()
+        finally:
+            self._local.session.close()
+            self._local.session = None
+            output, self._local.output = self._local.output, None
+            with self._results_lock:
+                print("\n".join(output))
+
     def log_result(self, test_name: str, success: bool, message: str, details: str = None, response_time: float = 0.0):
         """Log a test result"""
-        result = TestResult(test_name, success, message, details, response_time)
-        self.test_results.append(result)
+        # Duration runs from the start of the check (or this thread's previous result)
+        now = time.perf_counter()
+        duration = now - getattr(self._local, 'started', now)
+        self._local.started = now
+
+        result = TestResult(test_name, success, message, details, response_time, duration)
         status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status} | {test_name} | {message}")
-        if details and not success:
-            print(f"     Details: {details}")
+        with self._results_lock:
+            self.test_results.append(result)
+            self._emit(f"{status} | {test_name} | {message}")
+            if details and not success:
+                self._emit(f"     Details: {details}")
 
     def test_basic_connectivity(self) -> bool:
         """Test basic website connectivity"""
-        print("\n🌐 TESTING BASIC CONNECTIVITY")
-        print("=" * 50)
+        self._emit("\n🌐 TESTING BASIC CONNECTIVITY")
+        self._emit("=" * 50)
         
         try:
             start_time = time.time()
@@ -102,8 +223,8 @@ class RiskDocumentationHubTester:
 
     def test_database_initialization(self) -> bool:
         """Test database initialization"""
-        print("\n🗄️  TESTING DATABASE INITIALIZATION")
-        print("=" * 50)
+        self._emit("\n🗄️  TESTING DATABASE INITIALIZATION")
+        self._emit("=" * 50)
         
         try:
             # Test database initialization endpoint
@@ -132,36 +253,17 @@ class RiskDocumentationHubTester:
 
     def test_authentication_flow(self, user: UserAccount) -> Tuple[bool, Optional[str]]:
         """Test authentication for a specific user"""
+        session = self.sessions[user.role]
         try:
-            # Get signin page
-            signin_response = self.session.get(f"{self.base_url}/auth/signin")
-            if signin_response.status_code != 200:
-                return False, f"Signin page unreachable: HTTP {signin_response.status_code}"
-            
-            # Extract CSRF token or other auth requirements
-            # Note: This is a simplified version - real implementation would parse the signin form
-            
-            # Attempt login via API
-            login_data = {
-                "email": user.email,
-                "password": user.password
-            }
-            
-            start_time = time.time()
-            auth_response = self.session.post(
-                f"{self.base_url}/api/auth/callback/credentials",
-                data=login_data,
-                allow_redirects=False,
-                timeout=10
-            )
-            response_time = time.time() - start_time
+            auth_response, error_msg = sign_in(session, self.base_url, user)
+            if auth_response is None:
+                return False, error_msg
             
-            # Check if login was successful (redirect or 200)
-            if auth_response.status_code in [200, 302, 307]:
+            response_time = auth_response.elapsed.total_seconds()
+            if error_msg is None:
                 self.log_result(f"Auth - {user.role}", True, f"Login successful for {user.email}", response_time=response_time)
                 return True, None
             else:
-                error_msg = f"HTTP {auth_response.status_code}: {auth_response.text[:200]}"
                 self.log_result(f"Auth - {user.role}", False, f"Login failed for {user.email}", error_msg)
                 return False, error_msg
                 
@@ -172,16 +274,11 @@ class RiskDocumentationHubTester:
 
     def test_all_authentication(self) -> bool:
         """Test authentication for all user types"""
-        print("\n🔐 TESTING AUTHENTICATION FLOWS")
-        print("=" * 50)
+        self._emit("\n🔐 TESTING AUTHENTICATION FLOWS")
+        self._emit("=" * 50)
         
-        all_success = True
-        for user in self.users:
-            success, error = self.test_authentication_flow(user)
-            if not success:
-                all_success = False
-                
-        return all_success
+        outcomes = self._run_parallel(self.test_authentication_flow, self.users)
+        return all(success for success, _ in outcomes)
 
     def test_page_accessibility(self, page: str, expected_auth_required: bool = True) -> bool:
         """Test if a page is accessible"""
@@ -221,25 +318,14 @@ class RiskDocumentationHubTester:
 
     def test_all_pages(self) -> bool:
         """Test all page accessibility"""
-        print("\n📄 TESTING PAGE ACCESSIBILITY")
-        print("=" * 50)
-        
-        all_success = True
+        self._emit("\n📄 TESTING PAGE ACCESSIBILITY")
+        self._emit("=" * 50)
         
-        # Test public pages
+        # Public pages, then protected pages
         public_pages = ["/auth/signin"]
-        for page in public_pages:
-            success = self.test_page_accessibility(page, expected_auth_required=False)
-            if not success:
-                all_success = False
-        
-        # Test protected pages
-        for page in self.protected_pages:
-            success = self.test_page_accessibility(page, expected_auth_required=True)
-            if not success:
-                all_success = False
-                
-        return all_success
+        checks = [(page, False) for page in public_pages] + [(page, True) for page in self.protected_pages]
+        outcomes = self._run_parallel(lambda check: self.test_page_accessibility(*check), checks)
+        return all(outcomes)
 
     def test_api_endpoint(self, endpoint: str) -> bool:
         """Test an API endpoint"""
@@ -268,21 +354,15 @@ class RiskDocumentationHubTester:
 
     def test_all_apis(self) -> bool:
         """Test all API endpoints"""
-        print("\n🔌 TESTING API ENDPOINTS")
-        print("=" * 50)
+        self._emit("\n🔌 TESTING API ENDPOINTS")
+        self._emit("=" * 50)
         
-        all_success = True
-        for endpoint in self.api_endpoints:
-            success = self.test_api_endpoint(endpoint)
-            if not success:
-                all_success = False
-                
-        return all_success
+        return all(self._run_parallel(self.test_api_endpoint, self.api_endpoints))
 
     def test_database_connectivity(self) -> bool:
         """Test database connectivity through various endpoints"""
-        print("\n🔗 TESTING DATABASE CONNECTIVITY")
-        print("=" * 50)
+        self._emit("\n🔗 TESTING DATABASE CONNECTIVITY")
+        self._emit("=" * 50)
         
         # Test endpoints that require database access
         db_test_endpoints = [
@@ -292,6 +372,7 @@ class RiskDocumentationHubTester:
         
         all_success = True
         for endpoint in db_test_endpoints:
+            self._start_timer()
             try:
                 start_time = time.time()
                 response = self.session.post(f"{self.base_url}{endpoint}", timeout=15)
@@ -320,18 +401,28 @@ class RiskDocumentationHubTester:
     def run_comprehensive_test(self) -> Dict:
         """Run the complete test suite"""
         print("🚀 STARTING COMPREHENSIVE WEBSITE TEST SUITE")
-        print("Website: https://risk.johnnycchung.com")
+        print(f"Website: {self.base_url}")
         print("=" * 60)
         
         start_time = time.time()
         
-        # Run all test categories
-        connectivity_ok = self.test_basic_connectivity()
-        db_init_ok = self.test_database_initialization() 
-        db_connectivity_ok = self.test_database_connectivity()
-        auth_ok = self.test_all_authentication()
-        pages_ok = self.test_all_pages()
-        apis_ok = self.test_all_apis()
+        def database_group():
+            # Connectivity checks seed the database, so they run after init
+            init_ok = self.test_database_initialization()
+            return init_ok, self.test_database_connectivity()
+        
+        # Seeding creates the test users, so the database group finishes before logins start
+        db_init_ok, db_connectivity_ok = self._run_group(database_group)
+        
+        # The remaining categories run in parallel; each finishes independently
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            connectivity = pool.submit(self._run_group, self.test_basic_connectivity)
+            auth = pool.submit(self._run_group, self.test_all_authentication)
+            pages = pool.submit(self._run_group, self.test_all_pages)
+            apis = pool.submit(self._run_group, self.test_all_apis)
+            
+            connectivity_ok = connectivity.result()
+            auth_ok, pages_ok, apis_ok = auth.result(), pages.result(), apis.result()
         
         total_time = time.time() - start_time
         
@@ -377,13 +468,294 @@ class RiskDocumentationHubTester:
             'test_results': self.test_results
         }
 
+    def export_json(self, results: Dict, path: str):
+        """Write the suite results, including per-test timings, as JSON"""
+        data = dict(results)
+        data['test_results'] = [asdict(r) for r in results['test_results']]
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    def export_junit(self, results: Dict, path: str):
+        """Write the suite results as JUnit XML for CI dashboards"""
+        suite = ET.Element("testsuite", {
+            "name": "RiskDocumentationHub",
+            "tests": str(results['total_tests']),
+            "failures": str(results['failed_tests']),
+            "time": f"{results['total_time']:.3f}"
+        })
+        for result in results['test_results']:
+            case = ET.SubElement(suite, "testcase", {
+                "classname": result.test_name.split(" - ")[0],
+                "name": result.test_name,
+                "time": f"{result.duration:.3f}"
+            })
+            if not result.success:
+                failure = ET.SubElement(case, "failure", {"message": result.message})
+                failure.text = result.details or ""
+        ET.ElementTree(suite).write(path, encoding="utf-8", xml_declaration=True)
+
+# Latency histogram bucket upper bounds (milliseconds)
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+LOAD_QUERIES = [
+    "Basel III capital requirements",
+    "liquidity coverage ratio",
+    "operational risk incidents",
+    "counterparty credit exposure",
+    "SOX control failures",
+    "market risk VaR limits"
+]
+
+@dataclass
+class EndpointStats:
+    method: str
+    path: str
+    latencies: List[float] = field(default_factory=list)
+    status_counts: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def record(self, latency: float, status: str, is_error: bool):
+        self.latencies.append(latency)
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if is_error:
+            self.errors += 1
+
+    def percentile(self, pct: float) -> float:
+        """Latency percentile in milliseconds (nearest rank)"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[rank] * 1000.0
+
+    def histogram(self) -> Dict[str, int]:
+        buckets = {f"<={bound}ms": 0 for bound in LATENCY_BUCKETS_MS}
+        buckets["+Inf"] = 0
+        for latency in self.latencies:
+            ms = latency * 1000.0
+            for bound in LATENCY_BUCKETS_MS:
+                if ms <= bound:
+                    buckets[f"<={bound}ms"] += 1
+                    break
+            else:
+                buckets["+Inf"] += 1
+        return buckets
+
+class LoadTester:
+    """Ramp concurrent virtual users over the main API endpoints
+
+    Each virtual user logs in as one of the test roles (in turn) before its
+    first request, so 401/403 responses count as errors.
+    """
+
+    def __init__(self, base_url: str, users: int = 10, ramp_up: float = 10.0, duration: float = 30.0,
+                 slo_p95_ms: float = 1000.0, slo_p99_ms: float = 2500.0, slo_error_rate: float = 0.01):
+        self.base_url = base_url.rstrip('/')
+        self.users = users
+        self.ramp_up = ramp_up
+        self.duration = duration
+        self.slo_p95_ms = slo_p95_ms
+        self.slo_p99_ms = slo_p99_ms
+        self.slo_error_rate = slo_error_rate
+
+        self.login = EndpointStats("POST", "/api/auth/callback/credentials")
+        self.endpoints = [
+            EndpointStats("POST", "/api/rag/search"),
+            EndpointStats("GET", "/api/documents"),
+            EndpointStats("GET", "/api/dashboard/stats")
+        ]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _virtual_user(self, user_id: int):
+        """Log in, then loop over the endpoints until the test ends"""
+        session = requests.Session()
+        rng = random.Random(user_id)
+        start_time = time.perf_counter()
+        try:
+            auth_response, error = sign_in(session, self.base_url, TEST_USERS[user_id % len(TEST_USERS)],
+                                           timeout=30)
+            status = str(auth_response.status_code) if auth_response is not None else "SigninUnreachable"
+            is_error = error is not None
+        except requests.exceptions.RequestException as e:
+            status, is_error = type(e).__name__, True
+        with self._lock:
+            self.login.record(time.perf_counter() - start_time, status, is_error)
+
+        while not self._stop.is_set():
+            for stats in self.endpoints:
+                if self._stop.is_set():
+                    break
+                start_time = time.perf_counter()
+                try:
+                    if stats.method == "POST":
+                        response = session.post(f"{self.base_url}{stats.path}",
+                                                json={"query": rng.choice(LOAD_QUERIES)}, timeout=30)
+                    else:
+                        response = session.get(f"{self.base_url}{stats.path}", timeout=30)
+                    status = str(response.status_code)
+                    # Users are logged in, so anything but a success is an error
+                    is_error = response.status_code >= 400
+                except requests.exceptions.RequestException as e:
+                    status, is_error = type(e).__name__, True
+                latency = time.perf_counter() - start_time
+
+                with self._lock:
+                    stats.record(latency, status, is_error)
+        session.close()
+
+    def run(self) -> Dict:
+        """Run the load test and return per-endpoint results"""
+        print("\n🏋️  LOAD TEST")
+        print("=" * 50)
+        print(f"Target: {self.base_url}")
+        print(f"Virtual users: {self.users} (ramp-up {self.ramp_up:.0f}s, duration {self.duration:.0f}s)")
+
+        threads = []
+        start_time = time.time()
+        for user_id in range(self.users):
+            # Start users evenly across the ramp-up window
+            delay = start_time + (self.ramp_up * user_id / self.users) - time.time()
+            if delay > 0 and self._stop.wait(delay):
+                break
+            thread = threading.Thread(target=self._virtual_user, args=(user_id,), daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        remaining = start_time + self.duration - time.time()
+        if remaining > 0:
+            time.sleep(remaining)
+        self._stop.set()
+        for thread in threads:
+            thread.join(timeout=35)
+        elapsed = time.time() - start_time
+
+        return self._report(elapsed)
+
+    def _report(self, elapsed: float) -> Dict:
+        endpoints = []
+        all_pass = True
+        for stats in [self.login] + self.endpoints:
+            requests_made = len(stats.latencies)
+            error_rate = stats.errors / requests_made if requests_made else 1.0
+            p50, p95, p99 = stats.percentile(50), stats.percentile(95), stats.percentile(99)
+            slo_pass = (requests_made > 0 and p95 <= self.slo_p95_ms and p99 <= self.slo_p99_ms
+                        and error_rate <= self.slo_error_rate)
+            all_pass = all_pass and slo_pass
+
+            endpoints.append({
+                'endpoint': f"{stats.method} {stats.path}",
+                'requests': requests_made,
+                'throughput_rps': requests_made / elapsed if elapsed else 0.0,
+                'p50_ms': p50,
+                'p95_ms': p95,
+                'p99_ms': p99,
+                'error_rate': error_rate,
+                'status_counts': stats.status_counts,
+                'histogram': stats.histogram(),
+                'slo_pass': slo_pass
+            })
+
+            status = "✅ PASS" if slo_pass else "❌ FAIL"
+            print(f"{status} | {stats.method} {stats.path} | {requests_made} req, "
+                  f"{requests_made / elapsed if elapsed else 0:.1f} req/s, "
+                  f"p50 {p50:.0f}ms p95 {p95:.0f}ms p99 {p99:.0f}ms, errors {error_rate * 100:.1f}%")
+
+        return {
+            'base_url': self.base_url,
+            'users': self.users,
+            'duration': elapsed,
+            'slo': {'p95_ms': self.slo_p95_ms, 'p99_ms': self.slo_p99_ms, 'error_rate': self.slo_error_rate},
+            'endpoints': endpoints,
+            'slo_pass': all_pass
+        }
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Canned responses for the load-tested endpoints"""
+
+    latency: float = 0.0
+
+    def _reply(self, body: Dict):
+        if self.latency:
+            time.sleep(self.latency)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.startswith('/api/documents'):
+            self._reply({'documents': [], 'total': 0})
+        elif self.path.startswith('/api/dashboard/stats'):
+            self._reply({'totalDocuments': 0, 'highRiskDocuments': 0})
+        else:
+            self._reply({'status': 'ok'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        self._reply({'results': [], 'total': 0, 'alerts': []})
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(latency_ms: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub server on a free local port"""
+    StubHandler.latency = latency_ms / 1000.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
 def main():
     """Main function to run the test suite"""
+    parser = argparse.ArgumentParser(description='Risk Documentation Hub test suite')
+    parser.add_argument('--base-url',
+                        help=f'Site to test (default {DEFAULT_BASE_URL}, or {LOAD_TEST_BASE_URL} with --load)')
+    parser.add_argument('--load', action='store_true', help='Run the concurrent load test instead')
+    parser.add_argument('--users', type=int, default=10, help='Virtual users at full load')
+    parser.add_argument('--ramp-up', type=float, default=10.0, help='Seconds to reach full load')
+    parser.add_argument('--duration', type=float, default=30.0, help='Total load test seconds')
+    parser.add_argument('--slo-p95-ms', type=float, default=1000.0, help='p95 latency SLO per endpoint')
+    parser.add_argument('--slo-p99-ms', type=float, default=2500.0, help='p99 latency SLO per endpoint')
+    parser.add_argument('--slo-error-rate', type=float, default=0.01, help='Max error rate per endpoint')
+    parser.add_argument('--stub', action='store_true', help='Load test a local stub server')
+    parser.add_argument('--stub-latency-ms', type=float, default=0.0, help='Stub response delay')
+    parser.add_argument('--report', type=str, help='Write the load test report as JSON')
+    parser.add_argument('--workers', type=int, default=8, help='Parallel checks per test group')
+    parser.add_argument('--junit', type=str, help='Write suite results as JUnit XML')
+    parser.add_argument('--json', type=str, help='Write suite results as JSON')
+    args = parser.parse_args()
+
+    if args.load:
+        base_url = args.base_url or LOAD_TEST_BASE_URL
+        if args.stub:
+            _, base_url = start_stub_server(args.stub_latency_ms)
+
+        tester = LoadTester(base_url, args.users, args.ramp_up, args.duration,
+                            args.slo_p95_ms, args.slo_p99_ms, args.slo_error_rate)
+        report = tester.run()
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+
+        if report['slo_pass']:
+            print("\n✅ All endpoints met their SLOs.")
+            exit(0)
+        else:
+            print("\n❌ SLO thresholds violated.")
+            exit(1)
+
     print("Risk Documentation Hub - Comprehensive Test Suite")
     print("Starting automated testing...")
     
-    tester = RiskDocumentationHubTester()
+    tester = RiskDocumentationHubTester(args.base_url or DEFAULT_BASE_URL, args.workers)
     results = tester.run_comprehensive_test()
+    if args.junit:
+        tester.export_junit(results, args.junit)
+    if args.json:
+        tester.export_json(results, args.json)
     
     # Exit with appropriate code
     if results['overall_success']:
@@ -20,7 +20,8 @@ interface RAGSearchResult {
 
 interface RAGResponse {
   results: RAGSearchResult[]
-  summary: string
+  summary: string | null  // null when skipped to meet the deadline
+  skipped_stages?: string[]
   alerts: Array<{
     type: string
     severity: string
@@ -29,6 +30,8 @@ interface RAGResponse {
 }
 
 export async function POST(request: NextRequest) {
+  // The deadline covers the whole request, including Python start-up
+  const startedAt = Date.now()
   try {
     // Check authentication
     const session = await getServerSession(authOptions)
@@ -37,14 +40,14 @@ export async function POST(request: NextRequest) {
     }
 
     const body = await request.json()
-    const { query, filters = {}, useRiskAnalysis = true } = body
+    const { query, filters = {}, useRiskAnalysis = true, deadlineMs } = body
 
     if (!query || query.trim().length === 0) {
       return NextResponse.json({ error: 'Query is required' }, { status: 400 })
     }
 
     // Call the Python RAG system
-    const ragResponse = await callPythonRAG(query, filters)
+    const ragResponse = await callPythonRAG(query, filters, deadlineMs, startedAt)
 
     // Process results for frontend
     const processedResults = ragResponse.results.map(result => ({
@@ -72,6 +75,7 @@ export async function POST(request: NextRequest) {
       total: processedResults.length,
       riskSummary: ragResponse.summary,
       alerts: ragResponse.alerts,
+      skippedStages: ragResponse.skipped_stages ?? [],
       searchType: 'banking_risk_rag'
     }
 
@@ -85,23 +89,59 @@ export async function POST(request: NextRequest) {
   }
 }
 
-async function callPythonRAG(query: string, filters: any): Promise<RAGResponse> {
+async function callPythonRAG(
+  query: string,
+  filters: any,
+  deadlineMs?: number,
+  startedAt?: number
+): Promise<RAGResponse> {
   return new Promise((resolve, reject) => {
     const pythonPath = process.env.PYTHON_PATH || 'python3'
     const scriptPath = path.join(process.cwd(), 'src/lib/rag/rag_api.py')
     
-    const pythonProcess = spawn(pythonPath, [
+    const args = [
       scriptPath,
       'search',
       '--query', query,
-      '--filters', JSON.stringify(filters)
-    ])
+      '--filters', JSON.stringify(filters),
+      // Compact header line, then one line per result as it is written
+      '--format', 'jsonl'
+    ]
+    if (typeof deadlineMs === 'number' && deadlineMs > 0) {
+      args.push('--deadline-ms', String(deadlineMs))
+      if (startedAt !== undefined) {
+        args.push('--request-started-ms', String(startedAt))
+      }
+    }
+    
+    const pythonProcess = spawn(pythonPath, args)
 
-    let outputData = ''
+    let header: Omit<RAGResponse, 'results'> | null = null
+    const results: RAGSearchResult[] = []
+    let pending = ''
+    let parseError: unknown = null
     let errorData = ''
 
-    pythonProcess.stdout.on('data', (data) => {
-      outputData += data.toString()
+    const parseLine = (line: string) => {
+      if (!line.trim() || parseError) return
+      try {
+        const value = JSON.parse(line)
+        if (header === null) {
+          header = value
+        } else {
+          results.push(value)
+        }
+      } catch (error) {
+        parseError = error
+      }
+    }
+
+    pythonProcess.stdout.setEncoding('utf8')
+    pythonProcess.stdout.on('data', (chunk: string) => {
+      pending += chunk
+      const lines = pending.split('\n')
+      pending = lines.pop() ?? ''
+      lines.forEach(parseLine)
     })
 
     pythonProcess.stderr.on('data', (data) => {
@@ -115,12 +155,12 @@ async function callPythonRAG(query: string, filters: any): Promise<RAGResponse>
         return
       }
 
-      try {
-        const result = JSON.parse(outputData)
-        resolve(result)
-      } catch (error) {
+      parseLine(pending)
+      if (parseError || header === null) {
         reject(new Error('Failed to parse Python RAG response'))
+        return
       }
+      resolve({ ...(header as Omit<RAGResponse, 'results'>), results })
     })
 
     pythonProcess.on('error', (error) => {
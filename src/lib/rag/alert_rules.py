@@ -0,0 +1,202 @@
+"""
+Declarative alert rules for the Banking Risk RAG system
+Rules are loaded from JSON and compiled into checks over column arrays, so a
+whole corpus is evaluated column-wise instead of document by document.
+"""
+
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 'stored' rules write risk_alerts when a document is processed (or when the
+# corpus is re-evaluated); 'search' rules annotate search responses.
+# Templates may use {title}, {risk_level}, and per kind {tag}, {risk_type},
+# {score} or {count}.
+DEFAULT_RULES = {
+    'stored': [
+        {
+            'name': 'high_risk_level',
+            'kind': 'risk_level',
+            'levels': ['HIGH', 'CRITICAL'],
+            'type': 'RISK_LEVEL',
+            'severity': '{risk_level}',
+            'description': 'Document contains {risk_level} risk indicators'
+        },
+        {
+            'name': 'critical_compliance',
+            'kind': 'compliance_tag',
+            'tags': ['BASEL_III', 'SOX'],
+            'type': 'COMPLIANCE',
+            'severity': 'HIGH',
+            'description': 'Document relates to {tag} compliance'
+        },
+        {
+            'name': 'risk_concentration',
+            'kind': 'score_count',
+            'threshold': 0.7,
+            'min_count': 2,
+            'type': 'RISK_CONCENTRATION',
+            'severity': 'HIGH',
+            'description': 'Multiple high risk scores detected ({count} categories)'
+        }
+    ],
+    'search': [
+        {
+            'name': 'high_risk_level',
+            'kind': 'risk_level',
+            'levels': ['HIGH', 'CRITICAL'],
+            'type': 'RISK_LEVEL',
+            'severity': '{risk_level}',
+            'description': '{title} has {risk_level} risk level'
+        },
+        {
+            'name': 'high_risk_score',
+            'kind': 'score',
+            'threshold': 0.7,
+            'type': 'RISK_SCORE',
+            'severity': 'HIGH',
+            'description': '{title} has high {risk_type} score ({score:.2f})'
+        }
+    ]
+}
+
+RULE_KINDS = ('risk_level', 'compliance_tag', 'score', 'score_count')
+
+
+class AlertColumns:
+    """Risk levels, compliance tags and risk scores of many documents as arrays"""
+
+    def __init__(self, ids: List[str], titles: List[str], risk_levels: List[str],
+                 compliance_tags: List[List[str]], risk_scores: List[Dict[str, float]]):
+        self.ids = ids
+        self.titles = titles
+        self.risk_levels = np.array(risk_levels, dtype=object)
+
+        # Position of each tag in its document's tag list, -1 where absent
+        self.tag_names = list(dict.fromkeys(tag for tags in compliance_tags for tag in tags))
+        tag_index = {tag: i for i, tag in enumerate(self.tag_names)}
+        self.tag_positions = np.full((len(ids), len(self.tag_names)), -1, dtype=np.int32)
+        for row, tags in enumerate(compliance_tags):
+            for position, tag in enumerate(tags):
+                self.tag_positions[row, tag_index[tag]] = position
+
+        # NaN where a document has no score of that type; positions as for tags
+        self.score_names = list(dict.fromkeys(name for scores in risk_scores for name in scores))
+        score_index = {name: i for i, name in enumerate(self.score_names)}
+        self.scores = np.full((len(ids), len(self.score_names)), np.nan)
+        self.score_positions = np.full(self.scores.shape, -1, dtype=np.int32)
+        for row, scores in enumerate(risk_scores):
+            for position, (name, value) in enumerate(scores.items()):
+                self.scores[row, score_index[name]] = value
+                self.score_positions[row, score_index[name]] = position
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_documents(cls, documents: List) -> 'AlertColumns':
+        return cls(
+            [doc.id for doc in documents],
+            [doc.title for doc in documents],
+            [doc.risk_level.value for doc in documents],
+            [[ct.value for ct in doc.compliance_tags] for doc in documents],
+            [doc.risk_scores for doc in documents]
+        )
+
+
+class AlertRule:
+    """One rule from the config, checked against every row of AlertColumns at once"""
+
+    def __init__(self, spec: Dict):
+        if spec.get('kind') not in RULE_KINDS:
+            raise ValueError(f"Unknown alert rule kind in {spec.get('name', spec)!r}: {spec.get('kind')!r}")
+        self.name = spec.get('name', spec['type'])
+        self.kind = spec['kind']
+        self.type = spec['type']
+        self.severity = spec['severity']
+        self.description = spec['description']
+        self.levels = list(spec.get('levels', []))
+        self.tags = set(spec.get('tags', []))
+        self.score_types = spec.get('scores')  # None checks every score
+        self.threshold = float(spec.get('threshold', 0.7))
+        self.min_count = int(spec.get('min_count', 1))
+
+    def evaluate(self, columns: AlertColumns) -> List[Tuple[int, int, Dict]]:
+        """(row, order within the row, alert) for every alert the rule raises"""
+        if self.kind == 'risk_level':
+            rows = np.flatnonzero(np.isin(columns.risk_levels, self.levels))
+            return [(row, 0, self._alert(columns, row)) for row in rows]
+
+        if self.kind == 'compliance_tag':
+            cols = [i for i, tag in enumerate(columns.tag_names) if tag in self.tags]
+            positions = columns.tag_positions[:, cols]
+            rows, hits = np.nonzero(positions >= 0)
+            return [
+                (row, positions[row, hit], self._alert(columns, row, tag=columns.tag_names[cols[hit]]))
+                for row, hit in zip(rows, hits)
+            ]
+
+        cols = [i for i, name in enumerate(columns.score_names)
+                if self.score_types is None or name in self.score_types]
+        # NaN (missing) compares False
+        above = columns.scores[:, cols] > self.threshold
+
+        if self.kind == 'score':
+            rows, hits = np.nonzero(above)
+            return [
+                (row, columns.score_positions[row, cols[hit]],
+                 self._alert(columns, row, risk_type=columns.score_names[cols[hit]],
+                             score=columns.scores[row, cols[hit]]))
+                for row, hit in zip(rows, hits)
+            ]
+
+        counts = above.sum(axis=1)
+        rows = np.flatnonzero(counts >= self.min_count)
+        return [(row, 0, self._alert(columns, row, count=int(counts[row]))) for row in rows]
+
+    def _alert(self, columns: AlertColumns, row: int, **fields) -> Dict:
+        fields.update(title=columns.titles[row], risk_level=columns.risk_levels[row])
+        return {
+            'type': self.type,
+            'severity': self.severity.format(**fields),
+            'description': self.description.format(**fields)
+        }
+
+
+class AlertRuleSet:
+    """Ordered rules; alerts come out by document, then rule, then tag or score order"""
+
+    def __init__(self, specs: List[Dict]):
+        self.rules = [AlertRule(spec) for spec in specs]
+
+    def evaluate(self, columns: AlertColumns) -> List[Tuple[int, Dict]]:
+        """(row, alert) pairs for every alert raised over the columns"""
+        raised = []
+        for index, rule in enumerate(self.rules):
+            raised.extend((int(row), index, int(order), alert)
+                          for row, order, alert in rule.evaluate(columns))
+        raised.sort(key=lambda item: item[:3])
+        return [(row, alert) for row, _, _, alert in raised]
+
+    def evaluate_documents(self, documents: List) -> List[Dict]:
+        if not documents:
+            return []
+        return [alert for _, alert in self.evaluate(AlertColumns.from_documents(documents))]
+
+
+class AlertRules:
+    """The stored and search rule sets from one config"""
+
+    def __init__(self, config: Optional[Dict] = None):
+        config = config if config is not None else DEFAULT_RULES
+        self.stored = AlertRuleSet(config.get('stored', []))
+        self.search = AlertRuleSet(config.get('search', []))
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> 'AlertRules':
+        """Rules from a JSON file, or the defaults without a path"""
+        if not path:
+            return cls()
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
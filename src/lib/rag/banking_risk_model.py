@@ -0,0 +1,1594 @@
+"""
+Banking Risk-Specific Language Model Implementation
+A lightweight, locally-hosted model for risk document analysis
+"""
+
+import torch
+import torch.nn as nn
+import numpy as np
+from typing import List, Dict, Tuple, Optional, Iterator
+import sqlite3
+import faiss
+import pickle
+import os
+import re
+import hashlib
+import itertools
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from transformers import AutoTokenizer, AutoModel
+
+from keyword_index import InvertedBM25Index, FTS5KeywordIndex
+from metrics import MetricsRegistry
+from dedup import MinHasher, LSHIndex
+from deadline import Deadline
+from content_codec import ContentCodec, PREVIEW_CHARS, decompress, preview
+from alert_rules import AlertColumns, AlertRules
+from time_partitions import TimePartitions, DateRange, parse_date_range, window_bounds, window_key
+import profiling
+
+# Corpus generations are unique across instances, so a reloaded collection
+# never reuses the generation of its evicted predecessor
+_generations = itertools.count(1)
+
+# Banking Risk Enums
+class RiskLevel(Enum):
+    LOW = "LOW"
+    MEDIUM = "MEDIUM"
+    HIGH = "HIGH"
+    CRITICAL = "CRITICAL"
+
+class ComplianceFramework(Enum):
+    BASEL_III = "BASEL_III"
+    DODD_FRANK = "DODD_FRANK"
+    SOX = "SOX"
+    GDPR = "GDPR"
+    AML_KYC = "AML_KYC"
+    MIFID_II = "MIFID_II"
+
+@dataclass
+class RiskDocument:
+    id: str
+    title: str
+    content: str
+    risk_level: RiskLevel
+    compliance_tags: List[ComplianceFramework]
+    risk_scores: Dict[str, float]
+    embedding: Optional[np.ndarray] = None
+    reused_from: Optional[str] = None  # document whose model outputs were reused
+
+class BankingRiskVocabulary:
+    """Specialized vocabulary for banking risk domain"""
+    
+    def __init__(self):
+        self.risk_terms = {
+            # Credit Risk
+            "credit_risk": ["default", "pd", "lgd", "ead", "creditworthiness", "counterparty"],
+            "market_risk": ["var", "volatility", "exposure", "trading", "portfolio"],
+            "operational_risk": ["fraud", "system failure", "human error", "process breakdown"],
+            "liquidity_risk": ["cash flow", "funding", "lcr", "nsfr", "liquidity coverage"],
+            
+            # Regulatory Terms
+            "basel": ["tier 1", "tier 2", "capital adequacy", "rwa", "leverage ratio"],
+            "compliance": ["audit", "control", "governance", "regulatory", "framework"],
+            
+            # Risk Indicators
+            "severity": ["critical", "high", "medium", "low", "negligible", "material"],
+            "probability": ["likely", "unlikely", "certain", "possible", "remote"],
+            
+            # Actions
+            "mitigation": ["mitigate", "control", "reduce", "transfer", "accept", "avoid"]
+        }
+        
+        self.regex_patterns = self._compile_patterns()
+    
+    def _compile_patterns(self):
+        patterns = {}
+        for category, terms in self.risk_terms.items():
+            pattern = r'\b(' + '|'.join(terms) + r')\b'
+            patterns[category] = re.compile(pattern, re.IGNORECASE)
+        return patterns
+    
+    def extract_risk_features(self, text: str) -> Dict[str, List[str]]:
+        """Extract banking risk features from text"""
+        features = {}
+        for category, pattern in self.regex_patterns.items():
+            matches = pattern.findall(text)
+            if matches:
+                features[category] = list(set(matches))
+        return features
+
+class BankingRiskEncoder(nn.Module):
+    """Lightweight encoder for banking risk documents"""
+    
+    def __init__(self, vocab_size=10000, hidden_dim=256, num_layers=6):
+        super().__init__()
+        
+        # Smaller transformer for efficiency
+        self.embedding = nn.Embedding(vocab_size, hidden_dim)
+        self.position_embedding = nn.Embedding(512, hidden_dim)
+        
+        # Transformer layers
+        encoder_layer = nn.TransformerEncoderLayer(
+            d_model=hidden_dim,
+            nhead=8,
+            dim_feedforward=1024,
+            dropout=0.1,
+            batch_first=True
+        )
+        self.transformer = nn.TransformerEncoder(encoder_layer, num_layers=num_layers)
+        
+        # Task-specific heads
+        self.risk_classifier = nn.Sequential(
+            nn.Linear(hidden_dim, 128),
+            nn.ReLU(),
+            nn.Dropout(0.1),
+            nn.Linear(128, 4)  # 4 risk levels
+        )
+        
+        self.compliance_detector = nn.Sequential(
+            nn.Linear(hidden_dim, 128),
+            nn.ReLU(),
+            nn.Dropout(0.1),
+            nn.Linear(128, len(ComplianceFramework))
+        )
+        
+        self.embedding_projector = nn.Linear(hidden_dim, 384)
+        
+        # Position ids sliced per call instead of rebuilt; not saved in state dicts
+        self.register_buffer("position_ids", torch.arange(512).unsqueeze(0), persistent=False)
+    
+    def forward(self, input_ids, attention_mask=None, task="embed"):
+        # Embeddings
+        embeddings = self._embed(input_ids)
+        
+        # Transformer encoding (padding positions are True in the key mask;
+        # attention_mask itself stays 0/1 for pooling)
+        padding_mask = attention_mask == 0 if attention_mask is not None else None
+        
+        encoded = self.transformer(embeddings, src_key_padding_mask=padding_mask)
+        pooled = self._mean_pool(encoded, attention_mask)
+        
+        # Task-specific outputs
+        if task == "risk_level":
+            return self.risk_classifier(pooled)
+        elif task == "compliance":
+            return self.compliance_detector(pooled)
+        elif task == "embed":
+            return self.embedding_projector(pooled)
+        else:
+            return pooled
+    
+    def encode_query(self, input_ids, attention_mask=None, num_layers=None, exit_threshold=None):
+        """Query embeddings, computing only the layers asked for and the projection head
+        
+        num_layers truncates the encoder; with exit_threshold, encoding stops after
+        the first layer whose pooled output has at least that cosine similarity to
+        the previous layer's for every row. With neither, this matches
+        forward(task="embed").
+        """
+        padding_mask = attention_mask == 0 if attention_mask is not None else None
+        hidden = self._embed(input_ids)
+        pooled = None
+        
+        for layer in self.transformer.layers[:num_layers]:
+            hidden = layer(hidden, src_key_padding_mask=padding_mask)
+            if exit_threshold is not None:
+                current = self._mean_pool(hidden, attention_mask)
+                converged = pooled is not None and bool(
+                    (nn.functional.cosine_similarity(current, pooled) >= exit_threshold).all()
+                )
+                pooled = current
+                if converged:
+                    break
+        
+        if self.transformer.norm is not None:
+            hidden = self.transformer.norm(hidden)
+            pooled = None
+        if pooled is None:
+            pooled = self._mean_pool(hidden, attention_mask)
+        return self.embedding_projector(pooled)
+    
+    def _embed(self, input_ids):
+        # Models pickled before the position_ids buffer existed build it once here
+        if "position_ids" not in self._buffers:
+            self.register_buffer("position_ids", torch.arange(512).unsqueeze(0), persistent=False)
+        position_ids = self.position_ids[:, :input_ids.size(1)]
+        return self.embedding(input_ids) + self.position_embedding(position_ids)
+    
+    @staticmethod
+    def _mean_pool(encoded, attention_mask=None):
+        """Mean over the sequence, ignoring padded positions"""
+        if attention_mask is None:
+            return encoded.mean(dim=1)
+        mask_expanded = attention_mask.unsqueeze(-1).expand(encoded.size()).float()
+        sum_embeddings = torch.sum(encoded * mask_expanded, 1)
+        sum_mask = torch.clamp(mask_expanded.sum(1), min=1e-9)
+        return sum_embeddings / sum_mask
+
+class BankingRiskRAG:
+    """Complete RAG system for banking risk documents"""
+    
+    # Columns read back into a RiskDocument by _document_from_row; content is
+    # compressed in content_compressed except in rows written before compression
+    DOCUMENT_COLUMNS = (
+        "id, title, content, content_compressed, risk_level, compliance_tags, risk_scores, embedding"
+    )
+    # Same shape, but only the stored preview and no embedding: nothing to decompress
+    PREVIEW_COLUMNS = (
+        f"id, title, COALESCE(preview, substr(content, 1, {PREVIEW_CHARS})), NULL, "
+        "risk_level, compliance_tags, risk_scores, NULL"
+    )
+    
+    # Highest tf-idf terms of a document used as the keyword query by similar()
+    SIMILAR_TERMS = 25
+    
+    def __init__(self, model_path: Optional[str] = None, keyword_backend: str = "memory",
+                 db_path: str = "banking_risk_docs.db", near_duplicate_threshold: float = 0.9,
+                 model: Optional[nn.Module] = None, content_codec: str = "zlib",
+                 search_threads: int = 3, intra_op_threads: Optional[int] = None,
+                 alert_rules: Optional[AlertRules] = None, query_layers: Optional[int] = None,
+                 query_exit_threshold: Optional[float] = None, partition_window: Optional[str] = None,
+                 hot_partitions: int = 2, search_pool: Optional[ThreadPoolExecutor] = None):
+        # Initialize vocabulary
+        self.vocab = BankingRiskVocabulary()
+        self.alert_rules = alert_rules or AlertRules()
+        
+        # Initialize model (collections pass in one shared encoder)
+        self.model = model if model is not None else self.load_model(model_path)
+        self.model_path = model_path
+        # Queries may stop early in the encoder (all layers by default)
+        self.query_layers = query_layers
+        self.query_exit_threshold = query_exit_threshold
+        
+        # Initialize vector store
+        self.dimension = 384
+        self.index = faiss.IndexFlatL2(self.dimension)
+        self.document_store = {}
+        self.doc_positions = {}  # document id -> latest embedding_id
+        self.generation = next(_generations)  # changes whenever indexed content does
+        
+        # Initialize SQLite for metadata; callers that share this object
+        # across threads (the ingestion workers) serialise access themselves
+        self.db_path = db_path
+        self.codec = ContentCodec(content_codec)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_database()
+        
+        # BM25 keyword index: in-memory postings lists, or FTS5 in the same database
+        if keyword_backend == "memory":
+            self.keyword_index = InvertedBM25Index(self._simple_tokenize)
+        elif keyword_backend == "fts5":
+            self.keyword_index = FTS5KeywordIndex(self.conn, self._simple_tokenize,
+                                                  source=self._stored_text)
+        else:
+            raise ValueError(f"Unknown keyword backend: {keyword_backend}")
+        
+        # With a partition window, the indexes above only hold the hot (most
+        # recent) windows; older ones are frozen next to the database
+        self.partitions = None
+        self._hot_start = None  # created_at from which documents are in the hot tier
+        if partition_window:
+            if keyword_backend != "memory":
+                raise ValueError("Time partitioning requires the memory keyword backend")
+            self.partitions = TimePartitions(
+                os.path.splitext(db_path)[0] + "_partitions", partition_window, hot_partitions
+            )
+            self._hot_start = self.partitions.hot_start()
+            self._sync_background()
+        
+        # Near-duplicate detection (LSH buckets are loaded from the database on first use)
+        self.minhasher = MinHasher()
+        self.lsh = None
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.dedup_stats = {"exact": 0, "near": 0, "unchanged": 0, "inferred": 0}
+        
+        # Query analysis, semantic and keyword retrieval run side by side on a
+        # bounded pool; torch and FAISS release the GIL. Capping their intra-op
+        # threads keeps the branches from oversubscribing the cores, but the
+        # cap is process-wide (ingestion and encoding too), so it is opt-in.
+        # A pool passed in (e.g. by collections) is shared and left open on close.
+        self.search_pool = search_pool
+        self._owns_search_pool = False
+        if search_pool is None and search_threads > 1:
+            self.search_pool = ThreadPoolExecutor(search_threads, thread_name_prefix="rag-search")
+            self._owns_search_pool = True
+        if intra_op_threads:
+            torch.set_num_threads(intra_op_threads)
+            faiss.omp_set_num_threads(intra_op_threads)
+        
+        # Stage latency histograms and corpus gauges
+        self.metrics = MetricsRegistry()
+        self.metrics.gauge("documents", "Documents in the vector index", lambda: self.index.ntotal)
+        self.metrics.gauge("index_info", "Active vector and keyword index types", lambda: {
+            (("vector_index", type(self.index).__name__),
+             ("keyword_index", type(self.keyword_index).__name__)): 1
+        })
+        self.metrics.gauge("dedup_total", "Processed documents by deduplication outcome", lambda: {
+            (("outcome", outcome),): count for outcome, count in self.dedup_stats.items()
+        })
+        if self.partitions is not None:
+            self.metrics.gauge("partitions", "Time partitions by tier", lambda: {
+                (("tier", "hot"),): self.partitions.hot_windows,
+                (("tier", "cold"),): len(self.partitions.cold)
+            })
+            self.metrics.gauge("partitions_open", "Cold partitions currently memory-mapped",
+                               lambda: self.partitions.open_count())
+    
+    @staticmethod
+    def load_model(model_path: Optional[str] = None) -> nn.Module:
+        """Load a trained encoder, or a freshly initialised one without a path"""
+        model = torch.load(model_path) if model_path else BankingRiskEncoder()
+        model.eval()
+        return model
+    
+    def _init_database(self):
+        """Initialize SQLite schema"""
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS documents (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                risk_level TEXT NOT NULL,
+                compliance_tags TEXT,
+                risk_scores TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                embedding_id INTEGER
+            )
+        ''')
+        
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS risk_alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                document_id TEXT,
+                alert_type TEXT,
+                severity TEXT,
+                description TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (document_id) REFERENCES documents(id)
+            )
+        ''')
+        
+        # Columns added after the original schema
+        self._ensure_column("documents", "content_hash", "TEXT")
+        self._ensure_column("documents", "minhash", "BLOB")
+        self._ensure_column("documents", "embedding", "BLOB")
+        self._ensure_column("documents", "content_compressed", "BLOB")
+        self._ensure_column("documents", "preview", "TEXT")
+        self._ensure_column("documents", "reused_from", "TEXT")
+        self._ensure_column("documents", "updated_at", "TIMESTAMP")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash)"
+        )
+        # Date-range searches and partition freezing select by creation time
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents(created_at)"
+        )
+        
+        self.conn.commit()
+    
+    def _ensure_column(self, table: str, column: str, declaration: str):
+        """Add a column to an existing table if it is missing"""
+        columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+    
+    def process_document(self, doc_id: str, title: str, content: str) -> RiskDocument:
+        """Process a document and extract risk information
+        
+        Unchanged re-submissions return the stored document, and exact or
+        near-duplicate content reuses the stored model outputs instead of
+        running inference again.
+        """
+        return self.process_documents([(doc_id, title, content)])[0]
+    
+    def process_documents(self, documents: List[Tuple[str, str, str]],
+                          batch_size: int = 16) -> List[RiskDocument]:
+        """Process (doc_id, title, content) tuples with batched inference and one commit"""
+        results: List[Optional[RiskDocument]] = [None] * len(documents)
+        pending = []
+        
+        for position, (doc_id, title, content) in enumerate(documents):
+            content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            
+            # Unchanged re-submission: nothing to do
+            stored = self._get_unchanged(doc_id, title, content, content_hash)
+            if stored is not None:
+                results[position] = stored
+                continue
+            
+            # Tokenize for model (simplified - in production use proper tokenizer)
+            tokens = self._simple_tokenize(content)
+            signature = self.minhasher.signature(tokens)
+            pending.append({
+                'position': position,
+                'doc_id': doc_id,
+                'title': title,
+                'content': content,
+                'content_hash': content_hash,
+                'tokens': tokens[:512],  # all the encoder reads; frees the full list early
+                'signature': signature,
+                'source': self._find_duplicate(doc_id, content_hash, signature)
+            })
+        
+        # One batched encoder pass for everything without a reusable duplicate
+        to_infer = [p for p in pending if p['source'] is None]
+        inferred = self._infer_batch([p['tokens'] for p in to_infer], batch_size)
+        for item, output in zip(to_infer, inferred):
+            item['output'] = output
+        self.dedup_stats["inferred"] += len(to_infer)
+        
+        for item in pending:
+            source = item['source']
+            if source is not None:
+                risk_level, compliance_tags, embedding = (
+                    source.risk_level, source.compliance_tags, source.embedding
+                )
+            else:
+                risk_level, compliance_tags, embedding = item['output']
+            doc_id, title, content = item['doc_id'], item['title'], item['content']
+            
+            # Extract risk features using vocabulary and calculate risk scores
+            risk_features = self.vocab.extract_risk_features(content)
+            risk_scores = self._calculate_risk_scores(content, risk_features)
+            
+            # Create document object
+            doc = RiskDocument(
+                id=doc_id,
+                title=title,
+                content=content,
+                risk_level=risk_level,
+                compliance_tags=compliance_tags,
+                risk_scores=risk_scores,
+                embedding=embedding,
+                reused_from=source.id if source is not None else None
+            )
+            
+            # Store in systems and check for alerts, committed together below
+            self._store_document(doc, item['content_hash'], item['signature'], commit=False)
+            self._check_risk_alerts(doc, commit=False)
+            results[item['position']] = doc
+        
+        self.conn.commit()
+        return results
+    
+    def _get_unchanged(self, doc_id: str, title: str, content: str,
+                       content_hash: str) -> Optional[RiskDocument]:
+        """Stored document if this exact title and content were already processed"""
+        row = self.conn.execute(
+            "SELECT title, content_hash FROM documents WHERE id = ?", (doc_id,)
+        ).fetchone()
+        if not row or row != (title, content_hash):
+            return None
+        
+        stored = self._get_document(doc_id)
+        stored.reused_from = doc_id
+        self.dedup_stats["unchanged"] += 1
+        
+        # Stored by another process: index it here without inference
+        if doc_id not in self.doc_positions and stored.embedding is not None:
+            self._add_to_vector_index(stored)
+        if doc_id not in self.keyword_index:
+            self.keyword_index.add(doc_id, title, content)
+            self.conn.commit()
+        return stored
+    
+    def _infer(self, tokens: List[str]) -> Tuple[RiskLevel, List[ComplianceFramework], np.ndarray]:
+        """Run the encoder for risk level, compliance tags and embedding"""
+        return self._infer_batch([tokens])[0]
+    
+    def _infer_batch(self, token_lists: List[List[str]], batch_size: int = 16,
+                     model: Optional[nn.Module] = None
+                     ) -> List[Tuple[RiskLevel, List[ComplianceFramework], np.ndarray]]:
+        """Encode padded batches once and apply all three heads to the pooled output"""
+        model = model or self.model
+        outputs = []
+        levels = list(RiskLevel)
+        frameworks = list(ComplianceFramework)
+        
+        for start in range(0, len(token_lists), batch_size):
+            batch = [self._tokens_to_ids(tokens[:512]) for tokens in token_lists[start:start + batch_size]]
+            max_len = max(1, max(len(ids) for ids in batch))
+            input_ids = torch.zeros((len(batch), max_len), dtype=torch.long)
+            attention_mask = torch.zeros((len(batch), max_len), dtype=torch.long)
+            for row, ids in enumerate(batch):
+                input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+                attention_mask[row, :len(ids)] = 1
+            
+            # No mask needed when nothing is padded
+            if bool(attention_mask.all()):
+                attention_mask = None
+            
+            with torch.no_grad():
+                pooled = model(input_ids, attention_mask, task="pooled")
+                risk_logits = model.risk_classifier(pooled)
+                compliance_probs = torch.sigmoid(model.compliance_detector(pooled))
+                embeddings = model.embedding_projector(pooled).numpy()
+            
+            for row in range(len(batch)):
+                risk_level = levels[risk_logits[row].argmax().item()]
+                compliance_tags = [
+                    frameworks[i] for i, prob in enumerate(compliance_probs[row]) if prob > 0.5
+                ]
+                outputs.append((risk_level, compliance_tags, embeddings[row]))
+        
+        return outputs
+    
+    def _find_duplicate(self, doc_id: str, content_hash: str,
+                        signature: np.ndarray) -> Optional[RiskDocument]:
+        """Encoded document with identical or near-identical content, if any
+        
+        Only documents whose outputs came from the encoder are sources, so
+        reused values never chain. A document's own previous version is only
+        reused for identical content; an edit is compared against other encoded
+        documents and re-encoded once it drifts below the threshold.
+        """
+        row = self.conn.execute(
+            "SELECT id FROM documents WHERE content_hash = ? AND embedding IS NOT NULL "
+            "AND reused_from IS NULL LIMIT 1",
+            (content_hash,)
+        ).fetchone()
+        if row:
+            self.dedup_stats["exact"] += 1
+            return self._get_document(row[0])
+        
+        match = self._get_lsh().query(signature, self.near_duplicate_threshold, exclude=doc_id)
+        if match:
+            doc = self._get_document(match[0])
+            if doc is not None and doc.embedding is not None:
+                self.dedup_stats["near"] += 1
+                return doc
+        
+        return None
+    
+    def _get_lsh(self) -> LSHIndex:
+        """LSH index over encoded documents' MinHash signatures, loaded on first use"""
+        if self.lsh is None:
+            self.lsh = LSHIndex(self.minhasher.num_perm)
+            for doc_id, blob in self.conn.execute(
+                "SELECT id, minhash FROM documents WHERE minhash IS NOT NULL AND reused_from IS NULL"
+            ):
+                self.lsh.add(doc_id, np.frombuffer(blob, dtype=np.uint64))
+        return self.lsh
+    
+    @staticmethod
+    def _calculate_risk_scores(content: str, features: Dict) -> Dict[str, float]:
+        """Calculate detailed risk scores"""
+        scores = {
+            "credit_risk": 0.0,
+            "market_risk": 0.0,
+            "operational_risk": 0.0,
+            "liquidity_risk": 0.0,
+            "compliance_risk": 0.0
+        }
+        
+        # Simple scoring based on feature presence and patterns
+        content_lower = content.lower()
+        
+        # Credit risk indicators
+        credit_indicators = ["default", "pd", "lgd", "credit exposure", "counterparty"]
+        scores["credit_risk"] = sum(1 for ind in credit_indicators if ind in content_lower) / len(credit_indicators)
+        
+        # Market risk indicators
+        market_indicators = ["var", "volatility", "trading loss", "market exposure"]
+        scores["market_risk"] = sum(1 for ind in market_indicators if ind in content_lower) / len(market_indicators)
+        
+        # Add severity multipliers
+        if "critical" in content_lower or "severe" in content_lower:
+            scores = {k: min(v * 1.5, 1.0) for k, v in scores.items()}
+        
+        return scores
+    
+    def _store_document(self, doc: RiskDocument, content_hash: Optional[str] = None,
+                        signature: Optional[np.ndarray] = None, commit: bool = True):
+        """Store document in database and vector index"""
+        # Add to vector index
+        embedding_id = self._add_to_vector_index(doc)
+        
+        # Outputs reused from the document's own identical content are still encoder outputs
+        reused_from = doc.reused_from if doc.reused_from != doc.id else None
+        
+        # Update BM25 index while the row still holds the indexed text (FTS5
+        # deletes read it back); FTS5 writes join the transaction below
+        self.keyword_index.add(doc.id, doc.title, doc.content)
+        
+        # Store in SQLite; an update keeps the document's original created_at
+        self.conn.execute('''
+            INSERT INTO documents 
+            (id, title, content, content_compressed, preview, risk_level, compliance_tags,
+             risk_scores, embedding_id, content_hash, minhash, embedding, reused_from, updated_at)
+            VALUES (?, ?, '', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now'))
+            ON CONFLICT(id) DO UPDATE SET
+                title = excluded.title, content = excluded.content,
+                content_compressed = excluded.content_compressed, preview = excluded.preview,
+                risk_level = excluded.risk_level, compliance_tags = excluded.compliance_tags,
+                risk_scores = excluded.risk_scores, embedding_id = excluded.embedding_id,
+                content_hash = excluded.content_hash, minhash = excluded.minhash,
+                embedding = excluded.embedding, reused_from = excluded.reused_from,
+                updated_at = excluded.updated_at
+        ''', (
+            doc.id,
+            doc.title,
+            self.codec.compress(doc.content),
+            preview(doc.content),
+            doc.risk_level.value,
+            ','.join([ct.value for ct in doc.compliance_tags]),
+            pickle.dumps(doc.risk_scores),
+            embedding_id,
+            content_hash,
+            signature.tobytes() if signature is not None else None,
+            np.asarray(doc.embedding, dtype=np.float32).tobytes(),
+            reused_from
+        ))
+        if commit:
+            self.conn.commit()
+        
+        # Only encoded documents are offered as near-duplicate sources
+        if signature is not None and reused_from is None:
+            self._get_lsh().add(doc.id, signature)
+        elif self.lsh is not None:
+            self.lsh.remove(doc.id)
+    
+    def _add_to_vector_index(self, doc: RiskDocument) -> int:
+        """Append the document's embedding to FAISS and return its position"""
+        embedding_id = len(self.document_store)
+        self.generation = next(_generations)
+        self.index.add(np.array([doc.embedding]))
+        self.document_store[embedding_id] = doc
+        self.doc_positions[doc.id] = embedding_id
+        return embedding_id
+    
+    def remove_documents(self, doc_ids: List[str]) -> int:
+        """Delete documents, their alerts and index entries; returns how many were stored
+        
+        FAISS positions are never reused, so a removed document's vector stays
+        behind as a tombstone that semantic search skips.
+        """
+        removed = 0
+        for doc_id in doc_ids:
+            # Before the row goes, since FTS5 deletes read its text; they join the transaction below
+            self.keyword_index.remove(doc_id)
+            removed += self.conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,)).rowcount
+            self.conn.execute("DELETE FROM risk_alerts WHERE document_id = ?", (doc_id,))
+            self.doc_positions.pop(doc_id, None)
+            if self.lsh is not None:
+                self.lsh.remove(doc_id)
+        self.conn.commit()
+        
+        if removed:
+            self.generation = next(_generations)
+        return removed
+    
+    def _add_many_to_vector_index(self, docs: List[RiskDocument], embeddings: np.ndarray) -> List[int]:
+        """Append many embeddings to FAISS in one call; returns their positions"""
+        start = len(self.document_store)
+        self.generation = next(_generations)
+        self.index.add(np.ascontiguousarray(embeddings, dtype=np.float32))
+        for offset, doc in enumerate(docs):
+            self.document_store[start + offset] = doc
+            self.doc_positions[doc.id] = start + offset
+        return list(range(start, start + len(docs)))
+    
+    def _truncate_vector_index(self, start: int, previous: Dict[str, Optional[int]]):
+        """Drop the vectors from position start on, e.g. when their rows were rolled back
+        
+        previous maps the ids of the dropped documents to the positions they
+        had before (None if they were not indexed).
+        """
+        self.index.remove_ids(np.arange(start, self.index.ntotal, dtype=np.int64))
+        for position in range(start, len(self.document_store)):
+            del self.document_store[position]
+        for doc_id, position in previous.items():
+            if position is None:
+                self.doc_positions.pop(doc_id, None)
+            else:
+                self.doc_positions[doc_id] = position
+        self.generation = next(_generations)
+    
+    def load_from_database(self, page_size: int = 1000) -> int:
+        """Index stored documents in this process without running inference
+        
+        Uses the embeddings saved with each document; returns how many were added.
+        With time partitions, stale cold windows are frozen first and only the
+        hot windows are loaded.
+        """
+        if self.partitions is not None:
+            self.freeze_partitions(page_size=page_size)
+        return self._load_stored(page_size)
+    
+    def _load_stored(self, page_size: int) -> int:
+        """Index stored rows with embeddings, from the hot start on if there is one"""
+        hot, params = "", ()
+        if self._hot_start is not None:
+            # Undated rows stay hot
+            hot, params = "AND (created_at >= ? OR created_at IS NULL)", (self._hot_start,)
+        loaded = 0
+        last_id = ''
+        while True:
+            rows = self.conn.execute(f'''
+                SELECT {self.DOCUMENT_COLUMNS} FROM documents
+                WHERE id > ? AND embedding IS NOT NULL {hot} ORDER BY id LIMIT ?
+            ''', (last_id, *params, page_size)).fetchall()
+            if not rows:
+                break
+            
+            for row in rows:
+                doc = self._document_from_row(row)
+                if doc.id not in self.doc_positions:
+                    self._add_to_vector_index(doc)
+                    loaded += 1
+                if doc.id not in self.keyword_index:
+                    self.keyword_index.add(doc.id, doc.title, doc.content)
+            last_id = rows[-1][0]
+        
+        self.conn.commit()
+        return loaded
+    
+    def freeze_partitions(self, rebuild: bool = False, page_size: int = 1000) -> Dict:
+        """Freeze each window older than the hot ones whose documents have changed
+        
+        Windows are compared by document count and latest update, since a
+        re-processed document keeps its created_at and so its window; rebuild
+        refreezes every window, e.g. after a model swap or an import. The hot tier is reloaded when the windows
+        have rolled over since it was loaded.
+        """
+        if self.partitions is None:
+            raise ValueError("Time partitioning is not enabled")
+        hot_start = self.partitions.hot_start()
+        
+        counts, updated = {}, {}
+        for month, count, last_update in self.conn.execute('''
+            SELECT substr(created_at, 1, 7), COUNT(*), MAX(updated_at) FROM documents
+            WHERE created_at < ? AND embedding IS NOT NULL GROUP BY 1
+        ''', (hot_start,)):
+            key = window_key(month, self.partitions.window)
+            counts[key] = counts.get(key, 0) + count
+            updated[key] = max(filter(None, (updated.get(key), last_update)), default=None)
+        
+        dropped = [key for key in list(self.partitions.cold) if key not in counts]
+        for key in dropped:
+            self.partitions.drop(key)
+        frozen = []
+        for key, count in sorted(counts.items()):
+            partition = self.partitions.cold.get(key)
+            if (rebuild or partition is None or partition.count != count
+                    or partition.meta.get('updated_at') != updated[key]):
+                self._freeze_window(key, page_size, updated[key])
+                frozen.append(key)
+        
+        reloaded = None
+        if rebuild or hot_start != self._hot_start:
+            self._hot_start = hot_start
+            if rebuild or self.document_store:
+                reloaded = self._reload_hot_tier(page_size)
+        if frozen or dropped:
+            self._sync_background()
+        
+        return {'hot_start': hot_start, 'frozen': frozen, 'dropped': dropped, 'hot_reloaded': reloaded}
+    
+    def _freeze_window(self, key: str, page_size: int, updated_at: Optional[str] = None):
+        """Write one window's stored embeddings and token counts as a cold partition"""
+        start, end = window_bounds(key, self.partitions.window)
+        ids, dates, embeddings, counts = [], [], [], []
+        cursor = self.conn.execute('''
+            SELECT id, created_at, content, content_compressed, embedding FROM documents
+            WHERE created_at >= ? AND created_at < ? AND embedding IS NOT NULL
+            ORDER BY created_at, id
+        ''', (start, end))
+        while True:
+            rows = cursor.fetchmany(page_size)
+            if not rows:
+                break
+            for doc_id, created_at, content, compressed, embedding in rows:
+                doc_counts = {}
+                for token in self._simple_tokenize(self._row_content(content, compressed)):
+                    doc_counts[token] = doc_counts.get(token, 0) + 1
+                ids.append(doc_id)
+                dates.append(str(created_at))
+                embeddings.append(np.frombuffer(embedding, dtype=np.float32))
+                counts.append(doc_counts)
+        
+        self.partitions.freeze(key, ids, dates, np.stack(embeddings), counts, updated_at)
+    
+    def _reload_hot_tier(self, page_size: int) -> int:
+        """Rebuild the in-memory indexes from the documents of the hot windows"""
+        self.index = faiss.IndexFlatL2(self.dimension)
+        self.document_store = {}
+        self.doc_positions = {}
+        self.keyword_index = InvertedBM25Index(self._simple_tokenize)
+        self._sync_background()
+        self.generation = next(_generations)
+        return self._load_stored(page_size)
+    
+    def _sync_background(self):
+        """Count the cold partitions in the hot keyword index's BM25 statistics"""
+        self.keyword_index.set_background(*self.partitions.background())
+    
+    def describe_partitions(self) -> List[Dict]:
+        """Hot windows (newest first) and the frozen cold windows"""
+        if self.partitions is None:
+            return []
+        hot = []
+        for key in self.partitions.hot_keys():
+            start, end = window_bounds(key, self.partitions.window)
+            documents = self.conn.execute(
+                "SELECT COUNT(*) FROM documents WHERE created_at >= ? AND created_at < ?", (start, end)
+            ).fetchone()[0]
+            hot.append({'window': key, 'tier': 'hot', 'documents': documents})
+        return hot + self.partitions.describe()[::-1]
+    
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the in-memory indexes and document store"""
+        vector_bytes = self.dimension * 4
+        size = self.index.ntotal * vector_bytes
+        if hasattr(self.keyword_index, 'memory_usage'):
+            size += self.keyword_index.memory_usage()
+        for doc in self.document_store.values():
+            size += len(doc.title) + len(doc.content) + vector_bytes
+        return size
+    
+    def compress_stored_content(self, batch_size: int = 500) -> int:
+        """Compress rows stored before content compression; returns rows rewritten"""
+        rewritten = 0
+        while True:
+            rows = self.conn.execute('''
+                SELECT id, content FROM documents
+                WHERE content_compressed IS NULL LIMIT ?
+            ''', (batch_size,)).fetchall()
+            if not rows:
+                break
+            self.conn.executemany('''
+                UPDATE documents SET content = '', content_compressed = ?, preview = ? WHERE id = ?
+            ''', [(self.codec.compress(content), preview(content), doc_id) for doc_id, content in rows])
+            self.conn.commit()
+            rewritten += len(rows)
+        return rewritten
+    
+    def close(self):
+        if self._owns_search_pool:
+            self.search_pool.shutdown(wait=True)
+        self.conn.close()
+    
+    def build_shadow(self, model: nn.Module, model_path: Optional[str] = None,
+                     batch_size: int = 32, page_size: int = 256) -> Dict:
+        """Re-embed every stored document with model into an unpublished index
+        
+        Reads through its own connection and never touches the live index,
+        so it can run on a background thread while searches continue.
+        """
+        shadow = {
+            'model': model,
+            'model_path': model_path,
+            'index': faiss.IndexFlatL2(self.dimension),
+            'document_store': {},
+            'doc_positions': {},
+            'versions': {}  # document id -> (title, content_hash) it was embedded from
+        }
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            last_id = ''
+            while True:
+                rows = conn.execute('''
+                    SELECT id, title, content, content_compressed, risk_scores, content_hash
+                    FROM documents WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last_id, page_size)).fetchall()
+                if not rows:
+                    break
+                self._add_to_shadow(shadow, rows, batch_size)
+                last_id = rows[-1][0]
+        finally:
+            conn.close()
+        
+        return shadow
+    
+    def _add_to_shadow(self, shadow: Dict, rows: List[Tuple], batch_size: int):
+        rows = [
+            (doc_id, title, self._row_content(content, compressed), risk_scores, content_hash)
+            for doc_id, title, content, compressed, risk_scores, content_hash in rows
+        ]
+        outputs = self._infer_batch(
+            [self._simple_tokenize(row[2]) for row in rows], batch_size, shadow['model']
+        )
+        shadow['index'].add(np.array([embedding for _, _, embedding in outputs], dtype=np.float32))
+        
+        for (doc_id, title, content, risk_scores, content_hash), (risk_level, compliance_tags, embedding) \
+                in zip(rows, outputs):
+            position = len(shadow['document_store'])
+            shadow['document_store'][position] = RiskDocument(
+                id=doc_id,
+                title=title,
+                content=content,
+                risk_level=risk_level,
+                compliance_tags=compliance_tags,
+                risk_scores=pickle.loads(risk_scores) if risk_scores else {},
+                embedding=embedding
+            )
+            shadow['doc_positions'][doc_id] = position
+            shadow['versions'][doc_id] = (title, content_hash)
+    
+    def swap_model(self, shadow: Dict, batch_size: int = 32) -> Dict:
+        """Publish a shadow index and its model in one step
+        
+        Documents stored while the shadow was built are embedded with the new
+        model first. Callers serialise this with searches and ingestion.
+        """
+        stale = [
+            doc_id for doc_id, title, content_hash in
+            self.conn.execute("SELECT id, title, content_hash FROM documents")
+            if shadow['versions'].get(doc_id) != (title, content_hash)
+        ]
+        for start in range(0, len(stale), batch_size):
+            chunk = stale[start:start + batch_size]
+            rows = self.conn.execute(f'''
+                SELECT id, title, content, content_compressed, risk_scores, content_hash
+                FROM documents WHERE id IN ({','.join('?' * len(chunk))})
+            ''', chunk).fetchall()
+            self._add_to_shadow(shadow, rows, batch_size)
+        
+        self.model = shadow['model']
+        self.model_path = shadow['model_path']
+        self.index = shadow['index']
+        self.generation = next(_generations)
+        self.document_store = shadow['document_store']
+        self.doc_positions = shadow['doc_positions']
+        
+        # Persist the new model outputs so dedup reuse and reloads agree with them
+        updates = []
+        for doc_id, position in self.doc_positions.items():
+            doc = self.document_store[position]
+            updates.append((
+                doc.risk_level.value,
+                ','.join(ct.value for ct in doc.compliance_tags),
+                np.asarray(doc.embedding, dtype=np.float32).tobytes(),
+                position,
+                doc_id
+            ))
+            if doc_id not in self.keyword_index:
+                self.keyword_index.add(doc_id, doc.title, doc.content)
+        self.conn.executemany('''
+            UPDATE documents SET risk_level = ?, compliance_tags = ?, embedding = ?, embedding_id = ?
+            WHERE id = ?
+        ''', updates)
+        self.conn.commit()
+        
+        # Cold partitions hold the old model's embeddings
+        if self.partitions is not None:
+            self.freeze_partitions(rebuild=True)
+        
+        return {'documents': len(self.doc_positions), 'caught_up': len(stale)}
+    
+    def _check_risk_alerts(self, doc: RiskDocument, commit: bool = True):
+        """Store the alerts the configured rules raise for a document"""
+        for alert in self.alert_rules.stored.evaluate_documents([doc]):
+            self.conn.execute('''
+                INSERT INTO risk_alerts (document_id, alert_type, severity, description)
+                VALUES (?, ?, ?, ?)
+            ''', (doc.id, alert['type'], alert['severity'], alert['description']))
+        if commit:
+            self.conn.commit()
+    
+    def refresh_risk_scores(self, scores: Dict[str, Dict[str, float]]):
+        """Apply rewritten stored risk scores to the indexed documents
+        
+        Bumps the generation, so cursors over results with the old scores expire.
+        """
+        for doc_id, doc_scores in scores.items():
+            position = self.doc_positions.get(doc_id)
+            if position is not None:
+                self.document_store[position].risk_scores = doc_scores
+        self.generation = next(_generations)
+    
+    def reevaluate_alerts(self, page_size: int = 5000) -> Dict:
+        """Rebuild risk_alerts for the whole corpus under the current rules
+        
+        Runs over stored risk levels, tags and scores a page at a time, with no
+        inference, and replaces the table in a single transaction.
+        """
+        by_type = {}
+        documents = 0
+        last_id = ''
+        try:
+            self.conn.execute("DELETE FROM risk_alerts")
+            while True:
+                rows = self.conn.execute('''
+                    SELECT id, title, risk_level, compliance_tags, risk_scores FROM documents
+                    WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last_id, page_size)).fetchall()
+                if not rows:
+                    break
+                
+                columns = AlertColumns(
+                    [row[0] for row in rows],
+                    [row[1] for row in rows],
+                    [row[2] for row in rows],
+                    [[ct for ct in (row[3] or '').split(',') if ct] for row in rows],
+                    [pickle.loads(row[4]) if row[4] else {} for row in rows]
+                )
+                alerts = self.alert_rules.stored.evaluate(columns)
+                self.conn.executemany('''
+                    INSERT INTO risk_alerts (document_id, alert_type, severity, description)
+                    VALUES (?, ?, ?, ?)
+                ''', [(columns.ids[row], a['type'], a['severity'], a['description']) for row, a in alerts])
+                
+                for _, alert in alerts:
+                    by_type[alert['type']] = by_type.get(alert['type'], 0) + 1
+                documents += len(rows)
+                last_id = rows[-1][0]
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        
+        return {'documents': documents, 'alerts': sum(by_type.values()), 'by_type': by_type}
+    
+    def search(self, query: str, filters: Optional[Dict] = None, top_k: int = 10,
+               timings: Optional[Dict[str, float]] = None,
+               deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Hybrid search with risk-aware ranking
+
+        If timings is given, per-stage durations in milliseconds are added to it.
+        With a deadline, candidate depth, keyword search and fusion are given up
+        in that order when they no longer fit, and recorded in deadline.skipped.
+        Result documents carry the stored preview as their content; fetch a
+        document by id for the full text.
+        """
+        deadline = deadline or Deadline(None, self.metrics)
+        scope = self._search_scope(filters)
+        
+        # Fusion reads twice the requested results unless time is short
+        depth = top_k * 2
+        if not deadline.allows("embedding", "faiss_search", "keyword_search", "fusion"):
+            depth = top_k
+            deadline.skip("candidate_depth")
+        
+        # Keyword search runs alongside semantic search while time allows
+        if deadline.allows("keyword_search", "fusion"):
+            keyword_branch = partial(self._timed, "keyword_search", timings,
+                                     self._keyword_search, query, depth, scope)
+        else:
+            keyword_branch = list
+            deadline.skip("keyword_search")
+        
+        # Risk context, semantic and keyword retrieval are independent
+        with self.metrics.timer("retrieval", timings):
+            risk_context, semantic_results, keyword_results = self._run_branches(
+                partial(self._timed, "query_analysis", timings, self._analyze_query_risk_context, query),
+                partial(self._semantic_branch, query, depth, timings, scope),
+                keyword_branch
+            )
+        
+        # Combine results with risk-aware fusion, or fall back to semantic ranking
+        if deadline.allows("fusion"):
+            with self.metrics.timer("fusion", timings):
+                final_results = self._risk_aware_fusion(
+                    semantic_results, 
+                    keyword_results, 
+                    risk_context,
+                    filters
+                )
+        else:
+            deadline.skip("fusion")
+            final_results = self._semantic_only(semantic_results, filters)
+        
+        return final_results[:top_k]
+    
+    def search_many(self, queries: List[str], filters: Optional[Dict] = None,
+                    top_k: int = 10, batch_size: int = 64) -> Iterator[List[Dict]]:
+        """Hybrid search for many queries, yielding each query's results in order
+        
+        Each batch of queries is embedded in one padded forward pass, searched
+        in FAISS as one matrix and BM25-scored together; fusion then runs per
+        query, and its results are yielded as soon as they are ready.
+        """
+        depth = top_k * 2
+        scope = self._search_scope(filters)
+        for start in range(0, len(queries), batch_size):
+            batch = queries[start:start + batch_size]
+            with self.metrics.timer("batch_embedding"):
+                embeddings = self._get_query_embeddings(batch)
+            with self.metrics.timer("batch_faiss_search"):
+                semantic = self._semantic_search_many(embeddings, depth, scope)
+            with self.metrics.timer("batch_keyword_search"):
+                keyword = self._keyword_search_many(batch, depth, scope)
+            
+            for query, semantic_results, keyword_results in zip(batch, semantic, keyword):
+                with self.metrics.timer("fusion"):
+                    results = self._risk_aware_fusion(
+                        semantic_results,
+                        keyword_results,
+                        self._analyze_query_risk_context(query),
+                        filters
+                    )
+                yield results[:top_k]
+    
+    def similar(self, doc_id: str, filters: Optional[Dict] = None, top_k: int = 10) -> List[Dict]:
+        """Documents like a stored one, without running the encoder
+        
+        The vector comes from the FAISS index (or the stored embedding), the
+        keyword query from the document's highest tf-idf terms, and risk
+        boosting from its own risk scores. The source document is excluded.
+        """
+        position = self.doc_positions.get(doc_id)
+        if position is not None:
+            doc = self.document_store[position]
+            embedding = self.index.reconstruct(position)
+        else:
+            doc = self._get_document(doc_id)
+            if doc is None or doc.embedding is None:
+                raise ValueError(f"Unknown document: {doc_id}")
+            embedding = doc.embedding
+        
+        # One extra candidate per branch makes room for the source document
+        depth = top_k * 2 + 1
+        scope = self._search_scope(filters)
+        with self.metrics.timer("faiss_search"):
+            semantic_results = [
+                (other_id, dist) for other_id, dist in self._semantic_search(embedding, depth, scope)
+                if other_id != doc_id
+            ]
+        with self.metrics.timer("keyword_search"):
+            terms = self._similar_terms(doc_id)
+            keyword_results = [
+                (other_id, score) for other_id, score in self._keyword_top_k(terms, depth, scope)
+                if other_id != doc_id
+            ]
+        
+        risk_context = {
+            'risk_focus': [
+                risk_type for risk_type in ('credit', 'market', 'operational', 'liquidity')
+                if doc.risk_scores.get(f"{risk_type}_risk", 0) > 0.5
+            ],
+            'compliance_focus': [],
+            'urgency': 'normal'
+        }
+        with self.metrics.timer("fusion"):
+            results = self._risk_aware_fusion(semantic_results, keyword_results, risk_context, filters)
+        return results[:top_k]
+    
+    def _similar_terms(self, doc_id: str) -> List[str]:
+        """A document's highest tf-idf terms, from the keyword index's stored counts"""
+        counts = self.keyword_index.doc_terms(doc_id)
+        if not counts:
+            # Not in this process's keyword index: count the stored text instead
+            doc = self._get_document(doc_id)
+            for token in self._simple_tokenize(doc.content if doc else ''):
+                counts[token] = counts.get(token, 0) + 1
+        
+        weights = {term: tf * self.keyword_index.idf(term) for term, tf in counts.items()}
+        return sorted(weights, key=weights.get, reverse=True)[:self.SIMILAR_TERMS]
+    
+    def _run_branches(self, *branches):
+        """Call each branch, concurrently when a search pool is configured
+        
+        Branches run inline under a profiler, which only sees its own thread.
+        """
+        if self.search_pool is None or profiling.active():
+            return [branch() for branch in branches]
+        futures = [self.search_pool.submit(branch) for branch in branches]
+        return [future.result() for future in futures]
+    
+    def _timed(self, stage: str, timings: Optional[Dict[str, float]], func, *args):
+        with self.metrics.timer(stage, timings):
+            return func(*args)
+    
+    def _semantic_branch(self, query: str, depth: int, timings: Optional[Dict[str, float]],
+                         scope: Optional[Tuple] = None) -> List[Tuple[str, float]]:
+        with self.metrics.timer("embedding", timings):
+            query_embedding = self._get_query_embedding(query)
+        with self.metrics.timer("faiss_search", timings):
+            return self._semantic_search(query_embedding, depth, scope)
+    
+    def _semantic_only(self, semantic_results: List[Tuple[str, float]],
+                       filters: Optional[Dict]) -> List[Dict]:
+        """Semantic hits in distance order with filters applied, without risk boosting"""
+        results = []
+        for i, (doc_id, _) in enumerate(semantic_results):
+            doc = self._get_document(doc_id, preview_only=True)
+            if doc:
+                score = 0.6 * (1 / (i + 1)) * self._filter_penalty(doc, filters)
+                results.append({'document': doc, 'score': score, 'risk_relevance': False})
+        return sorted(results, key=lambda x: x['score'], reverse=True)
+    
+    @staticmethod
+    def _filter_penalty(doc: RiskDocument, filters: Optional[Dict]) -> float:
+        """Score multiplier demoting a document for each filter it does not match"""
+        penalty = 1.0
+        if filters:
+            if filters.get('risk_level') and doc.risk_level.value != filters['risk_level']:
+                penalty *= 0.1
+            if filters.get('compliance') and not any(
+                ct.value == filters['compliance'] for ct in doc.compliance_tags
+            ):
+                penalty *= 0.1
+        return penalty
+    
+    def _analyze_query_risk_context(self, query: str) -> Dict:
+        """Extract risk context from search query"""
+        context = {
+            'risk_focus': [],
+            'compliance_focus': [],
+            'urgency': 'normal'
+        }
+        
+        query_lower = query.lower()
+        
+        # Check for risk types
+        risk_keywords = {
+            'credit': ['credit', 'default', 'counterparty'],
+            'market': ['market', 'trading', 'volatility'],
+            'operational': ['operational', 'fraud', 'process'],
+            'liquidity': ['liquidity', 'funding', 'cash']
+        }
+        
+        for risk_type, keywords in risk_keywords.items():
+            if any(kw in query_lower for kw in keywords):
+                context['risk_focus'].append(risk_type)
+        
+        # Check urgency
+        if any(word in query_lower for word in ['urgent', 'critical', 'immediate', 'asap']):
+            context['urgency'] = 'high'
+        
+        return context
+    
+    def _risk_aware_fusion(self, semantic_results, keyword_results, risk_context, filters):
+        """Combine search results with risk-aware ranking"""
+        scores = {}
+        
+        # Base scoring
+        for i, (doc_id, score) in enumerate(semantic_results):
+            scores[doc_id] = {
+                'base_score': 0.6 * (1 / (i + 1)),
+                'risk_boost': 0,
+                'doc': self._get_document(doc_id, preview_only=True)
+            }
+        
+        for i, (doc_id, score) in enumerate(keyword_results):
+            if doc_id in scores:
+                scores[doc_id]['base_score'] += 0.4 * (1 / (i + 1))
+            else:
+                scores[doc_id] = {
+                    'base_score': 0.4 * (1 / (i + 1)),
+                    'risk_boost': 0,
+                    'doc': self._get_document(doc_id, preview_only=True)
+                }
+        
+        # Apply risk context boosting
+        for doc_id, score_data in scores.items():
+            doc = score_data['doc']
+            if not doc:
+                continue
+            
+            # Boost based on risk focus match
+            for risk_type in risk_context['risk_focus']:
+                if doc.risk_scores.get(f"{risk_type}_risk", 0) > 0.5:
+                    score_data['risk_boost'] += 0.2
+            
+            # Boost for high urgency and high risk
+            if risk_context['urgency'] == 'high' and doc.risk_level in [RiskLevel.HIGH, RiskLevel.CRITICAL]:
+                score_data['risk_boost'] += 0.3
+            
+            # Apply filters
+            score_data['base_score'] *= self._filter_penalty(doc, filters)
+        
+        # Calculate final scores and sort
+        final_results = []
+        for doc_id, score_data in scores.items():
+            if score_data['doc']:
+                final_score = score_data['base_score'] + score_data['risk_boost']
+                final_results.append({
+                    'document': score_data['doc'],
+                    'score': final_score,
+                    'risk_relevance': score_data['risk_boost'] > 0
+                })
+        
+        return sorted(final_results, key=lambda x: x['score'], reverse=True)
+    
+    def generate_risk_summary(self, documents: List[RiskDocument]) -> str:
+        """Generate a risk-aware summary of search results"""
+        if not documents:
+            return "No relevant risk documents found."
+        
+        # Analyze overall risk profile
+        risk_levels = [doc.risk_level for doc in documents]
+        high_risk_count = sum(1 for rl in risk_levels if rl in [RiskLevel.HIGH, RiskLevel.CRITICAL])
+        
+        # Count compliance frameworks
+        all_compliance = []
+        for doc in documents:
+            all_compliance.extend(doc.compliance_tags)
+        compliance_summary = {}
+        for cf in all_compliance:
+            compliance_summary[cf.value] = compliance_summary.get(cf.value, 0) + 1
+        
+        # Generate summary
+        summary = f"Risk Analysis Summary ({len(documents)} documents):\n\n"
+        
+        if high_risk_count > 0:
+            summary += f"⚠️  HIGH RISK ALERT: {high_risk_count} documents contain high/critical risks\n\n"
+        
+        summary += "Risk Distribution:\n"
+        for level in RiskLevel:
+            count = sum(1 for rl in risk_levels if rl == level)
+            if count > 0:
+                summary += f"  • {level.value}: {count} documents\n"
+        
+        if compliance_summary:
+            summary += "\nCompliance Coverage:\n"
+            for framework, count in sorted(compliance_summary.items(), key=lambda x: x[1], reverse=True):
+                summary += f"  • {framework}: {count} documents\n"
+        
+        summary += "\nTop Risk Documents:\n"
+        for i, doc in enumerate(documents[:3]):
+            summary += f"{i+1}. {doc.title} (Risk: {doc.risk_level.value})\n"
+            
+            # Add key risk indicators
+            high_risks = [k for k, v in doc.risk_scores.items() if v > 0.6]
+            if high_risks:
+                summary += f"   Key Risks: {', '.join(high_risks)}\n"
+        
+        return summary
+    
+    # Utility methods
+    def _simple_tokenize(self, text: str) -> List[str]:
+        """Simple tokenization for demo - use proper tokenizer in production"""
+        return re.findall(r'\b\w+\b', text.lower())
+    
+    def _tokens_to_ids(self, tokens: List[str]) -> List[int]:
+        """Convert tokens to IDs - simplified for demo"""
+        # In production, use proper vocabulary mapping
+        return [hash(token) % 10000 for token in tokens]
+    
+    def _get_query_embedding(self, query: str) -> np.ndarray:
+        """Get embedding for search query"""
+        tokens = self._simple_tokenize(query)
+        input_ids = torch.tensor([self._tokens_to_ids(tokens[:512])])
+        
+        # A single query is never padded, so no mask is built
+        with torch.inference_mode():
+            embedding = self.model.encode_query(input_ids, None, self.query_layers,
+                                                self.query_exit_threshold).numpy()[0]
+        
+        return embedding
+    
+    def _get_query_embeddings(self, queries: List[str]) -> List[Optional[np.ndarray]]:
+        """Embeddings for several queries from one padded forward pass
+        
+        Queries without any tokens get None.
+        """
+        token_ids = [self._tokens_to_ids(self._simple_tokenize(query)[:512]) for query in queries]
+        rows = [row for row, ids in enumerate(token_ids) if ids]
+        embeddings = [None] * len(queries)
+        if not rows:
+            return embeddings
+        
+        max_len = max(len(token_ids[row]) for row in rows)
+        input_ids = torch.zeros((len(rows), max_len), dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), max_len), dtype=torch.long)
+        for i, row in enumerate(rows):
+            ids = token_ids[row]
+            input_ids[i, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[i, :len(ids)] = 1
+        
+        # No mask needed when nothing is padded
+        if bool(attention_mask.all()):
+            attention_mask = None
+        
+        with torch.inference_mode():
+            encoded = self.model.encode_query(input_ids, attention_mask, self.query_layers,
+                                              self.query_exit_threshold).numpy()
+        
+        for i, row in enumerate(rows):
+            embeddings[row] = encoded[i]
+        return embeddings
+    
+    def _search_scope(self, filters: Optional[Dict]) -> Optional[Tuple[DateRange, Optional[List[str]]]]:
+        """The filters' date range and the hot-tier documents inside it
+        
+        None without a date range; the document list is None when the range
+        covers the whole hot tier.
+        """
+        date_range = parse_date_range(filters)
+        if date_range is None:
+            return None
+        
+        start, end = date_range
+        if self._hot_start is not None and (start is None or start <= self._hot_start):
+            if end is None:
+                return date_range, None
+            start = self._hot_start
+        clauses, params = [], []
+        if start:
+            clauses.append("created_at >= ?")
+            params.append(start)
+        if end:
+            clauses.append("created_at < ?")
+            params.append(end)
+        rows = self.conn.execute(f"SELECT id FROM documents WHERE {' AND '.join(clauses)}", params)
+        return date_range, [doc_id for (doc_id,) in rows if doc_id in self.doc_positions]
+    
+    def _with_cold(self, hot: List[Tuple[str, float]], cold: List[Tuple[str, float]], k: int,
+                   descending: bool = False) -> List[Tuple[str, float]]:
+        """Hot and cold hits merged by score, leaving out cold copies of re-processed documents"""
+        merged = hot + [hit for hit in cold if hit[0] not in self.doc_positions]
+        merged.sort(key=lambda hit: hit[1], reverse=descending)
+        return merged[:k]
+    
+    def _semantic_search_many(self, query_embeddings: List[Optional[np.ndarray]], k: int,
+                              scope: Optional[Tuple] = None) -> List[List[Tuple[str, float]]]:
+        """Semantic search for several queries with one FAISS call
+        
+        With a date range in scope, FAISS only considers the hot documents
+        inside it, and only the cold partitions overlapping it are searched.
+        """
+        results = [[] for _ in query_embeddings]
+        rows = [row for row, embedding in enumerate(query_embeddings) if embedding is not None]
+        if not rows:
+            return results
+        
+        queries = np.stack([query_embeddings[row] for row in rows])
+        date_range, hot_ids = scope or (None, None)
+        if hot_ids is None or hot_ids:
+            params = None
+            if hot_ids is not None:
+                selector = faiss.IDSelectorBatch(
+                    np.array([self.doc_positions[doc_id] for doc_id in hot_ids], dtype=np.int64)
+                )
+                params = faiss.SearchParameters(sel=selector)
+            distances, indices = self.index.search(queries, k, params=params)
+            for i, row in enumerate(rows):
+                for idx, dist in zip(indices[i], distances[i]):
+                    # FAISS pads with -1 when the index holds fewer than k vectors
+                    if not 0 <= idx < len(self.document_store):
+                        continue
+                    # Skip vectors of removed documents and superseded versions
+                    doc_id = self.document_store[idx].id
+                    if self.doc_positions.get(doc_id) == idx:
+                        results[row].append((doc_id, float(dist)))
+        
+        if self.partitions is not None:
+            cold = self.partitions.search(queries, k, date_range)
+            for i, row in enumerate(rows):
+                results[row] = self._with_cold(results[row], cold[i], k)
+        
+        return results
+    
+    def _semantic_search(self, query_embedding: np.ndarray, k: int,
+                         scope: Optional[Tuple] = None) -> List[Tuple[str, float]]:
+        """Perform semantic search"""
+        return self._semantic_search_many([query_embedding], k, scope)[0]
+    
+    def _keyword_search(self, query: str, k: int, scope: Optional[Tuple] = None) -> List[Tuple[str, float]]:
+        """Perform BM25 keyword search"""
+        return self._keyword_top_k(self._simple_tokenize(query), k, scope)
+    
+    def _keyword_top_k(self, tokens: List[str], k: int,
+                       scope: Optional[Tuple] = None) -> List[Tuple[str, float]]:
+        date_range, hot_ids = scope or (None, None)
+        results = []
+        if hot_ids is None or hot_ids:
+            results = self.keyword_index.top_k(tokens, k, doc_ids=hot_ids)
+        if self.partitions is not None:
+            cold = self.partitions.top_k_many([tokens], k, date_range, self.keyword_index.idf,
+                                              self.keyword_index.average_length())[0]
+            results = self._with_cold(results, cold, k, descending=True)
+        return results
+    
+    def _keyword_search_many(self, queries: List[str], k: int,
+                             scope: Optional[Tuple] = None) -> List[List[Tuple[str, float]]]:
+        date_range, hot_ids = scope or (None, None)
+        results = [[] for _ in queries]
+        if hot_ids is None or hot_ids:
+            results = self.keyword_index.search_many(queries, k, doc_ids=hot_ids)
+        if self.partitions is not None:
+            cold = self.partitions.top_k_many([self._simple_tokenize(query) for query in queries], k,
+                                              date_range, self.keyword_index.idf,
+                                              self.keyword_index.average_length())
+            results = [self._with_cold(hot, hits, k, descending=True) for hot, hits in zip(results, cold)]
+        return results
+    
+    def _get_document(self, doc_id: str, preview_only: bool = False) -> Optional[RiskDocument]:
+        """Retrieve document by ID
+        
+        With preview_only, content is the stored preview and the embedding is
+        not loaded, which is all search results need.
+        """
+        columns = self.PREVIEW_COLUMNS if preview_only else self.DOCUMENT_COLUMNS
+        cursor = self.conn.execute(
+            f"SELECT {columns} FROM documents WHERE id = ?", (doc_id,)
+        )
+        row = cursor.fetchone()
+        
+        if row:
+            return self._document_from_row(row)
+        
+        return None
+    
+    @classmethod
+    def _document_from_row(cls, row: Tuple) -> RiskDocument:
+        return RiskDocument(
+            id=row[0],
+            title=row[1],
+            content=cls._row_content(row[2], row[3]),
+            risk_level=RiskLevel(row[4]),
+            compliance_tags=[ComplianceFramework(ct) for ct in row[5].split(',') if ct],
+            risk_scores=pickle.loads(row[6]) if row[6] else {},
+            embedding=np.frombuffer(row[7], dtype=np.float32).copy() if row[7] else None
+        )
+    
+    def _stored_text(self, doc_id: str) -> Optional[Tuple[str, str]]:
+        """Stored title and content of a document, for FTS5 deletes"""
+        row = self.conn.execute(
+            "SELECT title, content, content_compressed FROM documents WHERE id = ?", (doc_id,)
+        ).fetchone()
+        return (row[0], self._row_content(row[1], row[2])) if row else None
+    
+    @staticmethod
+    def _row_content(content: str, compressed: Optional[bytes]) -> str:
+        return decompress(compressed) if compressed else content
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    # Initialize the system
+    rag = BankingRiskRAG()
+    
+    # Process some sample documents
+    sample_docs = [
+        {
+            "id": "doc001",
+            "title": "Credit Risk Policy Q4 2024",
+            "content": """This document outlines critical updates to our credit risk management framework. 
+            Due to increased default rates in the commercial lending portfolio, we are implementing 
+            stricter counterparty risk assessment procedures. The new Basel III requirements mandate 
+            a minimum Tier 1 capital ratio of 6%, which requires immediate attention."""
+        },
+        {
+            "id": "doc002",
+            "title": "Operational Risk Incident Report",
+            "content": """A significant operational risk event occurred due to system failure in the 
+            trading platform. This resulted in potential market risk exposure of $2.5M. 
+            Immediate mitigation steps have been taken to prevent similar incidents. 
+            SOX compliance requires full documentation of control failures."""
+        },
+        {
+            "id": "doc003",
+            "title": "Liquidity Coverage Ratio Analysis",
+            "content": """Monthly LCR analysis shows adequate liquidity buffers with a ratio of 125%. 
+            However, stress testing indicates potential liquidity risk under severe market conditions. 
+            NSFR compliance is maintained at 110%. Recommend maintaining higher cash reserves."""
+        }
+    ]
+    
+    # Process documents
+    for doc in sample_docs:
+        result = rag.process_document(doc["id"], doc["title"], doc["content"])
+        print(f"\nProcessed: {result.title}")
+        print(f"Risk Level: {result.risk_level.value}")
+        print(f"Compliance: {[ct.value for ct in result.compliance_tags]}")
+        print(f"Risk Scores: {result.risk_scores}")
+    
+    # Test search
+    print("\n\n--- SEARCH TESTS ---")
+    
+    queries = [
+        "Basel III capital requirements",
+        "operational risk incidents",
+        "critical risk exposure",
+        "liquidity coverage compliance"
+    ]
+    
+    for query in queries:
+        print(f"\nQuery: '{query}'")
+        results = rag.search(query, top_k=3)
+        
+        for i, result in enumerate(results):
+            doc = result['document']
+            print(f"{i+1}. {doc.title} (Score: {result['score']:.3f}, Risk: {doc.risk_level.value})")
+    
+    # Generate risk summary
+    all_docs = [result['document'] for result in rag.search("risk", top_k=10)]
+    summary = rag.generate_risk_summary(all_docs)
+    print(f"\n\n--- RISK SUMMARY ---\n{summary}")
\ No newline at end of file
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Banking Risk RAG system
+Measures ingestion throughput, search latency per stage, memory and index size
+on a reproducible synthetic banking-risk corpus, and flags regressions
+against a stored baseline.
+
+Usage:
+    python3 src/lib/rag/benchmark_rag.py --sizes 1000 10000 100000
+    python3 src/lib/rag/benchmark_rag.py --sizes 1000 --update-baseline
+    python3 src/lib/rag/benchmark_rag.py --sizes 10000 --query-layers 2 4 --query-exit-thresholds 0.99
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import logging
+import platform
+import resource
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stderr)
+
+try:
+    from banking_risk_model import BankingRiskRAG, BankingRiskVocabulary
+except ImportError:
+    # For development, add the current directory to path
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from banking_risk_model import BankingRiskRAG, BankingRiskVocabulary
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'baseline.json')
+
+# Metrics where a larger value is a regression; everything else in
+# HIGHER_IS_BETTER regresses when it drops
+LOWER_IS_BETTER = [
+    'search_p50_ms', 'search_p95_ms', 'search_p99_ms',
+    'semantic_p50_ms', 'semantic_p95_ms', 'semantic_p99_ms',
+    'keyword_p50_ms', 'keyword_p95_ms', 'keyword_p99_ms',
+    'fusion_p50_ms', 'fusion_p95_ms', 'fusion_p99_ms',
+    'peak_rss_mb', 'vector_index_mb', 'keyword_index_mb', 'database_mb'
+]
+HIGHER_IS_BETTER = ['ingest_docs_per_sec']
+
+# Run settings that must match the baseline's for a comparison to mean anything
+COMPARABLE_META = ['cpu_count', 'seed', 'top_k']
+COMPARABLE_RESULT = ['queries', 'keyword_backend']
+
+FILLER_WORDS = [
+    "the", "bank", "policy", "quarter", "review", "team", "report", "business",
+    "unit", "committee", "limit", "process", "management", "analysis", "board",
+    "update", "requirement", "assessment", "annual", "internal", "customer"
+]
+
+TITLE_TEMPLATES = [
+    "{category} Policy Q{quarter} {year}",
+    "{category} Incident Report {year}-{quarter:02d}",
+    "{category} Assessment {year}",
+    "Quarterly {category} Review Q{quarter}"
+]
+
+
+def generate_corpus(num_docs: int, seed: int = 42) -> List[Dict]:
+    """Generate a reproducible corpus from the banking risk vocabulary"""
+    rng = random.Random(seed)
+    risk_terms = BankingRiskVocabulary().risk_terms
+    categories = sorted(risk_terms)
+
+    corpus = []
+    for i in range(num_docs):
+        # Each document focuses on one or two risk categories
+        focus = rng.sample(categories, rng.choice([1, 2]))
+        words = []
+        for _ in range(rng.randint(80, 400)):
+            if rng.random() < 0.3:
+                words.append(rng.choice(risk_terms[rng.choice(focus)]))
+            else:
+                words.append(rng.choice(FILLER_WORDS))
+
+        title = rng.choice(TITLE_TEMPLATES).format(
+            category=focus[0].replace('_', ' ').title(),
+            quarter=rng.randint(1, 4),
+            year=rng.randint(2019, 2025)
+        )
+        corpus.append({'id': f'bench-{i:06d}', 'title': title, 'content': ' '.join(words) + '.'})
+
+    return corpus
+
+
+def generate_queries(num_queries: int, seed: int = 7) -> List[str]:
+    """Generate reproducible search queries mixing risk terms and filler"""
+    rng = random.Random(seed)
+    risk_terms = BankingRiskVocabulary().risk_terms
+    all_terms = [term for terms in risk_terms.values() for term in terms]
+
+    queries = []
+    for _ in range(num_queries):
+        terms = rng.sample(all_terms, rng.randint(1, 4))
+        if rng.random() < 0.3:
+            terms.append(rng.choice(FILLER_WORDS))
+        queries.append(' '.join(terms))
+    return queries
+
+
+def _percentiles(samples: List[float], prefix: str) -> Dict[str, float]:
+    values = np.array(samples) * 1000.0
+    return {
+        f'{prefix}_p50_ms': float(np.percentile(values, 50)),
+        f'{prefix}_p95_ms': float(np.percentile(values, 95)),
+        f'{prefix}_p99_ms': float(np.percentile(values, 99))
+    }
+
+
+def _index_sizes(rag: BankingRiskRAG, db_path: str) -> Dict[str, float]:
+    import faiss
+
+    mb = 1024.0 * 1024.0
+    vector_bytes = faiss.serialize_index(rag.index).nbytes
+    if hasattr(rag.keyword_index, 'memory_usage'):
+        keyword_bytes = rag.keyword_index.memory_usage()
+    else:
+        # FTS5 lives in the database file
+        keyword_bytes = 0
+    return {
+        'vector_index_mb': vector_bytes / mb,
+        'keyword_index_mb': keyword_bytes / mb,
+        'database_mb': os.path.getsize(db_path) / mb
+    }
+
+
+def run_size(num_docs: int, num_queries: int, top_k: int, keyword_backend: str, seed: int) -> Dict:
+    """Benchmark one corpus size in the current process"""
+    corpus = generate_corpus(num_docs, seed)
+    queries = generate_queries(num_queries, seed + 1)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'bench.db')
+        rag = BankingRiskRAG(keyword_backend=keyword_backend, db_path=db_path)
+
+        start = time.perf_counter()
+        for doc in corpus:
+            rag.process_document(doc['id'], doc['title'], doc['content'])
+        ingest_seconds = time.perf_counter() - start
+
+        semantic, keyword, fusion, total = [], [], [], []
+        for query in queries:
+            timings = {}
+            start = time.perf_counter()
+            rag.search(query, top_k=top_k, timings=timings)
+            total.append(time.perf_counter() - start)
+
+            # Stage timings are milliseconds
+            semantic.append((timings['query_analysis'] + timings['embedding'] + timings['faiss_search']) / 1000.0)
+            keyword.append(timings['keyword_search'] / 1000.0)
+            fusion.append(timings['fusion'] / 1000.0)
+
+        result = {
+            'documents': num_docs,
+            'queries': num_queries,
+            'keyword_backend': keyword_backend,
+            'ingest_seconds': ingest_seconds,
+            'ingest_docs_per_sec': num_docs / ingest_seconds if ingest_seconds else 0.0,
+            # ru_maxrss is kilobytes on Linux and bytes on macOS
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                           / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+        }
+        result.update(_percentiles(total, 'search'))
+        result.update(_percentiles(semantic, 'semantic'))
+        result.update(_percentiles(keyword, 'keyword'))
+        result.update(_percentiles(fusion, 'fusion'))
+        result.update(_index_sizes(rag, db_path))
+        rag.conn.close()
+
+    return result
+
+
+def run_query_encoder(num_docs: int, num_queries: int, top_k: int, seed: int,
+                      configs: List[Dict]) -> Dict:
+    """Query embedding latency and semantic recall@top_k of truncated or early-exit encoding
+
+    Recall is measured against the FAISS results of the full encoder, on the
+    same corpus embeddings.
+    """
+    corpus = generate_corpus(num_docs, seed)
+    queries = generate_queries(num_queries, seed + 1)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        rag = BankingRiskRAG(db_path=os.path.join(workdir, 'bench.db'), search_threads=1)
+        rag.process_documents([(doc['id'], doc['title'], doc['content']) for doc in corpus])
+
+        def measure():
+            latencies, hits = [], []
+            for query in queries:
+                start = time.perf_counter()
+                embedding = rag._get_query_embedding(query)
+                latencies.append(time.perf_counter() - start)
+                hits.append({doc_id for doc_id, _ in rag._semantic_search(embedding, top_k)})
+            return latencies, hits
+
+        rag.query_layers = rag.query_exit_threshold = None
+        full_latencies, reference = measure()
+
+        results = {'full': {**_percentiles(full_latencies, 'embedding'), 'recall': 1.0}}
+        for config in configs:
+            rag.query_layers = config.get('layers')
+            rag.query_exit_threshold = config.get('exit_threshold')
+            latencies, hits = measure()
+            recall = np.mean([len(got & ref) / max(len(ref), 1) for got, ref in zip(hits, reference)])
+            results[config['name']] = {**_percentiles(latencies, 'embedding'), 'recall': float(recall)}
+        rag.close()
+
+    return results
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """List metrics that regressed by more than threshold (a fraction)
+
+    Sizes run with different settings from the baseline (see COMPARABLE_META
+    and COMPARABLE_RESULT) are skipped with a warning.
+    """
+    meta, baseline_meta = results.get('meta', {}), baseline.get('meta', {})
+    differing = [key for key in COMPARABLE_META if meta.get(key) != baseline_meta.get(key)]
+    if differing:
+        logging.warning(
+            'Skipping baseline comparison, run settings differ: '
+            + ', '.join(f'{key} {baseline_meta.get(key)} -> {meta.get(key)}' for key in differing)
+        )
+        return []
+
+    regressions = []
+    for size, current in results['results'].items():
+        reference = baseline.get('results', {}).get(size)
+        if not reference:
+            logging.warning(f'No baseline for {size} docs; not compared')
+            continue
+        differing = [key for key in COMPARABLE_RESULT if current.get(key) != reference.get(key)]
+        if differing:
+            logging.warning(
+                f'Skipping {size} docs, settings differ from the baseline: '
+                + ', '.join(f'{key} {reference.get(key)} -> {current.get(key)}' for key in differing)
+            )
+            continue
+
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            old, new = reference.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > threshold:
+                regressions.append(
+                    f'{size} docs: {metric} {old:.3f} -> {new:.3f} ({change * 100:+.1f}% worse)'
+                )
+    return regressions
+
+
+def main():
+    """Main entry point for command-line usage"""
+    parser = argparse.ArgumentParser(description='Banking Risk RAG benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Corpus sizes to benchmark')
+    parser.add_argument('--queries', type=int, default=200, help='Search queries per size')
+    parser.add_argument('--top-k', type=int, default=10, help='Results per search')
+    parser.add_argument('--keyword-backend', choices=['memory', 'fts5'], default='memory')
+    parser.add_argument('--seed', type=int, default=42, help='Corpus generator seed')
+    parser.add_argument('--output', type=str, default='rag-benchmark-results.json',
+                        help='Where to write the results JSON')
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE,
+                        help='Baseline results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed regression as a fraction (0.2 = 20%%)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write these results as the new baseline')
+    parser.add_argument('--query-layers', type=int, nargs='*', default=[],
+                        help='Also compare query encoding truncated to these layer counts')
+    parser.add_argument('--query-exit-thresholds', type=float, nargs='*', default=[],
+                        help='Also compare early-exit query encoding at these cosine thresholds')
+
+    args = parser.parse_args()
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+            'top_k': args.top_k
+        },
+        'results': {}
+    }
+
+    # One fresh process per size so peak RSS is not carried over
+    context = multiprocessing.get_context('spawn')
+    for size in args.sizes:
+        logging.info(f'Benchmarking {size} documents...')
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(
+                run_size, size, args.queries, args.top_k, args.keyword_backend, args.seed
+            ).result()
+        results['results'][str(size)] = result
+        logging.info(
+            f"  ingest {result['ingest_docs_per_sec']:.1f} docs/s, "
+            f"search p50 {result['search_p50_ms']:.2f} ms / p99 {result['search_p99_ms']:.2f} ms, "
+            f"peak RSS {result['peak_rss_mb']:.0f} MB"
+        )
+
+    # Recall/latency trade-off of the fast query encoder paths
+    configs = [{'name': f'layers_{n}', 'layers': n} for n in args.query_layers]
+    configs += [{'name': f'exit_{t:g}', 'exit_threshold': t} for t in args.query_exit_thresholds]
+    if configs:
+        results['query_encoder'] = {}
+        for size in args.sizes:
+            logging.info(f'Benchmarking query encoding on {size} documents...')
+            trade_off = run_query_encoder(size, args.queries, args.top_k, args.seed, configs)
+            results['query_encoder'][str(size)] = trade_off
+            for name, row in trade_off.items():
+                logging.info(
+                    f"  {name}: p50 {row['embedding_p50_ms']:.2f} ms, "
+                    f"recall@{args.top_k} {row['recall']:.3f}"
+                )
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    logging.info(f'Results written to {args.output}')
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        logging.info(f'Baseline updated at {args.baseline}')
+        return
+
+    if not os.path.exists(args.baseline):
+        logging.info('No baseline found; run with --update-baseline to create one')
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    if regressions:
+        logging.error('Performance regressions detected:')
+        for regression in regressions:
+            logging.error(f'  {regression}')
+        sys.exit(1)
+
+    logging.info('No regressions against baseline')
+
+
+if __name__ == '__main__':
+    main()
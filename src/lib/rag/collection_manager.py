@@ -0,0 +1,155 @@
+"""
+Named document collections for the Banking Risk RAG system
+Each collection has its own database, vector index and keyword index; collections
+are loaded on first use and evicted least-recently-used under a memory budget.
+"""
+
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from metrics import MetricsRegistry
+
+COLLECTION_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$')
+
+
+class CollectionManager:
+    """Lazily loaded BankingRiskRAG instances, one per named collection
+
+    rag_factory(db_path) builds an instance for a collection's database;
+    the API passes one that shares its already-loaded encoder.
+    """
+
+    def __init__(self, rag_factory: Callable, base_dir: str = 'rag_collections',
+                 memory_budget_mb: float = 1024.0, metrics: Optional[MetricsRegistry] = None):
+        self.rag_factory = rag_factory
+        self.base_dir = base_dir
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self._loaded: 'OrderedDict[str, object]' = OrderedDict()  # least recently used first
+        self._lock = threading.RLock()
+        self._pins: Dict[str, int] = {}  # collections in use outside the lock
+        self.evictions = 0
+
+        if metrics is not None:
+            metrics.gauge('collections_loaded', 'Collections currently held in memory',
+                          lambda: len(self._loaded))
+            metrics.gauge('collection_memory_bytes', 'Approximate memory per loaded collection',
+                          self.memory_by_collection)
+            metrics.gauge('collection_evictions_total', 'Collections evicted to stay within budget',
+                          lambda: self.evictions)
+
+    def get(self, name: str, create: bool = False):
+        """The collection's RAG instance, loading it (and evicting others) if needed"""
+        with self._lock:
+            rag = self._loaded.get(name)
+            if rag is not None:
+                self._loaded.move_to_end(name)
+                return rag
+
+            db_path = self._db_path(name)
+            if not create and not os.path.exists(db_path):
+                raise ValueError(f"Unknown collection: {name}")
+
+            os.makedirs(self.base_dir, exist_ok=True)
+            rag = self.rag_factory(db_path)
+            loaded = rag.load_from_database()
+            logging.info(f"Loaded collection {name} ({loaded} documents)")
+            self._loaded[name] = rag
+            self._evict(keep=name)
+            return rag
+
+    @contextmanager
+    def pinned(self, name: str):
+        """The collection's instance, never evicted until the block exits
+
+        For long operations that release the lock between steps.
+        """
+        with self._lock:
+            rag = self.get(name)
+            self._pins[name] = self._pins.get(name, 0) + 1
+        try:
+            yield rag
+        finally:
+            with self._lock:
+                self._pins[name] -= 1
+                if not self._pins[name]:
+                    del self._pins[name]
+
+    def generation(self, name: str) -> Optional[int]:
+        """Corpus generation of a loaded collection, without loading it"""
+        with self._lock:
+            rag = self._loaded.get(name)
+            return rag.generation if rag is not None else None
+
+    def list(self) -> List[Dict]:
+        """All collections on disk and whether each is loaded"""
+        names = set()
+        if os.path.isdir(self.base_dir):
+            names.update(f[:-3] for f in os.listdir(self.base_dir) if f.endswith('.db'))
+        with self._lock:
+            names.update(self._loaded)
+            return [
+                {'name': name, 'loaded': name in self._loaded} for name in sorted(names)
+            ]
+
+    def search(self, query: str, names: List[str], filters: Optional[Dict] = None,
+               top_k: int = 10, timings: Optional[Dict[str, float]] = None,
+               deadline=None) -> List[Dict]:
+        """Search only the requested collections and merge results by score"""
+        merged = []
+        for name in dict.fromkeys(names):
+            # Held under the lock so the instance cannot be evicted mid-search
+            with self._lock:
+                for result in self.get(name).search(query, filters, top_k, timings=timings,
+                                                     deadline=deadline):
+                    result['collection'] = name
+                    merged.append(result)
+
+        merged.sort(key=lambda r: r['score'], reverse=True)
+        return merged[:top_k]
+
+    def process_documents(self, name: str, documents: List) -> List:
+        with self._lock:
+            docs = self.get(name, create=True).process_documents(documents)
+            self._evict(keep=name)
+            return docs
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            if name in self._pins:
+                return False
+            rag = self._loaded.pop(name, None)
+        if rag is None:
+            return False
+        rag.close()
+        return True
+
+    def memory_usage(self) -> int:
+        return sum(self.memory_by_collection().values())
+
+    def memory_by_collection(self) -> Dict:
+        with self._lock:
+            return {(('collection', name),): rag.memory_usage() for name, rag in self._loaded.items()}
+
+    def _evict(self, keep: str):
+        """Drop least recently used collections until within the memory budget"""
+        usage = {name: rag.memory_usage() for name, rag in self._loaded.items()}
+        total = sum(usage.values())
+        for name in list(self._loaded):
+            if total <= self.memory_budget:
+                break
+            if name == keep or name in self._pins:
+                continue
+            self._loaded.pop(name).close()
+            total -= usage[name]
+            self.evictions += 1
+            logging.info(f"Evicted collection {name} to stay within the memory budget")
+
+    def _db_path(self, name: str) -> str:
+        if not COLLECTION_NAME.match(name):
+            raise ValueError(f"Invalid collection name: {name!r}")
+        return os.path.join(self.base_dir, f'{name}.db')
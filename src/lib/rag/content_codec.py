@@ -0,0 +1,52 @@
+"""
+Compression for document content stored by the Banking Risk RAG system
+Blobs carry a one-byte codec tag, so zlib and zstd rows can coexist in one table.
+"""
+
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+# Characters kept uncompressed in the preview column for result rendering
+PREVIEW_CHARS = 500
+
+_TAGS = {'zlib': b'z', 'zstd': b's'}
+
+
+class ContentCodec:
+    """Compress document text with zlib (stdlib) or zstd (if installed)"""
+
+    def __init__(self, codec: str = 'zlib', level: int = 6):
+        if codec not in _TAGS:
+            raise ValueError(f"Unknown content codec: {codec}")
+        if codec == 'zstd' and zstandard is None:
+            raise ImportError("zstd content compression requires the zstandard package")
+        self.codec = codec
+        self.level = level
+        self._tag = _TAGS[codec]
+        self._zstd = zstandard.ZstdCompressor(level=level) if codec == 'zstd' else None
+
+    def compress(self, text: str) -> bytes:
+        data = text.encode('utf-8')
+        if self._zstd is not None:
+            return self._tag + self._zstd.compress(data)
+        return self._tag + zlib.compress(data, self.level)
+
+
+def decompress(blob: bytes) -> str:
+    """Text of a blob written by any ContentCodec"""
+    tag, payload = blob[:1], memoryview(blob)[1:]
+    if tag == _TAGS['zlib']:
+        return zlib.decompress(payload).decode('utf-8')
+    if tag == _TAGS['zstd']:
+        if zstandard is None:
+            raise ImportError("Reading zstd-compressed content requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(payload).decode('utf-8')
+    raise ValueError(f"Unknown content codec tag: {tag!r}")
+
+
+def preview(text: str) -> str:
+    return text[:PREVIEW_CHARS]
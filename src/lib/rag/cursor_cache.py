@@ -0,0 +1,70 @@
+"""
+Search result cursors for the Banking Risk RAG system
+Ranked candidate lists are cached per search so later pages are served from
+memory, until the corpus changes or the entry's TTL runs out.
+"""
+
+import json
+import time
+import base64
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Tuple
+
+
+class CursorExpired(Exception):
+    """The cursor's candidate list is gone (TTL, eviction or corpus change)"""
+
+
+class CursorCache:
+    """LRU cache of fused, ranked candidate lists keyed by an opaque cursor"""
+
+    def __init__(self, ttl_seconds: float = 300.0, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # key -> (expiry, scope, generation, candidates)
+        self._entries: 'OrderedDict[str, Tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, candidates: List[Dict], scope: Hashable, generation: Hashable) -> str:
+        """Cache a ranked list searched over scope at generation; returns its key"""
+        key = secrets.token_urlsafe(12)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, scope, generation, candidates)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return key
+
+    def get(self, key: str, generation_of: Callable[[Hashable], Hashable]) -> List[Dict]:
+        """Cached candidates, if live and their scope is still at the same generation"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, scope, generation, candidates = entry
+                if expires >= time.monotonic() and generation_of(scope) == generation:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return candidates
+                del self._entries[key]
+            self.misses += 1
+        raise CursorExpired("Cursor has expired; run the search again")
+
+    @staticmethod
+    def encode(key: str, offset: int) -> str:
+        payload = json.dumps({'k': key, 'o': offset}, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode(cursor: str) -> Tuple[str, int]:
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            return str(payload['k']), int(payload['o'])
+        except (ValueError, KeyError, TypeError) as e:
+            raise CursorExpired(f"Invalid cursor: {e}")
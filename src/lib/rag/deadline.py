@@ -0,0 +1,63 @@
+"""
+Per-request time budgets for the Banking Risk RAG system
+Optional stages are skipped when their typical duration no longer fits.
+"""
+
+import time
+from typing import List, Optional
+
+from metrics import MetricsRegistry
+
+# Optional work in the order it is given up: the summary first, then
+# candidate depth, then keyword retrieval, then fusion (semantic-only results)
+DEGRADATION_ORDER = ('summary', 'candidate_depth', 'keyword_search', 'fusion')
+
+# Conservative seconds assumed for a stage until it has been observed, so a
+# fresh process (one per request from the Next.js route) still degrades
+STAGE_ESTIMATES = {
+    'query_analysis': 0.001,
+    'embedding': 0.05,
+    'faiss_search': 0.02,
+    'keyword_search': 0.02,
+    'fusion': 0.005,
+    'summary': 0.005,
+}
+
+
+class Deadline:
+    """Time left for one request, judged against observed stage latencies"""
+
+    def __init__(self, budget_ms: Optional[float], metrics: MetricsRegistry,
+                 started: Optional[float] = None):
+        """started is the wall-clock time the request began, if earlier than now
+
+        Time already spent since then (process start-up, model loading) is
+        charged against the budget.
+        """
+        self.budget_ms = budget_ms
+        self.expires = None
+        if budget_ms is not None:
+            spent = 0.0 if started is None else max(0.0, time.time() - started)
+            self.expires = time.perf_counter() + budget_ms / 1000.0 - spent
+        self.metrics = metrics
+        self.skipped: List[str] = []
+
+    def remaining(self) -> float:
+        """Seconds left (infinite without a budget)"""
+        if self.expires is None:
+            return float('inf')
+        return self.expires - time.perf_counter()
+
+    def allows(self, *stages: str) -> bool:
+        """Whether the stages' mean observed durations fit in the time left
+
+        Stages never observed are assumed to take their STAGE_ESTIMATES time.
+        """
+        if self.expires is None:
+            return True
+        expected = sum(self.metrics.mean(stage, STAGE_ESTIMATES.get(stage, 0.0)) for stage in stages)
+        return expected <= self.remaining()
+
+    def skip(self, stage: str):
+        if stage not in self.skipped:
+            self.skipped.append(stage)
@@ -0,0 +1,101 @@
+"""
+Near-duplicate detection for the Banking Risk RAG system
+MinHash signatures over word shingles, bucketed with LSH banding
+"""
+
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Smallest prime above 2**32, so (a * x + b) stays inside uint64 for 32-bit a, x, b
+_PRIME = np.uint64(4294967311)
+
+
+class MinHasher:
+    """MinHash signatures that are stable across processes (crc32-based)"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 2 ** 32 - 1, size=num_perm, dtype=np.uint64)
+
+    def signature(self, tokens: List[str]) -> np.ndarray:
+        """MinHash signature (uint64, one value per permutation) of a token list"""
+        # Hash shingles as they are generated rather than materialising them,
+        # so large documents only cost one integer per shingle
+        hashes = np.unique(np.fromiter(self._shingle_hashes(tokens), dtype=np.uint64))
+
+        # Min over shingles in blocks to bound the (shingles x perms) matrix
+        signature = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, len(hashes), 4096):
+            block = hashes[start:start + 4096, None]
+            permuted = (block * self._a + self._b) % _PRIME
+            np.minimum(signature, permuted.min(axis=0), out=signature)
+        return signature
+
+    def _shingle_hashes(self, tokens: List[str]):
+        size = self.shingle_size
+        if len(tokens) <= size:
+            yield zlib.crc32(' '.join(tokens).encode('utf-8'))
+            return
+        for i in range(len(tokens) - size + 1):
+            yield zlib.crc32(' '.join(tokens[i:i + size]).encode('utf-8'))
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return float(np.mean(sig_a == sig_b))
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures for sub-linear candidate lookup"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: Dict[Tuple[int, bytes], Set[str]] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, doc_id: str, signature: np.ndarray):
+        self.remove(doc_id)
+        self._signatures[doc_id] = signature
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(doc_id)
+
+    def remove(self, doc_id: str):
+        signature = self._signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def query(self, signature: np.ndarray, threshold: float,
+              exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """Most similar indexed document at or above threshold, other than exclude, if any"""
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+        candidates.discard(exclude)
+
+        best = None
+        for doc_id in candidates:
+            similarity = MinHasher.similarity(signature, self._signatures[doc_id])
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (doc_id, similarity)
+        return best
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
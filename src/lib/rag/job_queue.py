@@ -0,0 +1,324 @@
+"""
+Durable ingestion job queue for the Banking Risk RAG system
+SQLite-backed, bounded, smallest-documents-first with aging, drained by
+background workers
+"""
+
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from metrics import MetricsRegistry
+
+# Documents up to these sizes (bytes) go in priority bands 0, 1, 2; larger ones in band 3
+PRIORITY_BANDS = (16 * 1024, 128 * 1024, 1024 * 1024)
+
+# Each band is worth this much queueing time: a job is claimed ahead of one
+# in a lower band that was enqueued more than this many seconds per band later
+PRIORITY_AGING_SECONDS = 60.0
+
+# A running job whose batch started longer ago than this is assumed to
+# belong to a dead worker process
+STALE_AFTER_SECONDS = 15 * 60.0
+
+# A job claimed this many times without finishing (its workers kept dying,
+# e.g. on a document that crashes the process) is failed instead of retried
+MAX_ATTEMPTS = 3
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+
+class QueueFullError(Exception):
+    """Raised when the queue is at its maximum depth"""
+
+
+class JobQueue:
+    """Ingestion jobs persisted in SQLite so they survive restarts"""
+
+    def __init__(self, db_path: str = 'rag_jobs.db', max_depth: int = 1000,
+                 metrics: Optional[MetricsRegistry] = None,
+                 aging_seconds: float = PRIORITY_AGING_SECONDS, max_attempts: int = MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.max_depth = max_depth
+        self.aging_seconds = aging_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ingest_jobs (
+                id TEXT PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                enqueued_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_ingest_jobs_claim
+            ON ingest_jobs(status, priority, enqueued_at)
+        ''')
+
+        if metrics is not None:
+            metrics.gauge('ingest_queue_jobs', 'Ingestion jobs by status', self._depth_by_status)
+            metrics.gauge('ingest_queue_lag_seconds', 'Age of the oldest queued ingestion job',
+                          self.lag_seconds)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite serialises the writers"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def priority_for(size: int) -> int:
+        for band, limit in enumerate(PRIORITY_BANDS):
+            if size <= limit:
+                return band
+        return len(PRIORITY_BANDS)
+
+    def enqueue(self, doc_id: str, title: str, content: str) -> Dict:
+        """Add a job; raises QueueFullError when max_depth jobs are pending"""
+        size = len(content.encode('utf-8'))
+        priority = self.priority_for(size)
+        enqueued_at = time.time()
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM ingest_jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+            if pending >= self.max_depth:
+                raise QueueFullError(f"Ingestion queue is full ({pending} pending jobs)")
+
+            conn.execute('''
+                INSERT INTO ingest_jobs (id, doc_id, title, content, size, priority, enqueued_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (job_id, doc_id, title, content, size, priority, enqueued_at))
+            position = self._position(priority, enqueued_at)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        return {'job_id': job_id, 'status': 'queued', 'position': position}
+
+    def claim(self, limit: int = 1) -> List[Dict]:
+        """Atomically move up to limit of the highest-priority queued jobs to running
+
+        Jobs are ordered by enqueue time plus aging_seconds per priority band,
+        so smaller documents go first but larger ones are never starved. Jobs
+        already claimed max_attempts times are failed rather than claimed again.
+        """
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute('''
+                SELECT id, doc_id, title, content, size, attempts, enqueued_at FROM ingest_jobs
+                WHERE status = 'queued'
+                ORDER BY enqueued_at + priority * ?, enqueued_at
+                LIMIT ?
+            ''', (self.aging_seconds, limit)).fetchall()
+            for row in rows:
+                if row['attempts'] >= self.max_attempts:
+                    self.fail(row['id'], f"Abandoned after {row['attempts']} attempts")
+            rows = [row for row in rows if row['attempts'] < self.max_attempts]
+            now = time.time()
+            conn.executemany('''
+                UPDATE ingest_jobs SET status = 'running', started_at = ?, attempts = attempts + 1
+                WHERE id = ?
+            ''', [(now, row['id']) for row in rows])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        return [dict(row) for row in rows]
+
+    def requeue_stale(self, stale_after: float = STALE_AFTER_SECONDS) -> int:
+        """Put jobs left running by a crashed worker process back in the queue
+
+        Only jobs started more than stale_after seconds ago are requeued, so
+        jobs claimed by live workers in other processes are left alone.
+        """
+        cursor = self._connect().execute(
+            "UPDATE ingest_jobs SET status = 'queued' WHERE status = 'running' AND started_at < ?",
+            (time.time() - stale_after,)
+        )
+        return cursor.rowcount
+
+    def complete(self, job_id: str, result: Dict):
+        self._finish(job_id, 'done', result=json.dumps(result))
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, 'failed', error=error)
+
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None,
+                error: Optional[str] = None):
+        # Content is only needed until the job has run
+        self._connect().execute('''
+            UPDATE ingest_jobs SET status = ?, result = ?, error = ?, finished_at = ?, content = ''
+            WHERE id = ?
+        ''', (status, result, error, time.time(), job_id))
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Status, timings and (once done) the processing result of a job"""
+        row = self._connect().execute('''
+            SELECT id, doc_id, size, priority, status, attempts, result, error,
+                   enqueued_at, started_at, finished_at
+            FROM ingest_jobs WHERE id = ?
+        ''', (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        job['job_id'] = job.pop('id')
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        if job['status'] == 'queued':
+            job['position'] = self._position(job['priority'], job['enqueued_at'])
+        return job
+
+    def _position(self, priority: int, enqueued_at: float) -> int:
+        """1-based place in claim order among queued jobs"""
+        key = enqueued_at + priority * self.aging_seconds
+        return self._connect().execute('''
+            SELECT COUNT(*) FROM ingest_jobs
+            WHERE status = 'queued' AND (
+                enqueued_at + priority * ? < ?
+                OR (enqueued_at + priority * ? = ? AND enqueued_at <= ?)
+            )
+        ''', (self.aging_seconds, key, self.aging_seconds, key, enqueued_at)).fetchone()[0]
+
+    def depth(self) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM ingest_jobs WHERE status IN ('queued', 'running')"
+        ).fetchone()[0]
+
+    def lag_seconds(self) -> float:
+        oldest = self._connect().execute(
+            "SELECT MIN(enqueued_at) FROM ingest_jobs WHERE status = 'queued'"
+        ).fetchone()[0]
+        return time.time() - oldest if oldest is not None else 0.0
+
+    def purge(self, older_than_seconds: float = 7 * 24 * 3600) -> int:
+        """Delete finished jobs older than the retention period"""
+        cursor = self._connect().execute(
+            "DELETE FROM ingest_jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - older_than_seconds,)
+        )
+        return cursor.rowcount
+
+    def _depth_by_status(self) -> Dict:
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        for status, count in self._connect().execute(
+            'SELECT status, COUNT(*) FROM ingest_jobs GROUP BY status'
+        ):
+            counts[status] = count
+        return {(('status', status),): count for status, count in counts.items()}
+
+
+class IngestWorkers:
+    """Background threads that drain a JobQueue in batches
+
+    handler receives a list of (doc_id, title, content) tuples and returns
+    one result dict per document, in order.
+    """
+
+    def __init__(self, queue: JobQueue, handler: Callable[[List], List[Dict]],
+                 workers: int = 1, batch_size: int = 8, poll_interval: float = 0.5,
+                 metrics: Optional[MetricsRegistry] = None,
+                 stale_after: float = STALE_AFTER_SECONDS):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.metrics = metrics or MetricsRegistry()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        self.requeue_stale()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f'ingest-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def requeue_stale(self) -> int:
+        """Requeue jobs abandoned by workers that died mid-batch"""
+        recovered = self.queue.requeue_stale(self.stale_after)
+        if recovered:
+            logging.info(f"Requeued {recovered} interrupted ingestion jobs")
+        return recovered
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_once(self) -> int:
+        """Process one batch; returns the number of jobs handled"""
+        jobs = self.queue.claim(self.batch_size)
+        if not jobs:
+            return 0
+
+        now = time.time()
+        for job in jobs:
+            self.metrics.observe('ingest_queue_wait', now - job['enqueued_at'])
+
+        try:
+            with self.metrics.timer('ingest_batch'):
+                results = self.handler([(j['doc_id'], j['title'], j['content']) for j in jobs])
+        except Exception as e:
+            logging.error(f"Ingestion batch failed: {e}")
+            for job in jobs:
+                self.queue.fail(job['id'], str(e))
+            return len(jobs)
+
+        for job, result in zip(jobs, results):
+            if result.get('success'):
+                self.queue.complete(job['id'], result)
+            else:
+                self.queue.fail(job['id'], result.get('error', 'Processing failed'))
+        return len(jobs)
+
+    def drain(self) -> int:
+        """Process jobs until the queue is empty"""
+        handled = 0
+        while True:
+            count = self.run_once()
+            if not count:
+                return handled
+            handled += count
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                handled = self.run_once()
+                if not handled:
+                    # Idle: pick up jobs another process abandoned since start
+                    handled = self.requeue_stale()
+            except sqlite3.Error as e:
+                logging.error(f"Ingestion worker error: {e}")
+                handled = 0
+            if not handled:
+                self._stop.wait(self.poll_interval)
@@ -0,0 +1,646 @@
+"""
+Keyword search indexes for the Banking Risk RAG system
+In-memory inverted-index BM25, or a persistent SQLite FTS5 table
+"""
+
+import json
+import math
+import sqlite3
+import threading
+from array import array
+from typing import Callable, Collection, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class InvertedBM25Index:
+    """BM25 (Okapi) over postings lists with MaxScore top-k pruning
+
+    Scores are identical to rank_bm25.BM25Okapi for the same tokenized corpus,
+    including its epsilon floor for negative IDF values.
+    """
+
+    # Bound on the (query, document) score matrix built by top_k_many
+    MAX_SCORE_CELLS = 1 << 22
+
+    def __init__(self, tokenizer: Callable[[str], List[str]],
+                 k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.tokenizer = tokenizer
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        # Term dictionary and postings (doc ordinals, term frequencies)
+        self._term_ids: Dict[str, int] = {}
+        self._terms: List[str] = []
+        self._postings: List[Tuple[array, array]] = []
+        self._doc_freq: List[int] = []
+        self._max_tf: List[int] = []
+        self._min_len: List[int] = []
+
+        # Per-document state, indexed by ordinal
+        self._doc_ids: List[str] = []
+        self._doc_terms: List[Optional[Tuple[array, array]]] = []
+        self._doc_lengths = np.zeros(1024, dtype=np.float32)
+        self._live = np.zeros(1024, dtype=bool)
+        self._ordinals: Dict[str, int] = {}
+
+        self._total_length = 0
+        self._live_terms = 0
+        self._dead = 0
+        self._idf_cache = None
+        self._lock = threading.Lock()
+
+        # Documents scored elsewhere (cold partitions) that still count
+        # toward the corpus size, average length and document frequencies
+        self._background_docs = 0
+        self._background_length = 0
+        self._background_df: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._ordinals
+
+    def add(self, doc_id: str, title: str, content: str):
+        """Index a document, replacing any previous version with the same id"""
+        self.add_tokens(doc_id, self.tokenizer(content))
+
+    def add_tokens(self, doc_id: str, tokens: List[str]):
+        """Index an already tokenized document"""
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        self.add_counts(doc_id, counts)
+
+    def add_counts(self, doc_id: str, counts: Dict[str, int]):
+        """Index a document from its term frequencies; its length is their sum"""
+        length = sum(counts.values())
+        with self._lock:
+            if doc_id in self._ordinals:
+                self._remove_locked(doc_id)
+
+            ordinal = len(self._doc_ids)
+            self._ensure_capacity(ordinal + 1)
+            self._doc_ids.append(doc_id)
+            self._doc_lengths[ordinal] = length
+            self._live[ordinal] = True
+            self._ordinals[doc_id] = ordinal
+            self._total_length += length
+
+            term_ids = array('i')
+            freqs = array('i')
+            for term, tf in counts.items():
+                term_id = self._term_ids.get(term)
+                if term_id is None:
+                    term_id = len(self._postings)
+                    self._term_ids[term] = term_id
+                    self._terms.append(term)
+                    self._postings.append((array('i'), array('i')))
+                    self._doc_freq.append(0)
+                    self._max_tf.append(0)
+                    self._min_len.append(length)
+
+                ords, tfs = self._postings[term_id]
+                ords.append(ordinal)
+                tfs.append(tf)
+                if self._doc_freq[term_id] == 0:
+                    self._live_terms += 1
+                self._doc_freq[term_id] += 1
+                self._max_tf[term_id] = max(self._max_tf[term_id], tf)
+                self._min_len[term_id] = min(self._min_len[term_id], length)
+
+                term_ids.append(term_id)
+                freqs.append(tf)
+
+            self._doc_terms.append((term_ids, freqs))
+            self._idf_cache = None
+
+    def add_postings(self, doc_ids: List[str], terms: List[str], doc_rows: np.ndarray,
+                     term_ids: np.ndarray, tfs: np.ndarray):
+        """Index many documents from flat (doc row, term id, tf) triples
+
+        doc_rows index doc_ids and must be ascending, term_ids index terms.
+        An empty index is built with array operations; otherwise each
+        document goes through add_counts.
+        """
+        doc_rows = np.asarray(doc_rows, dtype=np.int64)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        tfs = np.asarray(tfs, dtype=np.int64)
+        doc_starts = np.searchsorted(doc_rows, np.arange(len(doc_ids) + 1))
+
+        with self._lock:
+            bulk = not self._doc_ids and len(set(doc_ids)) == len(doc_ids)
+            if bulk:
+                self._load_postings_locked(doc_ids, terms, doc_rows, term_ids, tfs, doc_starts)
+        if bulk:
+            return
+
+        for row, doc_id in enumerate(doc_ids):
+            start, end = doc_starts[row], doc_starts[row + 1]
+            self.add_counts(doc_id, {
+                terms[term_id]: int(tf) for term_id, tf in zip(term_ids[start:end], tfs[start:end])
+            })
+
+    def remove(self, doc_id: str):
+        """Remove a document from the index"""
+        with self._lock:
+            if doc_id in self._ordinals:
+                self._remove_locked(doc_id)
+                self._idf_cache = None
+
+    def set_background(self, num_docs: int, total_length: int, doc_freq: Dict[str, int]):
+        """Corpus statistics of documents held outside this index
+
+        They join N, the average document length and each term's document
+        frequency, so scores here and over those documents are comparable.
+        """
+        with self._lock:
+            self._background_docs = num_docs
+            self._background_length = total_length
+            self._background_df = dict(doc_freq)
+            self._idf_cache = None
+
+    def search(self, query: str, k: int,
+               doc_ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """Top-k documents for a raw query string"""
+        return self.top_k(self.tokenizer(query), k, doc_ids=doc_ids)
+
+    def top_k(self, query_tokens: List[str], k: int, prune: bool = True,
+              doc_ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """Top-k (doc_id, score) pairs with a positive BM25 score
+
+        With prune=True, terms are processed in decreasing order of their
+        score upper bound and documents that cannot reach the current k-th
+        score are never added to the accumulators (MaxScore). doc_ids limits
+        the candidates to those documents; corpus statistics are unchanged.
+        """
+        if k <= 0:
+            return []
+
+        query_counts: Dict[str, int] = {}
+        for token in query_tokens:
+            query_counts[token] = query_counts.get(token, 0) + 1
+
+        terms, indexed_ids = self._gather(query_counts, doc_ids)
+        if not terms:
+            return []
+
+        # Negative-weight terms first, so accumulated scores are never
+        # lowered after pruning starts; then the highest upper bound first
+        # so the pruning threshold rises quickly
+        terms.sort(key=lambda t: (t[1] < 0, t[0]), reverse=True)
+        remaining = sum(t[0] for t in terms)
+
+        acc_ids = np.empty(0, dtype=np.int64)
+        acc_scores = np.empty(0, dtype=np.float64)
+        threshold = -math.inf
+
+        for upper_bound, weight, ords, tfs, norms, _ in terms:
+            if prune and len(acc_ids) >= k and remaining < threshold:
+                # Unseen documents cannot reach the top-k: only update
+                # documents that are already candidates
+                pos = np.searchsorted(acc_ids, ords)
+                pos[pos >= len(acc_ids)] = 0
+                hit = acc_ids[pos] == ords
+                acc_scores[pos[hit]] += self._term_scores(weight, tfs[hit], norms[hit])
+            else:
+                ids = np.concatenate([acc_ids, ords])
+                scores = np.concatenate([acc_scores, self._term_scores(weight, tfs, norms)])
+                acc_ids, inverse = np.unique(ids, return_inverse=True)
+                acc_scores = np.bincount(inverse, weights=scores, minlength=len(acc_ids))
+
+            remaining -= upper_bound
+            if len(acc_scores) >= k:
+                threshold = np.partition(acc_scores, len(acc_scores) - k)[len(acc_scores) - k]
+
+        positive = acc_scores > 0
+        acc_ids = acc_ids[positive]
+        acc_scores = acc_scores[positive]
+
+        # Highest score first; ties go to the most recently indexed document
+        order = np.lexsort((-acc_ids, -acc_scores))[:k]
+        return [(indexed_ids[acc_ids[i]], float(acc_scores[i])) for i in order]
+
+    def search_many(self, queries: List[str], k: int,
+                    doc_ids: Optional[Collection[str]] = None) -> List[List[Tuple[str, float]]]:
+        """Top-k documents for each of several raw query strings"""
+        return self.top_k_many([self.tokenizer(query) for query in queries], k, doc_ids)
+
+    def top_k_many(self, queries: List[List[str]], k: int,
+                   doc_ids: Optional[Collection[str]] = None) -> List[List[Tuple[str, float]]]:
+        """Top-k (doc_id, score) pairs for each tokenized query, without pruning
+
+        Postings are gathered once for the union of the query terms, and each
+        group of queries is scored into one dense (query, document) matrix.
+        """
+        results = [[] for _ in queries]
+        if k <= 0:
+            return results
+
+        query_counts = []
+        for tokens in queries:
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            query_counts.append(counts)
+
+        union = {term: 1 for counts in query_counts for term in counts}
+        terms, indexed_ids = self._gather(union, doc_ids)
+        by_term = {term: (idf, ords, tfs, norms) for _, idf, ords, tfs, norms, term in terms}
+        span = len(indexed_ids)
+        rows = max(1, self.MAX_SCORE_CELLS // max(span, 1))
+
+        for start in range(0, len(queries), rows):
+            group = query_counts[start:start + rows]
+            keys, scores = [], []
+            for row, counts in enumerate(group):
+                for term, count in counts.items():
+                    if term in by_term:
+                        idf, ords, tfs, norms = by_term[term]
+                        keys.append(ords + row * span)
+                        scores.append(self._term_scores(idf * count, tfs, norms))
+            if not keys:
+                continue
+
+            dense = np.bincount(np.concatenate(keys), weights=np.concatenate(scores),
+                                minlength=len(group) * span).reshape(len(group), span)
+            # k-th best score per query; ties at the boundary are resolved below
+            if span > k:
+                kth = -np.partition(-dense, k - 1, axis=1)[:, k - 1]
+            else:
+                kth = np.zeros(len(group))
+            for row in range(len(group)):
+                candidates = np.flatnonzero((dense[row] >= kth[row]) & (dense[row] > 0))
+                candidate_scores = dense[row, candidates]
+                # Highest score first; ties go to the most recently indexed document
+                order = np.lexsort((-candidates, -candidate_scores))[:k]
+                results[start + row] = [
+                    (indexed_ids[candidates[i]], float(candidate_scores[i])) for i in order
+                ]
+        return results
+
+    def doc_terms(self, doc_id: str) -> Dict[str, int]:
+        """Stored term frequencies for an indexed document"""
+        with self._lock:
+            ordinal = self._ordinals.get(doc_id)
+            if ordinal is None:
+                return {}
+            term_ids, freqs = self._doc_terms[ordinal]
+            return {self._terms[t]: tf for t, tf in zip(term_ids, freqs)}
+
+    def idf(self, term: str) -> float:
+        """IDF of a term as used in scoring (0.0 for unknown terms)"""
+        with self._lock:
+            term_id = self._term_ids.get(term)
+            doc_freq = self._doc_freq[term_id] if term_id is not None else 0
+            if doc_freq + self._background_df.get(term, 0) == 0:
+                return 0.0
+            return self._idf_locked(term, doc_freq)
+
+    def average_length(self) -> float:
+        """Mean document length used in scoring, background included"""
+        with self._lock:
+            num_docs = len(self._ordinals) + self._background_docs
+            return (self._total_length + self._background_length) / num_docs if num_docs else 0.0
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by postings and per-document arrays"""
+        postings = sum(o.itemsize * len(o) + t.itemsize * len(t) for o, t in self._postings)
+        forward = sum(o.itemsize * len(o) + t.itemsize * len(t)
+                      for o, t in filter(None, self._doc_terms))
+        return postings + forward + self._doc_lengths.nbytes + self._live.nbytes
+
+    # Internal helpers
+    def _gather(self, query_counts: Dict[str, int], doc_ids: Optional[Collection[str]] = None):
+        """Snapshot postings, weights and upper bounds for the query terms
+
+        With doc_ids, postings of every other document are left out.
+        """
+        with self._lock:
+            if not self._ordinals:
+                return [], []
+            num_docs = len(self._ordinals) + self._background_docs
+            avgdl = (self._total_length + self._background_length) / num_docs
+            k1, b = self.k1, self.b
+
+            allowed = None
+            if doc_ids is not None:
+                allowed = np.zeros(len(self._doc_ids), dtype=bool)
+                allowed[[self._ordinals[d] for d in doc_ids if d in self._ordinals]] = True
+
+            terms = []
+            for term, count in query_counts.items():
+                term_id = self._term_ids.get(term)
+                if term_id is None or self._doc_freq[term_id] == 0:
+                    continue
+
+                weight = self._idf_locked(term, self._doc_freq[term_id]) * count
+                if weight == 0:
+                    continue
+
+                ords, tfs = self._postings[term_id]
+                ords = np.array(ords, dtype=np.int64)
+                tfs = np.array(tfs, dtype=np.float64)
+                if self._dead:
+                    alive = self._live[ords]
+                    ords, tfs = ords[alive], tfs[alive]
+                if allowed is not None:
+                    keep = allowed[ords]
+                    ords, tfs = ords[keep], tfs[keep]
+
+                norms = k1 * (1 - b + b * self._doc_lengths[ords] / avgdl)
+
+                # tf / (tf + norm) grows with tf and shrinks with length
+                max_tf = self._max_tf[term_id]
+                min_norm = k1 * (1 - b + b * self._min_len[term_id] / avgdl)
+                # A negative weight (epsilon floor over a negative average IDF)
+                # can only lower scores
+                upper_bound = max(weight, 0) * max_tf * (k1 + 1) / (max_tf + min_norm)
+                terms.append((upper_bound, weight, ords, tfs, norms, term))
+
+            # Compaction rebinds _doc_ids, so this list stays valid for the ordinals above
+            return terms, self._doc_ids
+
+    def _term_scores(self, weight: float, tfs: np.ndarray, norms: np.ndarray) -> np.ndarray:
+        return weight * (tfs * (self.k1 + 1) / (tfs + norms))
+
+    def _idf_locked(self, term: str, doc_freq: int) -> float:
+        num_docs = len(self._ordinals) + self._background_docs
+        doc_freq += self._background_df.get(term, 0)
+        idf = math.log(num_docs - doc_freq + 0.5) - math.log(doc_freq + 0.5)
+        if idf < 0:
+            idf = self.epsilon * self._average_idf_locked()
+        return idf
+
+    def _average_idf_locked(self) -> float:
+        """Mean raw IDF over the live vocabulary, cached per corpus change"""
+        if self._idf_cache is None:
+            num_docs = len(self._ordinals) + self._background_docs
+            df = np.array(self._doc_freq, dtype=np.float64)
+            if self._background_df:
+                # Background terms join the vocabulary, or add to a local term's frequency
+                df += [self._background_df.get(term, 0) for term in self._terms]
+                df = np.concatenate([df, np.array(
+                    [freq for term, freq in self._background_df.items() if term not in self._term_ids],
+                    dtype=np.float64
+                )])
+            df = df[df > 0]
+            idf = np.log(num_docs - df + 0.5) - np.log(df + 0.5)
+            self._idf_cache = float(idf.mean()) if len(df) else 0.0
+        return self._idf_cache
+
+    def _remove_locked(self, doc_id: str):
+        ordinal = self._ordinals.pop(doc_id)
+        term_ids, _ = self._doc_terms[ordinal]
+        for term_id in term_ids:
+            self._doc_freq[term_id] -= 1
+            if self._doc_freq[term_id] == 0:
+                self._live_terms -= 1
+
+        self._live[ordinal] = False
+        self._total_length -= int(self._doc_lengths[ordinal])
+        self._doc_terms[ordinal] = None
+        self._dead += 1
+
+        if self._dead > max(1024, len(self._ordinals)):
+            self._compact_locked()
+
+    def _compact_locked(self):
+        """Drop removed documents from the postings lists"""
+        remap = np.full(len(self._doc_ids), -1, dtype=np.int64)
+        live_ordinals = np.flatnonzero(self._live[:len(self._doc_ids)])
+        remap[live_ordinals] = np.arange(len(live_ordinals))
+
+        for term_id, (ords, tfs) in enumerate(self._postings):
+            old = np.array(ords, dtype=np.int64)
+            keep = remap[old] >= 0
+            self._postings[term_id] = (
+                array('i', remap[old[keep]].astype(np.int32).tobytes()),
+                array('i', np.array(tfs, dtype=np.int32)[keep].tobytes())
+            )
+
+        self._doc_ids = [self._doc_ids[i] for i in live_ordinals]
+        self._doc_terms = [self._doc_terms[i] for i in live_ordinals]
+        self._doc_lengths[:len(live_ordinals)] = self._doc_lengths[live_ordinals]
+        self._live[:] = False
+        self._live[:len(live_ordinals)] = True
+        self._ordinals = {doc_id: i for i, doc_id in enumerate(self._doc_ids)}
+        self._dead = 0
+
+    def _load_postings_locked(self, doc_ids: List[str], terms: List[str], doc_rows: np.ndarray,
+                              term_ids: np.ndarray, tfs: np.ndarray, doc_starts: np.ndarray):
+        """Fill an empty index; ordinals follow doc_ids and term ids follow terms"""
+        lengths = np.bincount(doc_rows, weights=tfs, minlength=len(doc_ids)).astype(np.int64)
+
+        # Postings: triples grouped by term, in document order within each term
+        by_term = np.argsort(term_ids, kind='stable')
+        term_starts = np.searchsorted(term_ids[by_term], np.arange(len(terms) + 1))
+        ords = doc_rows[by_term].astype(np.int32)
+        term_tfs = tfs[by_term].astype(np.int32)
+        doc_freq = np.diff(term_starts)
+
+        self._term_ids = {term: i for i, term in enumerate(terms)}
+        self._terms = list(terms)
+        self._postings = []
+        self._max_tf = []
+        self._min_len = []
+        for term_id in range(len(terms)):
+            start, end = term_starts[term_id], term_starts[term_id + 1]
+            self._postings.append((array('i', ords[start:end].tobytes()),
+                                   array('i', term_tfs[start:end].tobytes())))
+            self._max_tf.append(int(term_tfs[start:end].max()) if end > start else 0)
+            self._min_len.append(int(lengths[ords[start:end]].min()) if end > start else 0)
+        self._doc_freq = doc_freq.tolist()
+        self._live_terms = int(np.count_nonzero(doc_freq))
+
+        doc_terms = term_ids.astype(np.int32)
+        doc_tfs = tfs.astype(np.int32)
+        self._doc_ids = list(doc_ids)
+        self._doc_terms = [
+            (array('i', doc_terms[start:end].tobytes()), array('i', doc_tfs[start:end].tobytes()))
+            for start, end in zip(doc_starts[:-1], doc_starts[1:])
+        ]
+        self._ensure_capacity(len(doc_ids))
+        self._doc_lengths[:len(doc_ids)] = lengths
+        self._live[:len(doc_ids)] = True
+        self._ordinals = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+        self._total_length = int(lengths.sum())
+        self._idf_cache = None
+
+    def _ensure_capacity(self, size: int):
+        if size <= len(self._live):
+            return
+        capacity = max(size, 2 * len(self._live))
+        lengths = np.zeros(capacity, dtype=np.float32)
+        lengths[:len(self._doc_lengths)] = self._doc_lengths
+        live = np.zeros(capacity, dtype=bool)
+        live[:len(self._live)] = self._live
+        self._doc_lengths, self._live = lengths, live
+
+
+class FTS5KeywordIndex:
+    """Persistent keyword index on a contentless SQLite FTS5 table ranked with bm25()
+
+    The table holds only the full-text index, not a copy of each title and
+    content. Deleting a row needs the text it was indexed from: source(doc_id)
+    returns it from the caller's own storage, so callers update the index
+    before they change or delete that text. Without a source the text is
+    rebuilt from the index, which scans all of it.
+
+    Writes go through the caller's connection without committing, so the
+    index changes land in the same transaction as the document row.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, tokenizer: Callable[[str], List[str]],
+                 table: str = 'documents_fts',
+                 source: Optional[Callable[[str], Optional[Tuple[str, str]]]] = None):
+        self.conn = conn
+        self.tokenizer = tokenizer
+        self.table = table
+        self.source = source
+
+        existing = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        migrate = existing is not None and "content=''" not in existing[0].replace(' ', '')
+        if migrate:
+            # Tables created before the index went contentless store every
+            # title and content; move their rows into a contentless table
+            self.conn.execute(f"ALTER TABLE {table} RENAME TO {table}_stored")
+        self.conn.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {table}
+            USING fts5(title, content, content = '', tokenize = 'unicode61')
+        ''')
+        if migrate:
+            self.conn.execute(f'''
+                INSERT INTO {table} (rowid, title, content)
+                SELECT rowid, title, content FROM {table}_stored
+            ''')
+            self.conn.execute(f"DROP TABLE {table}_stored")
+        # FTS5 rows are keyed by integer rowid; map them to document ids
+        self.conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table}_ids (
+                fts_rowid INTEGER PRIMARY KEY,
+                doc_id TEXT NOT NULL UNIQUE
+            )
+        ''')
+        # Per-document term occurrences and per-term document counts
+        self.conn.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {table}_instances USING fts5vocab({table}, instance)
+        ''')
+        self.conn.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {table}_vocab USING fts5vocab({table}, row)
+        ''')
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {self.table}_ids").fetchone()[0]
+
+    def __contains__(self, doc_id: str) -> bool:
+        return self._rowid(doc_id) is not None
+
+    def add(self, doc_id: str, title: str, content: str):
+        """Index a document, replacing any previous version with the same id"""
+        rowid = self._rowid(doc_id)
+        if rowid is None:
+            rowid = self.conn.execute(
+                f"INSERT INTO {self.table}_ids (doc_id) VALUES (?)", (doc_id,)
+            ).lastrowid
+        else:
+            self._delete(rowid, doc_id)
+
+        self.conn.execute(
+            f"INSERT INTO {self.table} (rowid, title, content) VALUES (?, ?, ?)",
+            (rowid, title, content)
+        )
+
+    def remove(self, doc_id: str):
+        """Remove a document from the index"""
+        rowid = self._rowid(doc_id)
+        if rowid is not None:
+            self._delete(rowid, doc_id)
+            self.conn.execute(f"DELETE FROM {self.table}_ids WHERE fts_rowid = ?", (rowid,))
+
+    def search(self, query: str, k: int,
+               doc_ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """Top-k documents for a raw query string"""
+        return self.top_k(self.tokenizer(query), k, doc_ids)
+
+    def top_k(self, query_tokens: List[str], k: int,
+              doc_ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """Top-k (doc_id, score) pairs; scores are negated bm25() so higher is better
+
+        doc_ids limits the candidates to those documents.
+        """
+        terms = list(dict.fromkeys(query_tokens))
+        if not terms or k <= 0:
+            return []
+
+        # Quote every token so FTS5 never parses it as query syntax
+        match = ' OR '.join('"' + term.replace('"', '""') + '"' for term in terms)
+        restrict, params = '', (match, k)
+        if doc_ids is not None:
+            restrict = 'AND m.doc_id IN (SELECT value FROM json_each(?))'
+            params = (match, json.dumps(list(doc_ids)), k)
+        rows = self.conn.execute(f'''
+            SELECT m.doc_id, -bm25({self.table}) AS score
+            FROM {self.table} f
+            JOIN {self.table}_ids m ON m.fts_rowid = f.rowid
+            WHERE {self.table} MATCH ? {restrict}
+            ORDER BY bm25({self.table})
+            LIMIT ?
+        ''', params).fetchall()
+
+        return [(doc_id, float(score)) for doc_id, score in rows if score > 0]
+
+    def search_many(self, queries: List[str], k: int,
+                    doc_ids: Optional[Collection[str]] = None) -> List[List[Tuple[str, float]]]:
+        """Top-k documents for each query; FTS5 runs one MATCH per query"""
+        return [self.search(query, k, doc_ids) for query in queries]
+
+    def doc_terms(self, doc_id: str) -> Dict[str, int]:
+        """Term frequencies in an indexed document's content column"""
+        rowid = self._rowid(doc_id)
+        if rowid is None:
+            return {}
+        return dict(self.conn.execute(f'''
+            SELECT term, COUNT(*) FROM {self.table}_instances
+            WHERE doc = ? AND col = 'content' GROUP BY term
+        ''', (rowid,)).fetchall())
+
+    def idf(self, term: str) -> float:
+        """IDF of a term as bm25() computes it (0.0 for unknown terms)"""
+        row = self.conn.execute(
+            f"SELECT doc FROM {self.table}_vocab WHERE term = ?", (term,)
+        ).fetchone()
+        if row is None:
+            return 0.0
+        num_docs = len(self)
+        return max(math.log((num_docs - row[0] + 0.5) / (row[0] + 0.5)), 1e-6)
+
+    def _delete(self, rowid: int, doc_id: str):
+        """Remove a row's entries; a contentless table needs the indexed text back"""
+        text = self.source(doc_id) if self.source is not None else None
+        if text is None:
+            text = self._indexed_text(rowid)
+        self.conn.execute(
+            f"INSERT INTO {self.table} ({self.table}, rowid, title, content) VALUES ('delete', ?, ?, ?)",
+            (rowid, *text)
+        )
+
+    def _indexed_text(self, rowid: int) -> Tuple[str, str]:
+        """Title and content that tokenize to a row's indexed terms, in order"""
+        columns = {'title': [], 'content': []}
+        for term, col in self.conn.execute(f'''
+            SELECT term, col FROM {self.table}_instances WHERE doc = ? ORDER BY col, offset
+        ''', (rowid,)):
+            columns[col].append(term)
+        return ' '.join(columns['title']), ' '.join(columns['content'])
+
+    def _rowid(self, doc_id: str) -> Optional[int]:
+        row = self.conn.execute(
+            f"SELECT fts_rowid FROM {self.table}_ids WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        return row[0] if row else None
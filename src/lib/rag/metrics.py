@@ -0,0 +1,128 @@
+"""
+Latency metrics for the Banking Risk RAG system
+Per-stage timers aggregated into histograms, exported in Prometheus text format
+"""
+
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe store of stage histograms and gauges"""
+
+    def __init__(self, namespace: str = 'banking_rag'):
+        self.namespace = namespace
+        self._histograms: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, Tuple[str, Callable]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        """Record one duration for a pipeline stage"""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str, timings: Optional[Dict[str, float]] = None):
+        """Time a block; optionally also record milliseconds into timings"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(stage, elapsed)
+            if timings is not None:
+                timings[stage] = timings.get(stage, 0.0) + elapsed * 1000.0
+
+    def mean(self, stage: str, default: float = 0.0) -> float:
+        """Mean observed seconds for a stage, default before any observation"""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            return histogram.sum / histogram.count if histogram and histogram.count else default
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], object]):
+        """Register a gauge evaluated at export time
+
+        The callback returns either a number or a dict mapping label tuples,
+        e.g. (('cache', 'cursor'),), to numbers.
+        """
+        with self._lock:
+            self._gauges[name] = (help_text, callback)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Count, sum and buckets per stage"""
+        with self._lock:
+            return {
+                stage: {'count': h.count, 'sum': h.sum, 'buckets': list(h.counts)}
+                for stage, h in self._histograms.items()
+            }
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        name = f'{self.namespace}_stage_duration_seconds'
+        lines = [
+            f'# HELP {name} Time spent in each search pipeline stage',
+            f'# TYPE {name} histogram'
+        ]
+
+        with self._lock:
+            for stage in sorted(self._histograms):
+                histogram = self._histograms[stage]
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+            gauges = dict(self._gauges)
+
+        for gauge_name in sorted(gauges):
+            help_text, callback = gauges[gauge_name]
+            full_name = f'{self.namespace}_{gauge_name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} gauge')
+
+            value = callback()
+            if isinstance(value, dict):
+                for labels, sample in sorted(value.items()):
+                    label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                    lines.append(f'{full_name}{{{label_text}}} {float(sample)}')
+            else:
+                lines.append(f'{full_name} {float(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        """Atomically write the metrics file (for node_exporter's textfile collector)"""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
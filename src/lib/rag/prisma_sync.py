@@ -0,0 +1,190 @@
+"""
+Incremental sync from the app's Prisma database into the Banking Risk RAG system
+Reads the documents table in keyset-paginated pages past a persisted
+(updatedAt, id) high-water mark, so each run costs time proportional to the
+documents changed since the last one. Deactivated documents are removed
+from the RAG system as their change is synced; deleted ones are found by
+comparing ids with those this source has synced.
+"""
+
+import sqlite3
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_APP_DB = 'prisma/dev.db'
+
+
+class PrismaSync:
+    """Sync changed Prisma documents into a BankingRiskRAG instance"""
+
+    def __init__(self, rag, app_db_path: str = DEFAULT_APP_DB, page_size: int = 200,
+                 source: str = 'prisma_documents'):
+        self.rag = rag
+        self.app_db_path = app_db_path
+        self.page_size = page_size
+        self.source = source
+        self.app_conn = sqlite3.connect(app_db_path)
+        self.app_conn.row_factory = sqlite3.Row
+
+        columns = {row[1] for row in self.app_conn.execute('PRAGMA table_info(documents)')}
+        if not columns:
+            raise ValueError(f"No documents table in {app_db_path}")
+        # isProcessed/processedAt only exist once add-rag-fields.sql has been applied
+        self.can_mark_processed = {'isProcessed', 'processedAt'} <= columns
+
+        self.rag.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                source TEXT PRIMARY KEY,
+                updated_at,
+                last_id TEXT,
+                synced_at TIMESTAMP
+            )
+        ''')
+        # Documents this source indexed, so deletions in the app can be found
+        self.rag.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_documents (
+                source TEXT,
+                doc_id TEXT,
+                PRIMARY KEY (source, doc_id)
+            )
+        ''')
+        self.rag.conn.commit()
+
+    def watermark(self) -> Optional[Tuple]:
+        """Last synced (updatedAt, id), or None before the first sync"""
+        row = self.rag.conn.execute(
+            'SELECT updated_at, last_id FROM sync_state WHERE source = ?', (self.source,)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def reset(self):
+        """Forget the watermark so the next run re-reads every document"""
+        self.rag.conn.execute('DELETE FROM sync_state WHERE source = ?', (self.source,))
+        self.rag.conn.commit()
+
+    def run(self, max_pages: Optional[int] = None) -> Dict:
+        """Process every page changed since the watermark, then remove deleted documents"""
+        stats = {'processed': 0, 'skipped': 0, 'reused': 0, 'removed': 0, 'pages': 0}
+
+        while max_pages is None or stats['pages'] < max_pages:
+            rows = self._fetch_page(self.watermark())
+            if not rows:
+                break
+
+            batch, inactive = [], []
+            for row in rows:
+                if not row['isActive']:
+                    stats['skipped'] += 1
+                    inactive.append(row['id'])
+                    continue
+                batch.append((row['id'], row['title'], self._document_text(row)))
+
+            if batch:
+                docs = self.rag.process_documents(batch)
+                stats['processed'] += len(docs)
+                stats['reused'] += sum(1 for doc in docs if doc.reused_from)
+                self._track([doc_id for doc_id, _, _ in batch])
+                self._mark_processed([doc_id for doc_id, _, _ in batch], rows[-1]['updatedAt'])
+            if inactive:
+                # Deactivated since they were indexed
+                stats['removed'] += self._remove(inactive)
+
+            # Saved after the page is committed; a crash before this point
+            # replays the page, which the dedup checks make cheap
+            self._save_watermark(rows[-1]['updatedAt'], rows[-1]['id'])
+            stats['pages'] += 1
+            logging.info(f"Synced page {stats['pages']}: {len(batch)} documents")
+
+            if len(rows) < self.page_size:
+                break
+
+        stats['removed'] += self.remove_deleted()
+        watermark = self.watermark()
+        stats['watermark'] = {'updated_at': watermark[0], 'id': watermark[1]} if watermark else None
+        return stats
+
+    def remove_deleted(self) -> int:
+        """Remove synced documents that no longer exist in the app database
+
+        Reads ids only. Documents synced before ids were tracked are picked up
+        by the next full sync.
+        """
+        app_ids = {row[0] for row in self.app_conn.execute('SELECT id FROM documents')}
+        deleted = [
+            doc_id for (doc_id,) in self.rag.conn.execute(
+                'SELECT doc_id FROM sync_documents WHERE source = ?', (self.source,)
+            )
+            if doc_id not in app_ids
+        ]
+        return self._remove(deleted) if deleted else 0
+
+    def close(self):
+        self.app_conn.close()
+
+    def _fetch_page(self, watermark: Optional[Tuple]) -> List[sqlite3.Row]:
+        columns = 'id, title, description, tags, content, isActive, updatedAt'
+        if watermark is None:
+            return self.app_conn.execute(
+                f'SELECT {columns} FROM documents ORDER BY updatedAt, id LIMIT ?',
+                (self.page_size,)
+            ).fetchall()
+
+        updated_at, last_id = watermark
+        return self.app_conn.execute(f'''
+            SELECT {columns} FROM documents
+            WHERE updatedAt > ? OR (updatedAt = ? AND id > ?)
+            ORDER BY updatedAt, id
+            LIMIT ?
+        ''', (updated_at, updated_at, last_id, self.page_size)).fetchall()
+
+    @staticmethod
+    def _document_text(row: sqlite3.Row) -> str:
+        """Extracted content, or the metadata Prisma has when extraction hasn't run"""
+        if row['content']:
+            return row['content']
+        return '\n'.join(part for part in (row['title'], row['description'], row['tags']) if part)
+
+    def _mark_processed(self, doc_ids: List[str], like: object):
+        if not self.can_mark_processed:
+            return
+
+        # Prisma stores DateTime as epoch milliseconds or ISO text depending on
+        # version; write processedAt in whichever form updatedAt uses
+        now = datetime.now(timezone.utc)
+        if isinstance(like, (int, float)):
+            processed_at = int(now.timestamp() * 1000)
+        else:
+            processed_at = now.strftime('%Y-%m-%dT%H:%M:%S.') + f'{now.microsecond // 1000:03d}Z'
+
+        placeholders = ','.join('?' * len(doc_ids))
+        self.app_conn.execute(
+            f'UPDATE documents SET isProcessed = 1, processedAt = ? WHERE id IN ({placeholders})',
+            [processed_at] + doc_ids
+        )
+        self.app_conn.commit()
+
+    def _track(self, doc_ids: List[str]):
+        self.rag.conn.executemany(
+            'INSERT OR IGNORE INTO sync_documents (source, doc_id) VALUES (?, ?)',
+            [(self.source, doc_id) for doc_id in doc_ids]
+        )
+        self.rag.conn.commit()
+
+    def _remove(self, doc_ids: List[str]) -> int:
+        """Remove documents from the RAG system and stop tracking them"""
+        removed = self.rag.remove_documents(doc_ids)
+        self.rag.conn.executemany(
+            'DELETE FROM sync_documents WHERE source = ? AND doc_id = ?',
+            [(self.source, doc_id) for doc_id in doc_ids]
+        )
+        self.rag.conn.commit()
+        logging.info(f"Removed {removed} deactivated or deleted documents")
+        return removed
+
+    def _save_watermark(self, updated_at, last_id: str):
+        self.rag.conn.execute('''
+            INSERT OR REPLACE INTO sync_state (source, updated_at, last_id, synced_at)
+            VALUES (?, ?, ?, ?)
+        ''', (self.source, updated_at, last_id, datetime.now()))
+        self.rag.conn.commit()
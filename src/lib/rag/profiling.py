@@ -0,0 +1,106 @@
+"""
+On-demand profiling for the Banking Risk RAG system
+Captures a cProfile CPU profile and tracemalloc allocation statistics for one call
+"""
+
+import os
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from typing import Dict, Iterable, List, Optional
+
+_profiling = threading.local()
+
+
+def active() -> bool:
+    """Whether a CallProfiler is running on this thread
+
+    cProfile only traces the thread that enabled it, so work that would be
+    handed to a pool should run inline while this is true.
+    """
+    return getattr(_profiling, 'depth', 0) > 0
+
+
+class CallProfiler:
+    """Profile a block of code and summarise where time and memory went
+
+    The CPU profile is written as a .pstats file, which snakeviz, tuna and
+    flameprof can render as a flame graph.
+    """
+
+    def __init__(self, label: str, output_dir: str = '.', top_n: int = 15,
+                 focus_files: Optional[Iterable[str]] = None):
+        self.label = label
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.focus_files = {os.path.realpath(f) for f in (focus_files or [])}
+        self.report: Dict = {}
+        self._profiler = cProfile.Profile()
+        self._started_tracemalloc = False
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        _profiling.depth = getattr(_profiling, 'depth', 0) + 1
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profiler.disable()
+        _profiling.depth -= 1
+        wall_ms = (time.perf_counter() - self._start) * 1000.0
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        path = os.path.join(self.output_dir, f'rag-{self.label}-{stamp}-{os.getpid()}.pstats')
+        self._profiler.dump_stats(path)
+
+        stats = pstats.Stats(self._profiler)
+        self.report = {
+            'pstats_file': os.path.abspath(path),
+            'wall_ms': round(wall_ms, 3),
+            'peak_traced_kb': round(peak / 1024.0, 1),
+            'hot_functions': self._hot_functions(stats, self.focus_files),
+            'top_functions': self._hot_functions(stats, None),
+            'top_allocations': self._top_allocations(snapshot)
+        }
+        return False
+
+    def _hot_functions(self, stats: pstats.Stats, files: Optional[set]) -> List[Dict]:
+        """Functions by cumulative time, optionally limited to some source files"""
+        rows = []
+        for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+            if files is not None and os.path.realpath(filename) not in files:
+                continue
+            rows.append({
+                'function': name,
+                'location': f'{os.path.basename(filename)}:{line}',
+                'calls': calls,
+                'total_ms': round(total * 1000.0, 3),
+                'cumulative_ms': round(cumulative * 1000.0, 3)
+            })
+        rows.sort(key=lambda r: r['cumulative_ms'], reverse=True)
+        return rows[:self.top_n]
+
+    def _top_allocations(self, snapshot: tracemalloc.Snapshot) -> List[Dict]:
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>')
+        ])
+        return [
+            {
+                'location': f'{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}',
+                'size_kb': round(stat.size / 1024.0, 1),
+                'count': stat.count
+            }
+            for stat in snapshot.statistics('lineno')[:self.top_n]
+        ]
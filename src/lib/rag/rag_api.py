@@ -4,12 +4,23 @@ API wrapper for the Banking Risk RAG system
 Provides a command-line interface for the Next.js app to interact with
 """
 
+import os
 import sys
 import json
+import mmap
+import random
 import argparse
-from typing import Dict, List, Optional
+import time
+import threading
+from contextlib import nullcontext
+from functools import partial
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Iterator, List, Optional, Tuple
 import logging
 
+# Before the model import, so a CLI deadline is charged for start-up and loading
+PROCESS_STARTED = time.time()
+
 # Set up logging
 logging.basicConfig(level=logging.ERROR, format='%(message)s', stream=sys.stderr)
 
@@ -17,66 +28,181 @@ try:
     from banking_risk_model import BankingRiskRAG, RiskLevel
 except ImportError:
     # For development, add the current directory to path
-    import os
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     from banking_risk_model import BankingRiskRAG, RiskLevel
 
+from metrics import MetricsRegistry
+from profiling import CallProfiler
+from prisma_sync import PrismaSync, DEFAULT_APP_DB
+from job_queue import JobQueue, IngestWorkers, QueueFullError
+from collection_manager import CollectionManager
+from deadline import Deadline, DEGRADATION_ORDER
+from cursor_cache import CursorCache, CursorExpired
+from alert_rules import AlertRules
+from rescore import Rescorer
+from snapshot import SNAPSHOT_FORMATS, export_snapshot, import_snapshot
+from serialization import FORMATS, DOCUMENT_FIELDS, RESULT_FIELDS, encode, parse_fields, write
+from time_partitions import WINDOWS
+
+# Retrieval stages timed inside BankingRiskRAG.search
+SEARCH_STAGES = ('query_analysis', 'embedding', 'faiss_search', 'keyword_search', 'fusion')
+
+# How each projectable document field is read from a RiskDocument
+RESULT_DOCUMENT_VALUES = {
+    'id': lambda document: document.id,
+    'title': lambda document: document.title,
+    'content': lambda document: document.content[:500],  # Truncate for response
+    'risk_level': lambda document: document.risk_level.value,
+    'compliance_tags': lambda document: [ct.value for ct in document.compliance_tags],
+    'risk_scores': lambda document: document.risk_scores
+}
+
 class BankingRiskAPI:
     """API wrapper for banking risk RAG system"""
     
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(self, model_path: Optional[str] = None, keyword_backend: str = 'memory',
+                 collections_dir: str = 'rag_collections', memory_budget_mb: float = 1024.0,
+                 content_codec: str = 'zlib', search_threads: int = 3,
+                 intra_op_threads: Optional[int] = None, cursor_pages: int = 1,
+                 cursor_ttl: float = 300.0, alert_rules: Optional[str] = None,
+                 query_layers: Optional[int] = None, query_exit_threshold: Optional[float] = None,
+                 partition_window: Optional[str] = None, hot_partitions: int = 2):
+        # Serialises RAG access between request handling and ingestion workers
+        self.lock = threading.RLock()
+        self.jobs: Optional[JobQueue] = None
+        self.model_swap: Dict = {'state': 'idle'}
+        self.degraded = dict.fromkeys(DEGRADATION_ORDER, 0)
+        # Pages of candidates fused up front and cached behind next_cursor
+        self.cursor_pages = cursor_pages
+        self.cursors = CursorCache(cursor_ttl)
+        # A broken rules file is a configuration error, not a reason for mock mode
+        rules = AlertRules.load(alert_rules)
         try:
-            self.rag = BankingRiskRAG(model_path)
+            self.rag = BankingRiskRAG(model_path, keyword_backend=keyword_backend,
+                                      content_codec=content_codec, search_threads=search_threads,
+                                      intra_op_threads=intra_op_threads, alert_rules=rules,
+                                      query_layers=query_layers,
+                                      query_exit_threshold=query_exit_threshold,
+                                      partition_window=partition_window, hot_partitions=hot_partitions)
         except Exception as e:
             logging.error(f"Failed to initialize RAG system: {e}")
             # Fallback to mock mode for development
             self.rag = None
             self.mock_mode = True
+            self.metrics = MetricsRegistry()
         else:
             self.mock_mode = False
+            self.metrics = self.rag.metrics
+            # Stored documents are searchable from the first call, like a collection's
+            loaded = self.rag.load_from_database()
+            logging.info(f"Loaded {loaded} stored documents")
+            self.metrics.gauge('cache_entries', 'Entries held per cache', lambda: {
+                (('cache', 'cursor'),): len(self.cursors)
+            })
+            self.metrics.gauge('cache_lookups_total', 'Cache lookups by outcome', lambda: {
+                (('cache', 'cursor'), ('outcome', 'hit')): self.cursors.hits,
+                (('cache', 'cursor'), ('outcome', 'miss')): self.cursors.misses
+            })
+            self.metrics.gauge(
+                'search_degraded_total', 'Searches that skipped a stage to meet their deadline',
+                lambda: {(('stage', stage),): count for stage, count in self.degraded.items()}
+            )
+            # Collections share the default instance's encoder and search pool
+            # rather than loading or starting their own
+            self.collections = CollectionManager(
+                lambda db_path: BankingRiskRAG(keyword_backend=keyword_backend, db_path=db_path,
+                                               model=self.rag.model, content_codec=content_codec,
+                                               search_threads=search_threads,
+                                               intra_op_threads=intra_op_threads,
+                                               search_pool=self.rag.search_pool,
+                                               alert_rules=rules, query_layers=query_layers,
+                                               query_exit_threshold=query_exit_threshold,
+                                               partition_window=partition_window,
+                                               hot_partitions=hot_partitions),
+                collections_dir, memory_budget_mb, self.metrics
+            )
     
-    def search(self, query: str, filters: Optional[Dict] = None, top_k: int = 10) -> Dict:
-        """Perform risk-aware search"""
+    def search(self, query: str, filters: Optional[Dict] = None, top_k: int = 10,
+               include_timings: bool = False, collections: Optional[List[str]] = None,
+               deadline_ms: Optional[float] = None, cursor: Optional[str] = None,
+               fields: Optional[Tuple[str, ...]] = None,
+               started_at: Optional[float] = None) -> Dict:
+        """Perform risk-aware search, across the named collections if any are given
+        
+        With deadline_ms, optional stages are skipped to stay within the budget
+        and listed in the response as skipped_stages; the budget runs from
+        started_at (a time.time() value) when given, otherwise from now.
+        Results come top_k at a time; passing back next_cursor serves the
+        following page from the cached ranking, with no model or index work,
+        until the corpus changes or the cursor's TTL passes. fields limits each
+        result to those fields.
+        """
         try:
             if self.mock_mode:
                 return self._mock_search(query, filters, top_k)
             
-            # Perform actual search
-            results = self.rag.search(query, filters, top_k)
+            timings = {}
+            deadline = Deadline(deadline_ms, self.metrics, started_at)
+            # The summary is the first thing given up, before retrieval degrades
+            if not deadline.allows(*SEARCH_STAGES, 'summary'):
+                deadline.skip('summary')
             
-            # Get risk alerts for top documents
-            alerts = []
-            for result in results[:3]:
-                doc_alerts = self._get_document_alerts(result['document'])
-                alerts.extend(doc_alerts)
-            
-            # Generate summary
-            documents = [r['document'] for r in results]
-            summary = self.rag.generate_risk_summary(documents)
+            with self.metrics.timer('search', timings):
+                if cursor:
+                    key, offset = CursorCache.decode(cursor)
+                    with self.lock:
+                        candidates = self.cursors.get(key, self._generation)
+                else:
+                    scope = tuple(collections or ())
+                    pool = top_k * self.cursor_pages
+                    with self.lock:
+                        # Perform actual search
+                        if scope:
+                            candidates = self.collections.search(query, list(scope), filters, pool,
+                                                                 timings, deadline)
+                        else:
+                            candidates = self.rag.search(query, filters, pool, timings=timings,
+                                                         deadline=deadline)
+                        key = self.cursors.put(candidates, scope, self._generation(scope))
+                    offset = 0
+                results = candidates[offset:offset + top_k]
+                
+                # Get risk alerts for top documents
+                with self.metrics.timer('alerts', timings):
+                    alerts = self._get_document_alerts([r['document'] for r in results[:3]])
+                
+                # Generate summary
+                documents = [r['document'] for r in results]
+                if 'summary' in deadline.skipped or not deadline.allows('summary'):
+                    deadline.skip('summary')
+                    summary = None
+                else:
+                    with self.metrics.timer('summary', timings):
+                        summary = self.rag.generate_risk_summary(documents)
             
             # Format response
             response = {
-                'results': [
-                    {
-                        'document': {
-                            'id': r['document'].id,
-                            'title': r['document'].title,
-                            'content': r['document'].content[:500],  # Truncate for response
-                            'risk_level': r['document'].risk_level.value,
-                            'compliance_tags': [ct.value for ct in r['document'].compliance_tags],
-                            'risk_scores': r['document'].risk_scores
-                        },
-                        'score': r['score'],
-                        'risk_relevance': r.get('risk_relevance', False)
-                    }
-                    for r in results
-                ],
+                'results': [self._format_result(r, fields) for r in results],
                 'summary': summary,
-                'alerts': alerts
+                'alerts': alerts,
+                'next_cursor': (
+                    CursorCache.encode(key, offset + top_k) if offset + top_k < len(candidates) else None
+                )
             }
             
+            if include_timings:
+                response['timings'] = {stage: round(ms, 3) for stage, ms in timings.items()}
+            if deadline_ms is not None:
+                response['skipped_stages'] = [
+                    stage for stage in DEGRADATION_ORDER if stage in deadline.skipped
+                ]
+                for stage in response['skipped_stages']:
+                    self.degraded[stage] += 1
+            
             return response
             
+        except CursorExpired as e:
+            return {'results': [], 'summary': None, 'alerts': [], 'error': str(e), 'cursor_expired': True}
         except Exception as e:
             logging.error(f"Search error: {e}")
             return {
@@ -89,53 +215,288 @@ class BankingRiskAPI:
                 }]
             }
     
-    def process_document(self, doc_id: str, title: str, content: str) -> Dict:
-        """Process a new document"""
+    def similar(self, doc_id: str, filters: Optional[Dict] = None, top_k: int = 10,
+                collection: Optional[str] = None, fields: Optional[Tuple[str, ...]] = None) -> Dict:
+        """Documents most like a stored one, excluding it, with no encoder pass"""
         try:
             if self.mock_mode:
-                return self._mock_process_document(doc_id, title, content)
+                return self._mock_search(doc_id, filters, top_k)
             
-            doc = self.rag.process_document(doc_id, title, content)
+            with self.metrics.timer('similar'), self.lock:
+                rag = self.collections.get(collection) if collection else self.rag
+                results = rag.similar(doc_id, filters or {}, top_k)
             
             return {
-                'success': True,
-                'document': {
-                    'id': doc.id,
-                    'title': doc.title,
-                    'risk_level': doc.risk_level.value,
-                    'compliance_tags': [ct.value for ct in doc.compliance_tags],
-                    'risk_scores': doc.risk_scores
-                }
+                'source_id': doc_id,
+                'results': [self._format_result(r, fields) for r in results]
             }
             
         except Exception as e:
-            logging.error(f"Document processing error: {e}")
-            return {
-                'success': False,
-                'error': str(e)
+            logging.error(f"Similar search error: {e}")
+            return {'source_id': doc_id, 'results': [], 'error': str(e)}
+    
+    def search_many(self, queries: List[str], filters: Optional[Dict] = None, top_k: int = 10,
+                    batch_size: int = 64, fields: Optional[Tuple[str, ...]] = None) -> Iterator[Dict]:
+        """Search for many queries at once, yielding one response per query in order
+        
+        Queries are embedded, vector-searched and keyword-scored a batch at a
+        time; the lock is only held while a response is being computed.
+        """
+        if self.mock_mode:
+            for query in queries:
+                yield {'query': query, **self._mock_search(query, filters, top_k)}
+            return
+        
+        batches = self.rag.search_many(queries, filters, top_k, batch_size)
+        for position, query in enumerate(queries):
+            try:
+                with self.lock, self.metrics.timer('search_many'):
+                    results = next(batches)
+                    documents = [r['document'] for r in results]
+                    alerts = self._get_document_alerts(documents[:3])
+                    summary = self.rag.generate_risk_summary(documents)
+            except Exception as e:
+                logging.error(f"Batch search error: {e}")
+                # The remaining queries would hit the same failure
+                for failed in queries[position:]:
+                    yield {'query': failed, 'results': [], 'summary': None, 'alerts': [], 'error': str(e)}
+                return
+            
+            yield {
+                'query': query,
+                'results': [self._format_result(r, fields) for r in results],
+                'summary': summary,
+                'alerts': alerts
             }
     
-    def _get_document_alerts(self, document) -> List[Dict]:
-        """Get alerts for a specific document"""
-        alerts = []
+    @staticmethod
+    def _format_result(result: Dict, fields: Optional[Tuple[str, ...]] = None) -> Dict:
+        """Response entry for a search result, built from only the requested fields"""
+        fields = fields or DOCUMENT_FIELDS + RESULT_FIELDS
+        document = result['document']
+        formatted = {'document': {
+            field: RESULT_DOCUMENT_VALUES[field](document) for field in fields
+            if field in RESULT_DOCUMENT_VALUES
+        }}
+        if 'score' in fields:
+            formatted['score'] = result['score']
+        if 'risk_relevance' in fields:
+            formatted['risk_relevance'] = result.get('risk_relevance', False)
+        if 'collection' in fields and 'collection' in result:
+            formatted['collection'] = result['collection']
+        return formatted
+    
+    def _generation(self, scope: tuple):
+        """Corpus generation of the default index or of each collection in scope"""
+        if not scope:
+            return self.rag.generation
+        return tuple((name, self.collections.generation(name)) for name in scope)
+    
+    def process_document(self, doc_id: str, title: str, content: str,
+                         collection: Optional[str] = None) -> Dict:
+        """Process a new document"""
+        return self.process_documents([(doc_id, title, content)], collection)[0]
+    
+    def process_documents(self, documents: List, collection: Optional[str] = None) -> List[Dict]:
+        """Process (doc_id, title, content) tuples in one batch"""
+        try:
+            if self.mock_mode:
+                return [self._mock_process_document(*document) for document in documents]
+            
+            with self.lock:
+                if collection:
+                    docs = self.collections.process_documents(collection, documents)
+                else:
+                    docs = self.rag.process_documents(documents)
+            
+            return [
+                {
+                    'success': True,
+                    'document': {
+                        'id': doc.id,
+                        'title': doc.title,
+                        'risk_level': doc.risk_level.value,
+                        'compliance_tags': [ct.value for ct in doc.compliance_tags],
+                        'risk_scores': doc.risk_scores
+                    },
+                    'reused_from': doc.reused_from
+                }
+                for doc in docs
+            ]
+            
+        except Exception as e:
+            logging.error(f"Document processing error: {e}")
+            return [{'success': False, 'error': str(e)} for _ in documents]
+    
+    def compact(self) -> Dict:
+        """Compress content stored before compression and reclaim the space"""
+        if self.mock_mode:
+            return {'success': False, 'error': 'Compaction is unavailable in mock mode'}
         
-        if document.risk_level in [RiskLevel.HIGH, RiskLevel.CRITICAL]:
-            alerts.append({
-                'type': 'RISK_LEVEL',
-                'severity': document.risk_level.value,
-                'description': f'{document.title} has {document.risk_level.value} risk level'
-            })
+        with self.lock:
+            size_before = os.path.getsize(self.rag.db_path)
+            rewritten = self.rag.compress_stored_content()
+            self.rag.conn.execute('VACUUM')
+            size_after = os.path.getsize(self.rag.db_path)
         
-        # Check for high risk scores
-        for risk_type, score in document.risk_scores.items():
-            if score > 0.7:
-                alerts.append({
-                    'type': 'RISK_SCORE',
-                    'severity': 'HIGH',
-                    'description': f'{document.title} has high {risk_type} score ({score:.2f})'
-                })
+        return {
+            'success': True,
+            'rewritten': rewritten,
+            'size_before': size_before,
+            'size_after': size_after
+        }
+    
+    def reevaluate_alerts(self, collection: Optional[str] = None) -> Dict:
+        """Rebuild stored alerts for the corpus under the configured rules"""
+        if self.mock_mode:
+            return {'success': False, 'error': 'Alert re-evaluation is unavailable in mock mode'}
+        
+        with self.lock, self.metrics.timer('reevaluate_alerts'):
+            rag = self.collections.get(collection) if collection else self.rag
+            result = rag.reevaluate_alerts()
+        
+        result['success'] = True
+        return result
+    
+    def rescore(self, collection: Optional[str] = None, page_size: int = 500,
+                workers: Optional[int] = None, full: bool = False) -> Dict:
+        """Recompute stored risk scores with the current scoring, then the stored alerts
+        
+        Resumes an interrupted run unless full is set; embeddings, indexes and
+        model outputs are left as they are. The lock is taken a page at a
+        time, so searches carry on (seeing each page as it is committed).
+        """
+        if self.mock_mode:
+            return {'success': False, 'error': 'Rescoring is unavailable in mock mode'}
+        
+        target = self.collections.pinned(collection) if collection else nullcontext(self.rag)
+        with self.metrics.timer('rescore'), target as rag:
+            with self.lock:
+                rescorer = Rescorer(rag, page_size, workers, lock=self.lock)
+                if full:
+                    rescorer.reset()
+            result = rescorer.run()
+            # Concentration alerts depend on the scores
+            with self.lock:
+                result['alerts'] = rag.reevaluate_alerts()
+        
+        result['success'] = True
+        return result
+    
+    def export_snapshot(self, path: str, collection: Optional[str] = None,
+                        fmt: str = 'arrow') -> Dict:
+        """Write the corpus to a columnar snapshot directory"""
+        if self.mock_mode:
+            return {'success': False, 'error': 'Snapshots are unavailable in mock mode'}
+        
+        with self.metrics.timer('export_snapshot'):
+            with self.lock:
+                rag = self.collections.get(collection) if collection else self.rag
+            # Reads through its own connection, so searches carry on meanwhile
+            result = export_snapshot(rag, path, fmt)
+        
+        result['success'] = True
+        return result
+    
+    def import_snapshot(self, path: str, collection: Optional[str] = None,
+                        verify: bool = True) -> Dict:
+        """Bulk-load a snapshot into the database and indexes, with no inference"""
+        if self.mock_mode:
+            return {'success': False, 'error': 'Snapshots are unavailable in mock mode'}
+        
+        with self.lock, self.metrics.timer('import_snapshot'):
+            rag = self.collections.get(collection, create=True) if collection else self.rag
+            result = import_snapshot(rag, path, verify)
+        
+        result['success'] = True
+        return result
+    
+    def partitions(self, collection: Optional[str] = None, rebuild: bool = False) -> Dict:
+        """Freeze windows that have left the hot tier and list the partitions
+        
+        rebuild refreezes every cold window from the stored embeddings.
+        """
+        if self.mock_mode:
+            return {'success': False, 'error': 'Partitions are unavailable in mock mode'}
+        
+        with self.lock, self.metrics.timer('freeze_partitions'):
+            rag = self.collections.get(collection) if collection else self.rag
+            result = rag.freeze_partitions(rebuild)
+            result['partitions'] = rag.describe_partitions()
+        
+        result['success'] = True
+        return result
+    
+    def list_collections(self) -> Dict:
+        if self.mock_mode:
+            return {'success': True, 'collections': []}
+        return {
+            'success': True,
+            'collections': self.collections.list(),
+            'memory_bytes': self.collections.memory_usage(),
+            'memory_budget_bytes': self.collections.memory_budget
+        }
+    
+    def open_job_queue(self, db_path: str = 'rag_jobs.db', max_depth: int = 1000) -> JobQueue:
+        """Attach the durable ingestion queue used by enqueue and the workers"""
+        self.jobs = JobQueue(db_path, max_depth, self.metrics)
+        return self.jobs
+    
+    def ingest_workers(self, workers: int = 1, batch_size: int = 8) -> IngestWorkers:
+        return IngestWorkers(self.jobs, self.process_documents, workers, batch_size,
+                             metrics=self.metrics)
+    
+    def sync(self, app_db_path: str = DEFAULT_APP_DB, page_size: int = 200,
+             full: bool = False) -> Dict:
+        """Process documents changed in the app database since the last sync"""
+        if self.mock_mode:
+            return {'success': False, 'error': 'Sync is unavailable in mock mode'}
+        
+        with self.lock:
+            syncer = PrismaSync(self.rag, app_db_path, page_size)
+            try:
+                if full:
+                    syncer.reset()
+                result = syncer.run()
+            finally:
+                syncer.close()
+        
+        result['success'] = True
+        return result
+    
+    def start_model_swap(self, model_path: str) -> Dict:
+        """Load a model and re-embed the corpus in the background, then cut over
+        
+        Searches and ingestion keep using the current model and index until
+        the shadow index is complete.
+        """
+        if self.mock_mode:
+            return {'success': False, 'error': 'Model swap is unavailable in mock mode'}
+        if self.model_swap['state'] == 'building':
+            return {'success': False, 'error': 'A model swap is already in progress'}
         
-        return alerts
+        self.model_swap = {'state': 'building', 'model_path': model_path, 'started_at': time.time()}
+        thread = threading.Thread(target=self._run_model_swap, args=(model_path,),
+                                  name='model-swap', daemon=True)
+        thread.start()
+        return {'success': True, **self.model_swap}
+    
+    def _run_model_swap(self, model_path: str):
+        try:
+            with self.metrics.timer('model_swap_build'):
+                model = self.rag.load_model(model_path)
+                shadow = self.rag.build_shadow(model, model_path)
+            with self.lock, self.metrics.timer('model_swap_cutover'):
+                result = self.rag.swap_model(shadow)
+        except Exception as e:
+            logging.error(f"Model swap failed: {e}")
+            self.model_swap.update(state='failed', error=str(e), finished_at=time.time())
+        else:
+            self.model_swap.update(state='swapped', finished_at=time.time(), **result)
+    
+    def _get_document_alerts(self, documents: List) -> List[Dict]:
+        """Alerts the configured search rules raise for result documents"""
+        return self.rag.alert_rules.search.evaluate_documents(documents)
     
     def _mock_search(self, query: str, filters: Optional[Dict], top_k: int) -> Dict:
         """Mock search results for development"""
@@ -205,38 +566,469 @@ class BankingRiskAPI:
             }
         }
 
+# Files at least this large are decoded straight from a memory map
+MMAP_THRESHOLD = 1024 * 1024
+
+def read_content(source: str, chunk_size: int = 1024 * 1024) -> str:
+    """Document text from a file path, or from stdin when source is '-'
+    
+    Avoids argv size limits and process-listing exposure of --content, and
+    decodes once from the file mapping or a single growing buffer instead of
+    holding several full copies.
+    """
+    if source == '-':
+        buffer = bytearray()
+        while True:
+            chunk = sys.stdin.buffer.read(chunk_size)
+            if not chunk:
+                break
+            buffer += chunk
+        return buffer.decode('utf-8', errors='replace')
+    
+    with open(source, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            return f.read().decode('utf-8', errors='replace')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return str(mapped, 'utf-8', errors='replace')
+
+def read_batches(source: str, batch_size: int):
+    """Yield lists of (doc_id, title, content) from JSON lines
+    
+    Each line has doc_id and title plus either content or content_file;
+    missing fields come through as None for the caller to report.
+    """
+    stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        batch = []
+        for line in stream:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            content = record.get('content')
+            if content is None and record.get('content_file'):
+                content = read_content(record['content_file'])
+            batch.append((record.get('doc_id'), record.get('title'), content))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def read_queries(source: str) -> List[Dict]:
+    """Query records from JSON lines, each with a query and an optional id"""
+    stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        return [json.loads(line) for line in stream if line.strip()]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def search_batch(api: BankingRiskAPI, source: str, filters: Optional[Dict] = None,
+                 top_k: int = 10, batch_size: int = 64, out=None,
+                 fields: Optional[Tuple[str, ...]] = None, fmt: str = 'compact'):
+    """Run every query in a JSON-lines file and write one response per query
+    
+    Responses are compact JSON lines (or consecutive MessagePack objects),
+    written and flushed as each query finishes, in input order.
+    """
+    out = out or sys.stdout.buffer
+    records = read_queries(source)
+    responses = api.search_many([record.get('query') or '' for record in records],
+                                filters, top_k, batch_size, fields)
+    for record, response in zip(records, responses):
+        if 'id' in record:
+            response = {'id': record['id'], **response}
+        if not record.get('query'):
+            response['error'] = 'query is required'
+        out.write(encode(response, 'msgpack' if fmt == 'msgpack' else 'compact'))
+        out.flush()
+
+def ingest(api: BankingRiskAPI, source: str, batch_size: int = 16,
+           collection: Optional[str] = None) -> Dict:
+    """Process a JSON-lines file (or stdin) in batches"""
+    processed, failed, errors = 0, 0, []
+    for batch in read_batches(source, batch_size):
+        valid = [document for document in batch if all(document)]
+        for document in batch:
+            if not all(document):
+                failed += 1
+                errors.append({'doc_id': document[0], 'error': 'doc_id, title and content or content_file are required'})
+        if not valid:
+            continue
+        for document, result in zip(valid, api.process_documents(valid, collection)):
+            if result['success']:
+                processed += 1
+            else:
+                failed += 1
+                errors.append({'doc_id': document[0], 'error': result['error']})
+    return {'success': failed == 0, 'processed': processed, 'failed': failed, 'errors': errors[:20]}
+
+def enqueue_document(jobs: JobQueue, doc_id: str, title: str, content: str) -> Dict:
+    """Queue a document for background processing and return its job id"""
+    try:
+        job = jobs.enqueue(doc_id, title, content)
+    except QueueFullError as e:
+        return {'success': False, 'error': str(e), 'queue_full': True}
+    job['success'] = True
+    return job
+
+def job_status(jobs: JobQueue, job_id: str) -> Dict:
+    """Status of an ingestion job, with its result once processed"""
+    job = jobs.status(job_id)
+    if job is None:
+        return {'success': False, 'error': f'Unknown job {job_id}'}
+    job['success'] = True
+    return job
+
+def run_profiled(label: str, profile_dir: str, top_n: int, call) -> Dict:
+    """Run an API call under the CPU/allocation profiler and attach the report"""
+    rag_module = sys.modules[BankingRiskRAG.__module__]
+    with CallProfiler(label, profile_dir, top_n, focus_files=[rag_module.__file__]) as profiler:
+        result = call()
+    result['profile'] = profiler.report
+    return result
+
+class RAGRequestHandler(BaseHTTPRequestHandler):
+    """JSON over HTTP for a long-running RAG process"""
+    
+    api: BankingRiskAPI = None
+    metrics_file: Optional[str] = None
+    profile_dir: str = '.'
+    profile_sample_rate: float = 0.0
+    
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json({'status': 'ok', 'mock_mode': self.api.mock_mode})
+        elif self.path == '/metrics':
+            body = self.api.metrics.render_prometheus().encode('utf-8')
+            self._send(200, body, 'text/plain; version=0.0.4')
+        elif self.path.startswith('/jobs/') and self.api.jobs is not None:
+            result = job_status(self.api.jobs, self.path[len('/jobs/'):])
+            self._send_json(result, 200 if result['success'] else 404)
+        elif self.path == '/model':
+            self._send_json({'success': True, **self.api.model_swap})
+        elif self.path == '/collections':
+            self._send_json(self.api.list_collections())
+        else:
+            self._send_json({'error': 'Not found'}, 404)
+    
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json({'error': 'Invalid JSON body', 'success': False}, 400)
+            return
+        
+        # Profile on request, or a random sample of requests
+        profile = bool(payload.get('profile')) or random.random() < self.profile_sample_rate
+        
+        try:
+            fields = payload.get('fields')
+            fields = parse_fields(','.join(fields) if isinstance(fields, list) else fields)
+        except (TypeError, ValueError) as e:
+            self._send_json({'error': str(e), 'success': False}, 400)
+            return
+        
+        if self.path == '/search':
+            if not payload.get('query') and not payload.get('cursor'):
+                self._send_json({'error': 'query or cursor is required', 'success': False}, 400)
+                return
+            call = partial(self.api.search, payload.get('query'), payload.get('filters') or {},
+                           int(payload.get('top_k', 10)), include_timings=bool(payload.get('timings')),
+                           collections=payload.get('collections'),
+                           deadline_ms=payload.get('deadline_ms'), cursor=payload.get('cursor'),
+                           fields=fields)
+        elif self.path == '/similar':
+            if not payload.get('doc_id'):
+                self._send_json({'error': 'doc_id is required', 'success': False}, 400)
+                return
+            call = partial(self.api.similar, payload['doc_id'], payload.get('filters') or {},
+                           int(payload.get('top_k', 10)), payload.get('collection'), fields)
+        elif self.path == '/process':
+            if not all(payload.get(key) for key in ('doc_id', 'title', 'content')):
+                self._send_json({'error': 'doc_id, title and content are required', 'success': False}, 400)
+                return
+            call = partial(self.api.process_document, payload['doc_id'], payload['title'],
+                           payload['content'], payload.get('collection'))
+        elif self.path == '/model':
+            if not payload.get('model_path'):
+                self._send_json({'error': 'model_path is required', 'success': False}, 400)
+                return
+            result = self.api.start_model_swap(payload['model_path'])
+            self._send_json(result, 202 if result['success'] else 409)
+            return
+        elif self.path == '/jobs' and self.api.jobs is not None:
+            if not all(payload.get(key) for key in ('doc_id', 'title', 'content')):
+                self._send_json({'error': 'doc_id, title and content are required', 'success': False}, 400)
+                return
+            result = enqueue_document(self.api.jobs, payload['doc_id'], payload['title'], payload['content'])
+            # 429 tells callers to back off while the queue is at max depth
+            self._send_json(result, 202 if result['success'] else 429)
+            return
+        else:
+            self._send_json({'error': 'Not found'}, 404)
+            return
+        
+        result = run_profiled(self.path.strip('/'), self.profile_dir, 15, call) if profile else call()
+        
+        self._send_json(result)
+        if self.metrics_file:
+            self.api.metrics.write_prometheus(self.metrics_file)
+    
+    def _send_json(self, data: Dict, status: int = 200):
+        self._send(status, json.dumps(data).encode('utf-8'), 'application/json')
+    
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        logging.info(format % args)
+
+def serve(api: BankingRiskAPI, host: str, port: int, metrics_file: Optional[str] = None,
+          profile_dir: str = '.', profile_sample_rate: float = 0.0, workers: int = 1):
+    """Serve search, processing, ingestion jobs and /metrics over HTTP until interrupted"""
+    ingest = None
+    if api.jobs is not None and workers > 0:
+        ingest = api.ingest_workers(workers)
+        ingest.start()
+    
+    RAGRequestHandler.api = api
+    RAGRequestHandler.metrics_file = metrics_file
+    RAGRequestHandler.profile_dir = profile_dir
+    RAGRequestHandler.profile_sample_rate = profile_sample_rate
+    server = HTTPServer((host, port), RAGRequestHandler)
+    print(f"Banking Risk RAG server listening on http://{host}:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if ingest is not None:
+            ingest.stop()
+
 def main():
     """Main entry point for command-line usage"""
     parser = argparse.ArgumentParser(description='Banking Risk RAG API')
-    parser.add_argument('command', choices=['search', 'process'], help='Command to execute')
+    parser.add_argument('command',
+                        choices=['search', 'search-batch', 'similar', 'process', 'ingest', 'serve', 'sync',
+                                 'enqueue', 'job-status', 'work', 'collections', 'compact',
+                                 'reevaluate-alerts', 'rescore', 'export', 'import', 'partitions'],
+                        help='Command to execute')
     parser.add_argument('--query', type=str, help='Search query')
     parser.add_argument('--filters', type=str, default='{}', help='Search filters as JSON')
-    parser.add_argument('--doc-id', type=str, help='Document ID for processing')
+    parser.add_argument('--doc-id', type=str, help='Document ID for processing or similar')
     parser.add_argument('--title', type=str, help='Document title')
     parser.add_argument('--content', type=str, help='Document content')
+    parser.add_argument('--content-file', type=str,
+                        help="Read document content from this file ('-' for stdin) instead of --content")
+    parser.add_argument('--input', type=str, default='-',
+                        help="JSON-lines documents for ingest, or queries for search-batch ('-' for stdin)")
+    parser.add_argument('--batch-size', type=int, default=16,
+                        help='Documents per ingest batch, or queries per search-batch forward pass')
+    parser.add_argument('--top-k', type=int, default=10, help='Results per query')
     parser.add_argument('--model-path', type=str, help='Path to trained model')
+    parser.add_argument('--keyword-backend', choices=['memory', 'fts5'], default='memory',
+                        help='Keyword index: in-memory BM25 or persistent SQLite FTS5')
+    parser.add_argument('--content-codec', choices=['zlib', 'zstd'], default='zlib',
+                        help='Compression for stored document content (zstd needs the zstandard package)')
+    parser.add_argument('--deadline-ms', type=float,
+                        help='Search time budget; optional stages are skipped to meet it. It '
+                             'counts from --request-started-ms, or else from process start')
+    parser.add_argument('--request-started-ms', type=float,
+                        help='Epoch milliseconds when the caller received the request')
+    parser.add_argument('--search-threads', type=int, default=3,
+                        help='Threads for concurrent retrieval branches within a query (1 = sequential)')
+    parser.add_argument('--intra-op-threads', type=int,
+                        help='Cap Torch/FAISS threads per operation for the whole process, e.g. half '
+                             'the cores with concurrent search branches (default: library defaults)')
+    parser.add_argument('--query-layers', type=int,
+                        help='Encoder layers run for queries (default: all); fewer is faster but less exact')
+    parser.add_argument('--query-exit-threshold', type=float,
+                        help='Stop query encoding once consecutive layers agree to this cosine similarity')
+    parser.add_argument('--cursor-pages', type=int, default=5,
+                        help='Result pages ranked and cached per search in serve mode')
+    parser.add_argument('--cursor-ttl', type=float, default=300.0,
+                        help='Seconds a search cursor stays valid in serve mode')
+    parser.add_argument('--alert-rules', type=str,
+                        help='JSON file of alert rules (default: the built-in rules)')
+    parser.add_argument('--format', choices=FORMATS, default='json',
+                        help='Output encoding: indented json, compact json, jsonl (streamed per result) or msgpack')
+    parser.add_argument('--fields', type=str,
+                        help='Comma-separated result fields to return (from '
+                             f"{', '.join(DOCUMENT_FIELDS + RESULT_FIELDS)}; default all)")
+    parser.add_argument('--timings', action='store_true', help='Include per-stage timings in search results')
+    parser.add_argument('--metrics-file', type=str, help='Write Prometheus metrics to this file')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host for serve mode')
+    parser.add_argument('--port', type=int, default=8765, help='Port for serve mode')
+    parser.add_argument('--collection', type=str,
+                        help='Collection to process into, or comma-separated collections to search')
+    parser.add_argument('--collections-dir', type=str, default='rag_collections',
+                        help='Directory holding one database per collection')
+    parser.add_argument('--memory-budget-mb', type=float, default=1024.0,
+                        help='Memory for loaded collections before least recently used ones are evicted')
+    parser.add_argument('--app-db', type=str, default=DEFAULT_APP_DB,
+                        help='App SQLite database to sync documents from')
+    parser.add_argument('--page-size', type=int, default=200, help='Documents per sync or rescore page')
+    parser.add_argument('--full', action='store_true',
+                        help='Start sync or rescore from the first document, ignoring saved progress, '
+                             'or refreeze every cold partition')
+    parser.add_argument('--snapshot', type=str,
+                        help='Snapshot directory for export and import (serve imports it before listening)')
+    parser.add_argument('--snapshot-format', choices=SNAPSHOT_FORMATS, default='arrow',
+                        help='Snapshot files: arrow (memory-mapped on import) or parquet (smaller, for analytics)')
+    parser.add_argument('--no-verify', action='store_true',
+                        help='Skip snapshot checksum verification on import')
+    parser.add_argument('--partition-window', choices=WINDOWS,
+                        help='Partition documents by creation date into windows of this size; older '
+                             'windows are frozen to disk and searched only when a date range reaches them')
+    parser.add_argument('--hot-partitions', type=int, default=2,
+                        help='Most recent windows kept in the in-memory indexes')
+    parser.add_argument('--jobs-db', type=str, default='rag_jobs.db', help='Ingestion job queue database')
+    parser.add_argument('--max-queue-depth', type=int, default=1000,
+                        help='Pending ingestion jobs before enqueue is refused')
+    parser.add_argument('--workers', type=int,
+                        help='Ingestion worker threads in serve mode (default 1), or rescore '
+                             'processes (default: one per core)')
+    parser.add_argument('--job-id', type=str, help='Ingestion job ID for job-status')
+    parser.add_argument('--profile', action='store_true',
+                        help='Capture a CPU profile and allocation top-N for this command')
+    parser.add_argument('--profile-dir', type=str, default='.', help='Where to write .pstats files')
+    parser.add_argument('--profile-top', type=int, default=15, help='Entries per profile summary')
+    parser.add_argument('--profile-sample-rate', type=float, default=0.0,
+                        help='Fraction of server requests to profile in serve mode')
     
     args = parser.parse_args()
     
-    # Initialize API
-    api = BankingRiskAPI(args.model_path)
+    # Queue operations return immediately, without loading the model
+    jobs = None
+    if args.command in ('enqueue', 'job-status'):
+        api = None
+        jobs = JobQueue(args.jobs_db, args.max_queue_depth)
+    else:
+        # Initialize API
+        api = BankingRiskAPI(args.model_path, args.keyword_backend,
+                             args.collections_dir, args.memory_budget_mb, args.content_codec,
+                             args.search_threads, args.intra_op_threads,
+                             # Cursors only outlive the call in a long-running server
+                             args.cursor_pages if args.command == 'serve' else 1, args.cursor_ttl,
+                             args.alert_rules, args.query_layers, args.query_exit_threshold,
+                             args.partition_window, args.hot_partitions)
+        # Only the workers and the server touch the queue
+        if args.command in ('work', 'serve'):
+            jobs = api.open_job_queue(args.jobs_db, args.max_queue_depth)
     
     try:
-        if args.command == 'search':
+        fields = parse_fields(args.fields)
+        if args.content_file:
+            args.content = read_content(args.content_file)
+        
+        if args.command == 'enqueue':
+            if not all([args.doc_id, args.title, args.content]):
+                raise ValueError("--doc-id, --title, and --content or --content-file are required for enqueue command")
+            
+            call = partial(enqueue_document, jobs, args.doc_id, args.title, args.content)
+        
+        elif args.command == 'job-status':
+            if not args.job_id:
+                raise ValueError("--job-id is required for job-status command")
+            
+            call = partial(job_status, jobs, args.job_id)
+        
+        elif args.command == 'search':
             if not args.query:
                 raise ValueError("--query is required for search command")
             
             filters = json.loads(args.filters)
-            result = api.search(args.query, filters)
+            collections = args.collection.split(',') if args.collection else None
+            call = partial(api.search, args.query, filters, args.top_k, include_timings=args.timings,
+                           collections=collections, deadline_ms=args.deadline_ms, fields=fields,
+                           started_at=(args.request_started_ms / 1000.0 if args.request_started_ms
+                                       else PROCESS_STARTED))
+            
+        elif args.command == 'similar':
+            if not args.doc_id:
+                raise ValueError("--doc-id is required for similar command")
+            
+            call = partial(api.similar, args.doc_id, json.loads(args.filters), args.top_k, args.collection,
+                           fields)
+            
+        elif args.command == 'search-batch':
+            # One response per query, streamed as compact JSON lines (or msgpack)
+            search_batch(api, args.input, json.loads(args.filters), args.top_k, args.batch_size,
+                         fields=fields, fmt=args.format)
+            if args.metrics_file:
+                api.metrics.write_prometheus(args.metrics_file)
+            return
             
         elif args.command == 'process':
             if not all([args.doc_id, args.title, args.content]):
-                raise ValueError("--doc-id, --title, and --content are required for process command")
+                raise ValueError("--doc-id, --title, and --content or --content-file are required for process command")
+            
+            call = partial(api.process_document, args.doc_id, args.title, args.content, args.collection)
+        
+        elif args.command == 'ingest':
+            call = partial(ingest, api, args.input, args.batch_size, args.collection)
+        
+        elif args.command == 'collections':
+            call = api.list_collections
+        
+        elif args.command == 'compact':
+            call = api.compact
+        
+        elif args.command == 'reevaluate-alerts':
+            call = partial(api.reevaluate_alerts, args.collection)
+        
+        elif args.command == 'rescore':
+            call = partial(api.rescore, args.collection, args.page_size, args.workers, args.full)
+        
+        elif args.command in ('export', 'import'):
+            if not args.snapshot:
+                raise ValueError(f"--snapshot is required for {args.command} command")
             
-            result = api.process_document(args.doc_id, args.title, args.content)
+            if args.command == 'export':
+                call = partial(api.export_snapshot, args.snapshot, args.collection, args.snapshot_format)
+            else:
+                call = partial(api.import_snapshot, args.snapshot, args.collection, not args.no_verify)
         
-        # Output result as JSON to stdout
-        print(json.dumps(result, indent=2))
+        elif args.command == 'partitions':
+            call = partial(api.partitions, args.collection, args.full)
+        
+        elif args.command == 'work':
+            # Drain the queue once, e.g. from cron when no server is running
+            workers = api.ingest_workers()
+            call = lambda: {'success': True, 'processed': workers.drain()}
+        
+        elif args.command == 'sync':
+            call = partial(api.sync, args.app_db, args.page_size, args.full)
+        
+        elif args.command == 'serve':
+            if args.snapshot:
+                loaded = api.import_snapshot(args.snapshot, args.collection, not args.no_verify)
+                if not loaded['success']:
+                    raise ValueError(loaded['error'])
+                logging.info(f"Imported {loaded['indexed']} documents from snapshot {args.snapshot}")
+            serve(api, args.host, args.port, args.metrics_file,
+                  args.profile_dir, args.profile_sample_rate, args.workers or 1)
+            return
+        
+        if args.profile:
+            result = run_profiled(args.command, args.profile_dir, args.profile_top, call)
+        else:
+            result = call()
+        
+        if args.metrics_file and api is not None:
+            api.metrics.write_prometheus(args.metrics_file)
+        
+        write(result, sys.stdout.buffer, args.format)
         
     except Exception as e:
         logging.error(f"Command failed: {e}")
@@ -244,7 +1036,10 @@ def main():
             'error': str(e),
             'success': False
         }
-        print(json.dumps(error_response, indent=2))
+        try:
+            write(error_response, sys.stdout.buffer, args.format)
+        except ImportError:
+            write(error_response, sys.stdout.buffer, 'json')
         sys.exit(1)
 
 if __name__ == '__main__':
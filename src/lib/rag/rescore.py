@@ -0,0 +1,161 @@
+"""
+Corpus re-scoring for the Banking Risk RAG system
+Streams stored documents out of SQLite in keyset-paginated chunks and
+recomputes risk features and scores on a process pool, leaving embeddings
+and indexes untouched. Progress is saved with each written chunk, so an
+interrupted run resumes where it stopped, and each chunk is applied to the
+in-memory documents as it is committed.
+"""
+
+import os
+import time
+import pickle
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from banking_risk_model import BankingRiskRAG, BankingRiskVocabulary
+from content_codec import decompress
+
+_vocab = None  # per worker process
+
+
+def score_chunk(rows: List[Tuple]) -> List[Tuple[str, Optional[bytes]]]:
+    """(id, pickled scores) per row, with None where the scores are unchanged
+
+    Runs in pool workers; each process builds the vocabulary once.
+    """
+    global _vocab
+    if _vocab is None:
+        _vocab = BankingRiskVocabulary()
+
+    scored = []
+    for doc_id, content, compressed, old_scores in rows:
+        text = decompress(compressed) if compressed else content
+        scores = BankingRiskRAG._calculate_risk_scores(text, _vocab.extract_risk_features(text))
+        unchanged = old_scores is not None and pickle.loads(old_scores) == scores
+        scored.append((doc_id, None if unchanged else pickle.dumps(scores)))
+    return scored
+
+
+class Rescorer:
+    """Recompute risk scores for every stored document of a BankingRiskRAG
+
+    lock, if given, is held for each chunk read and write but not while
+    scoring, so other users of the instance run between chunks.
+    """
+
+    def __init__(self, rag, chunk_size: int = 500, workers: Optional[int] = None,
+                 job: str = 'risk_scores', lock=None):
+        self.rag = rag
+        self.chunk_size = chunk_size
+        # One worker scores in this process, without a pool
+        self.workers = workers or os.cpu_count() or 1
+        self.job = job
+        self.lock = lock or nullcontext()
+
+        self.rag.conn.execute('''
+            CREATE TABLE IF NOT EXISTS rescore_state (
+                job TEXT PRIMARY KEY,
+                last_id TEXT,
+                rescored INTEGER,
+                changed INTEGER,
+                started_at TIMESTAMP,
+                updated_at TIMESTAMP
+            )
+        ''')
+        self.rag.conn.commit()
+
+    def state(self) -> Optional[Dict]:
+        """Progress of an unfinished run, or None"""
+        row = self.rag.conn.execute(
+            'SELECT last_id, rescored, changed, started_at FROM rescore_state WHERE job = ?',
+            (self.job,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'last_id': row[0], 'rescored': row[1], 'changed': row[2], 'started_at': row[3]}
+
+    def reset(self):
+        """Discard an unfinished run so the next one starts from the first document"""
+        self.rag.conn.execute('DELETE FROM rescore_state WHERE job = ?', (self.job,))
+        self.rag.conn.commit()
+
+    def run(self) -> Dict:
+        """Rescore from the saved position (or the start) to the end of the corpus"""
+        state = self.state() or {
+            'last_id': '', 'rescored': 0, 'changed': 0, 'started_at': datetime.now()
+        }
+        resumed_from = state['last_id'] or None
+        remaining = self.rag.conn.execute(
+            'SELECT COUNT(*) FROM documents WHERE id > ?', (state['last_id'],)
+        ).fetchone()[0]
+        total = state['rescored'] + remaining
+        started = time.perf_counter()
+
+        pool = ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        try:
+            # Chunks are written in order, keeping at most two per worker in flight
+            pending = deque()
+            max_pending = 2 * self.workers
+            last_read = state['last_id']
+            while True:
+                while len(pending) < max_pending:
+                    with self.lock:
+                        rows = self._read_chunk(last_read)
+                    if not rows:
+                        break
+                    last_read = rows[-1][0]
+                    pending.append(pool.submit(score_chunk, rows) if pool else rows)
+                if not pending:
+                    break
+
+                head = pending.popleft()
+                scored = head.result() if pool else score_chunk(head)
+                with self.lock:
+                    self._write_chunk(scored, state)
+                logging.info(
+                    f"Rescored {state['rescored']}/{total} documents "
+                    f"({state['rescored'] / max(time.perf_counter() - started, 1e-9):.0f}/s)"
+                )
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        # Finished: the next run starts over against the then-current scoring
+        self.reset()
+        return {
+            'rescored': state['rescored'],
+            'changed': state['changed'],
+            'resumed_from': resumed_from
+        }
+
+    def _read_chunk(self, last_id: str) -> List[Tuple]:
+        return self.rag.conn.execute('''
+            SELECT id, content, content_compressed, risk_scores FROM documents
+            WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, self.chunk_size)).fetchall()
+
+    def _write_chunk(self, scored: List[Tuple[str, Optional[bytes]]], state: Dict):
+        """Changed scores and the new position, in one transaction, then in memory"""
+        changed = [(scores, doc_id) for doc_id, scores in scored if scores is not None]
+        state['last_id'] = scored[-1][0]
+        state['rescored'] += len(scored)
+        state['changed'] += len(changed)
+        try:
+            self.rag.conn.executemany('UPDATE documents SET risk_scores = ? WHERE id = ?', changed)
+            self.rag.conn.execute('''
+                INSERT OR REPLACE INTO rescore_state
+                (job, last_id, rescored, changed, started_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (self.job, state['last_id'], state['rescored'], state['changed'],
+                  state['started_at'], datetime.now()))
+        except Exception:
+            self.rag.conn.rollback()
+            raise
+        self.rag.conn.commit()
+        if changed:
+            self.rag.refresh_risk_scores({doc_id: pickle.loads(scores) for scores, doc_id in changed})
@@ -0,0 +1,79 @@
+"""
+Response encodings for the Banking Risk RAG command line
+Indented JSON for people, compact JSON (orjson when installed) or MessagePack
+for programs, and JSON lines that stream a response one result at a time.
+"""
+
+import json
+from typing import Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack
+    msgpack = None
+
+FORMATS = ('json', 'compact', 'jsonl', 'msgpack')
+
+# Fields a result can be projected to; the first group lives under 'document'
+DOCUMENT_FIELDS = ('id', 'title', 'content', 'risk_level', 'compliance_tags', 'risk_scores')
+RESULT_FIELDS = ('score', 'risk_relevance', 'collection')
+
+
+def parse_fields(spec: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Fields from a comma-separated list, or None for all of them"""
+    if not spec:
+        return None
+    fields = tuple(field.strip() for field in spec.split(',') if field.strip())
+    unknown = [field for field in fields if field not in DOCUMENT_FIELDS + RESULT_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown result fields: {', '.join(unknown)} "
+            f"(choose from {', '.join(DOCUMENT_FIELDS + RESULT_FIELDS)})"
+        )
+    return fields
+
+
+def encode(data: Dict, fmt: str = 'json') -> bytes:
+    """One complete document in the given format"""
+    if fmt == 'json':
+        return json.dumps(data, indent=2).encode('utf-8') + b'\n'
+    if fmt == 'compact':
+        return _compact(data) + b'\n'
+    if fmt == 'msgpack':
+        if msgpack is None:
+            raise ImportError("The msgpack output format requires the msgpack package")
+        return msgpack.packb(data, use_bin_type=True)
+    raise ValueError(f"Unknown output format: {fmt}")
+
+
+def write(data: Dict, out, fmt: str = 'json'):
+    """Write data to a binary stream
+
+    jsonl writes everything but the results on the first line, then one
+    line per result, flushing as it goes; the other formats write once.
+    """
+    if fmt != 'jsonl':
+        out.write(encode(data, fmt))
+        out.flush()
+        return
+
+    results = data.get('results')
+    header = {key: value for key, value in data.items() if key != 'results'}
+    if isinstance(results, list):
+        header['count'] = len(results)
+    out.write(_compact(header) + b'\n')
+    for result in results or ():
+        out.write(_compact(result) + b'\n')
+        out.flush()
+    out.flush()
+
+
+def _compact(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
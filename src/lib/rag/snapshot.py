@@ -0,0 +1,400 @@
+"""
+Columnar snapshots of a Banking Risk RAG corpus
+Documents (metadata, scores, tags, compressed content and embeddings), stored
+alerts and per-document token counts are written as Arrow IPC files (or
+Parquet for offline analytics) with a versioned, checksummed manifest. Import
+memory-maps the files and bulk-loads the database and indexes from them,
+with no inference and, for the in-memory keyword index, no tokenization.
+"""
+
+import os
+import json
+import pickle
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: pip install pyarrow
+    pa = None
+    pq = None
+
+from banking_risk_model import BankingRiskRAG, RiskDocument, RiskLevel, ComplianceFramework
+from keyword_index import InvertedBM25Index
+
+# Bumped whenever a file or column changes meaning; import refuses newer versions
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FORMATS = ('arrow', 'parquet')
+MANIFEST = 'manifest.json'
+TABLES = ('documents', 'alerts', 'terms', 'postings')
+
+
+def _schemas(dimension: int) -> Dict:
+    return {
+        'documents': pa.schema([
+            ('id', pa.string()),
+            ('title', pa.string()),
+            ('content', pa.string()),  # only rows stored before content compression
+            ('content_compressed', pa.binary()),
+            ('preview', pa.string()),
+            ('risk_level', pa.string()),
+            ('compliance_tags', pa.list_(pa.string())),
+            ('risk_scores', pa.map_(pa.string(), pa.float64())),
+            ('created_at', pa.string()),
+            ('content_hash', pa.string()),
+            ('minhash', pa.binary()),
+            ('embedding', pa.list_(pa.float32(), dimension))
+        ]),
+        'alerts': pa.schema([
+            ('document_id', pa.string()),
+            ('alert_type', pa.string()),
+            ('severity', pa.string()),
+            ('description', pa.string()),
+            ('created_at', pa.string())
+        ]),
+        # Token counts as a star schema: doc_row is a row of documents, term_id a row of terms
+        'terms': pa.schema([('term', pa.string())]),
+        'postings': pa.schema([
+            ('doc_row', pa.int32()),
+            ('term_id', pa.int32()),
+            ('tf', pa.int32())
+        ])
+    }
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Snapshots require the pyarrow package")
+
+
+class _TableWriter:
+    """Record batches to one Arrow IPC or Parquet file"""
+
+    def __init__(self, path: str, schema, fmt: str):
+        self.path = path
+        self.rows = 0
+        if fmt == 'arrow':
+            # Uncompressed so import can read it straight from the memory map
+            self._writer = pa.ipc.new_file(path, schema)
+        else:
+            self._writer = pq.ParquetWriter(path, schema, compression='zstd')
+        self.schema = schema
+
+    def write(self, columns: Dict[str, list]):
+        batch = pa.record_batch([pa.array(columns[f.name], f.type) for f in self.schema],
+                                schema=self.schema)
+        self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self):
+        self._writer.close()
+
+
+def export_snapshot(rag: BankingRiskRAG, path: str, fmt: str = 'arrow',
+                    page_size: int = 1000) -> Dict:
+    """Write the corpus in rag's database to a new snapshot directory
+
+    Reads through its own connection inside one transaction, so the snapshot
+    is consistent while ingestion continues. The manifest is written last;
+    a directory without one is an incomplete export.
+    """
+    _require_pyarrow()
+    if fmt not in SNAPSHOT_FORMATS:
+        raise ValueError(f"Unknown snapshot format: {fmt}")
+    if os.path.isdir(path) and os.listdir(path):
+        raise ValueError(f"Snapshot directory is not empty: {path}")
+    os.makedirs(path, exist_ok=True)
+
+    extension = 'arrow' if fmt == 'arrow' else 'parquet'
+    schemas = _schemas(rag.dimension)
+    writers = {
+        table: _TableWriter(os.path.join(path, f'{table}.{extension}'), schemas[table], fmt)
+        for table in TABLES
+    }
+    term_ids: Dict[str, int] = {}
+
+    conn = sqlite3.connect(rag.db_path)
+    try:
+        conn.execute('BEGIN')
+        last_id = ''
+        while True:
+            rows = conn.execute('''
+                SELECT id, title, content, content_compressed, preview, risk_level, compliance_tags,
+                       risk_scores, created_at, content_hash, minhash, embedding
+                FROM documents WHERE id > ? ORDER BY id LIMIT ?
+            ''', (last_id, page_size)).fetchall()
+            if not rows:
+                break
+            _write_documents(rag, writers, rows, term_ids)
+            last_id = rows[-1][0]
+
+        cursor = conn.execute('''
+            SELECT document_id, alert_type, severity, description, created_at
+            FROM risk_alerts ORDER BY id
+        ''')
+        while True:
+            rows = cursor.fetchmany(page_size)
+            if not rows:
+                break
+            writers['alerts'].write({
+                field.name: [row[i] for row in rows] for i, field in enumerate(schemas['alerts'])
+            })
+
+        writers['terms'].write({'term': list(term_ids)})
+    finally:
+        conn.close()
+        for writer in writers.values():
+            writer.close()
+
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'format': fmt,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'dimension': rag.dimension,
+        'model_path': rag.model_path,
+        'tokenizer': 'simple',
+        'files': {
+            table: {
+                'file': os.path.basename(writer.path),
+                'rows': writer.rows,
+                'bytes': os.path.getsize(writer.path),
+                'sha256': _sha256(writer.path)
+            }
+            for table, writer in writers.items()
+        }
+    }
+    with open(os.path.join(path, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    return {
+        'path': path,
+        'format': fmt,
+        'documents': writers['documents'].rows,
+        'alerts': writers['alerts'].rows,
+        'terms': writers['terms'].rows,
+        'bytes': sum(entry['bytes'] for entry in manifest['files'].values())
+    }
+
+
+def _write_documents(rag: BankingRiskRAG, writers: Dict, rows: List, term_ids: Dict[str, int]):
+    """One page of document rows, and their token counts"""
+    postings = writers['postings']
+    doc_rows, doc_terms, doc_tfs = [], [], []
+    for offset, row in enumerate(rows):
+        content = rag._row_content(row[2], row[3])
+        counts: Dict[str, int] = {}
+        for token in rag._simple_tokenize(content):
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            doc_rows.append(writers['documents'].rows + offset)
+            doc_terms.append(term_ids.setdefault(term, len(term_ids)))
+            doc_tfs.append(tf)
+
+    writers['documents'].write({
+        'id': [row[0] for row in rows],
+        'title': [row[1] for row in rows],
+        'content': [row[2] for row in rows],
+        'content_compressed': [row[3] for row in rows],
+        'preview': [row[4] for row in rows],
+        'risk_level': [row[5] for row in rows],
+        'compliance_tags': [[ct for ct in (row[6] or '').split(',') if ct] for row in rows],
+        'risk_scores': [list(pickle.loads(row[7]).items()) if row[7] else None for row in rows],
+        'created_at': [str(row[8]) if row[8] is not None else None for row in rows],
+        'content_hash': [row[9] for row in rows],
+        'minhash': [row[10] for row in rows],
+        'embedding': [np.frombuffer(row[11], dtype=np.float32) if row[11] else None for row in rows]
+    })
+    postings.write({'doc_row': doc_rows, 'term_id': doc_terms, 'tf': doc_tfs})
+
+
+def read_manifest(path: str, verify: bool = True) -> Dict:
+    """A snapshot's manifest, after checking its version and (optionally) checksums"""
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"Not a complete snapshot (no {MANIFEST}): {path}")
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get('version', 0) > SNAPSHOT_VERSION:
+        raise ValueError(
+            f"Snapshot version {manifest.get('version')} is newer than supported ({SNAPSHOT_VERSION})"
+        )
+    if verify:
+        for table, entry in manifest['files'].items():
+            if _sha256(os.path.join(path, entry['file'])) != entry['sha256']:
+                raise ValueError(f"Checksum mismatch for {entry['file']} in snapshot {path}")
+    return manifest
+
+
+def import_snapshot(rag: BankingRiskRAG, path: str, verify: bool = True) -> Dict:
+    """Load a snapshot into rag's database and indexes without inference
+
+    Rows replace stored documents with the same id, along with their alerts,
+    in one transaction; vectors added for them are dropped again if it
+    fails. An empty in-memory keyword index is built straight from the
+    snapshot's token counts. With time partitioning, the indexes are instead
+    refrozen and reloaded from the database afterwards.
+    """
+    _require_pyarrow()
+    manifest = read_manifest(path, verify)
+    if manifest['dimension'] != rag.dimension:
+        raise ValueError(
+            f"Snapshot embeddings have dimension {manifest['dimension']}, index expects {rag.dimension}"
+        )
+    fmt = manifest['format']
+    files = {table: os.path.join(path, entry['file']) for table, entry in manifest['files'].items()}
+
+    doc_ids: List[str] = []
+    indexed: List[int] = []  # snapshot rows that went into the indexes
+    alerts = 0
+    partitioned = rag.partitions is not None
+    use_postings = isinstance(rag.keyword_index, InvertedBM25Index) and not partitioned
+    vector_start = len(rag.document_store)
+    previous: Dict[str, Optional[int]] = {}  # positions of imported ids before the import
+    try:
+        for batch in _read_batches(files['documents'], fmt):
+            added = _import_documents(rag, batch, use_postings, previous, index=not partitioned)
+            indexed.extend(len(doc_ids) + row for row in added)
+            doc_ids.extend(batch.column('id').to_pylist())
+
+        for batch in _read_batches(files['alerts'], fmt):
+            rows = list(zip(*(batch.column(name).to_pylist() for name in batch.schema.names)))
+            rag.conn.executemany('''
+                INSERT INTO risk_alerts (document_id, alert_type, severity, description, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            alerts += len(rows)
+        rag.conn.commit()
+    except Exception:
+        rag.conn.rollback()
+        rag._truncate_vector_index(vector_start, previous)
+        raise
+
+    indexed_count = len(indexed)
+    if use_postings:
+        _import_postings(rag.keyword_index, files, fmt, doc_ids, indexed)
+    if partitioned:
+        # Only the hot windows are indexed in memory
+        indexed_count = rag.freeze_partitions(rebuild=True)['hot_reloaded']
+
+    return {
+        'path': path,
+        'version': manifest['version'],
+        'documents': len(doc_ids),
+        'indexed': indexed_count,
+        'alerts': alerts
+    }
+
+
+def _import_documents(rag: BankingRiskRAG, batch, use_postings: bool,
+                      previous: Dict[str, Optional[int]], index: bool = True) -> List[int]:
+    """Store one batch of document rows; returns the batch rows added to the indexes
+
+    The indexed ids' earlier vector positions are recorded in previous.
+    """
+    columns = {name: batch.column(name) for name in batch.schema.names}
+    ids = columns['id'].to_pylist()
+    titles = columns['title'].to_pylist()
+    contents = columns['content'].to_pylist()
+    compressed = columns['content_compressed'].to_pylist()
+    risk_levels = columns['risk_level'].to_pylist()
+    tags = columns['compliance_tags'].to_pylist()
+    scores = [dict(pairs) if pairs is not None else None for pairs in columns['risk_scores'].to_pylist()]
+
+    # Fixed-size list values are one float32 buffer, null rows included: a
+    # (rows, dimension) view of the mapped file that FAISS copies from directly
+    embedding_column = columns['embedding']
+    has_embedding = np.asarray(embedding_column.is_valid())
+    embeddings = embedding_column.values.to_numpy(zero_copy_only=False).reshape(-1, rag.dimension)
+
+    rows = [row for row in range(len(ids)) if has_embedding[row]] if index else []
+    docs = [
+        RiskDocument(
+            id=ids[row],
+            title=titles[row],
+            content=rag._row_content(contents[row], compressed[row]),
+            risk_level=RiskLevel(risk_levels[row]),
+            compliance_tags=[ComplianceFramework(ct) for ct in tags[row]],
+            risk_scores=scores[row] or {},
+            embedding=embeddings[row]
+        )
+        for row in rows
+    ]
+    for doc in docs:
+        previous.setdefault(doc.id, rag.doc_positions.get(doc.id))
+    positions = rag._add_many_to_vector_index(docs, embeddings[rows]) if docs else []
+    embedding_ids = dict(zip(rows, positions))
+
+    if not use_postings:
+        # Before the rows are replaced, since FTS5 deletes read their stored
+        # text; FTS5 writes join the transaction below
+        for doc in docs:
+            rag.keyword_index.add(doc.id, doc.title, doc.content)
+        if index:
+            # Records without an embedding are not searchable
+            for row in set(range(len(ids))).difference(rows):
+                rag.keyword_index.remove(ids[row])
+
+    rag.conn.executemany(
+        "DELETE FROM risk_alerts WHERE document_id = ?", [(doc_id,) for doc_id in ids]
+    )
+    rag.conn.executemany('''
+        INSERT OR REPLACE INTO documents
+        (id, title, content, content_compressed, preview, risk_level, compliance_tags, risk_scores,
+         created_at, content_hash, minhash, embedding, embedding_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?, ?, ?)
+    ''', [
+        (ids[row], titles[row], contents[row], compressed[row], preview, risk_levels[row],
+         ','.join(tags[row]), pickle.dumps(scores[row]) if scores[row] is not None else None,
+         created_at, content_hash, minhash,
+         embeddings[row].tobytes() if has_embedding[row] else None, embedding_ids.get(row))
+        for row, (preview, created_at, content_hash, minhash) in enumerate(zip(
+            columns['preview'].to_pylist(), columns['created_at'].to_pylist(),
+            columns['content_hash'].to_pylist(), columns['minhash'].to_pylist()
+        ))
+    ])
+
+    rag.lsh = None  # rebuilt from the stored signatures on next use
+    return rows
+
+
+def _import_postings(index: InvertedBM25Index, files: Dict[str, str], fmt: str,
+                     doc_ids: List[str], indexed: List[int]):
+    """Index the token counts of the imported rows that went into the vector index"""
+    terms = [term for batch in _read_batches(files['terms'], fmt)
+             for term in batch.column('term').to_pylist()]
+    batches = list(_read_batches(files['postings'], fmt))
+    doc_rows, term_ids, tfs = (
+        np.concatenate([batch.column(name).to_numpy() for batch in batches] + [np.empty(0, np.int32)])
+        for name in ('doc_row', 'term_id', 'tf')
+    )
+
+    # Keep only indexed rows, renumbered densely in their snapshot order
+    renumber = np.full(len(doc_ids), -1, dtype=np.int64)
+    renumber[indexed] = np.arange(len(indexed))
+    keep = renumber[doc_rows] >= 0
+    index.add_postings([doc_ids[row] for row in indexed], terms,
+                       renumber[doc_rows[keep]], term_ids[keep], tfs[keep])
+
+
+def _read_batches(path: str, fmt: str) -> Iterator:
+    """Record batches of a snapshot file, memory-mapped rather than read into memory"""
+    if fmt == 'arrow':
+        reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+    else:
+        yield from pq.ParquetFile(path, memory_map=True).iter_batches()
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
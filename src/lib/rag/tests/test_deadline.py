@@ -0,0 +1,56 @@
+"""
+Search deadlines in a fresh process and on the degraded path
+"""
+
+import os
+import sys
+import time
+from dataclasses import replace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_risk_model import BankingRiskRAG, RiskLevel
+from deadline import Deadline, STAGE_ESTIMATES
+from metrics import MetricsRegistry
+
+DOCUMENTS = [
+    (f"doc-{i}", f"Risk review {i}", f"credit default exposure {'fraud breach ' * i}liquidity {i}")
+    for i in range(8)
+]
+
+
+def test_unobserved_stages_use_estimates():
+    metrics = MetricsRegistry()
+    deadline = Deadline(STAGE_ESTIMATES['embedding'] * 1000 / 2, metrics)
+    assert not deadline.allows('embedding')
+
+    metrics.observe('embedding', 0.0)
+    assert deadline.allows('embedding')
+
+
+def test_time_before_the_deadline_was_built_is_charged():
+    deadline = Deadline(1000, MetricsRegistry(), started=time.time() - 2)
+    assert deadline.remaining() < 0
+    assert not deadline.allows('fusion')
+
+
+def test_semantic_only_results_honour_filters(tmp_path, monkeypatch):
+    rag = BankingRiskRAG(db_path=str(tmp_path / 'docs.db'), search_threads=1)
+    try:
+        rag.process_documents(DOCUMENTS)
+        # Pin risk levels so only the last semantic hit matches the filter
+        levels = {doc_id: RiskLevel.LOW for doc_id, _, _ in DOCUMENTS}
+        levels['doc-7'] = RiskLevel.HIGH
+        get_document = rag._get_document
+        monkeypatch.setattr(rag, '_get_document', lambda doc_id, **kwargs: replace(
+            get_document(doc_id, **kwargs), risk_level=levels[doc_id]))
+        semantic = [(doc_id, float(i)) for i, (doc_id, _, _) in enumerate(DOCUMENTS)]
+
+        deadline = Deadline(0.001, rag.metrics)
+        monkeypatch.setattr(rag, '_semantic_branch', lambda *args: semantic)
+        results = rag.search("credit default exposure", {'risk_level': 'HIGH'}, top_k=3,
+                             deadline=deadline)
+        assert 'fusion' in deadline.skipped
+        assert results[0]['document'].id == 'doc-7'
+    finally:
+        rag.close()
@@ -0,0 +1,70 @@
+"""
+Near-duplicate reuse of model outputs across successive edits
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_risk_model import BankingRiskRAG
+
+THRESHOLD = 0.8
+
+
+def edits(rng: random.Random, words, count: int):
+    """Successive versions of a text, each changing one more word"""
+    words = list(words)
+    for _ in range(count):
+        words[rng.randrange(len(words))] = f"edit{rng.randrange(10 ** 6)}"
+        yield ' '.join(words)
+
+
+def stored_reused_from(rag: BankingRiskRAG, doc_id: str):
+    return rag.conn.execute("SELECT reused_from FROM documents WHERE id = ?", (doc_id,)).fetchone()[0]
+
+
+def test_edits_reuse_only_encoded_documents(tmp_path):
+    rng = random.Random(5)
+    words = [f"w{rng.randrange(500)}" for _ in range(120)]
+    original = ' '.join(words)
+
+    rag = BankingRiskRAG(db_path=str(tmp_path / 'docs.db'), near_duplicate_threshold=THRESHOLD,
+                         search_threads=1)
+    try:
+        encoded = rag.process_document("policy", "Policy", original)
+        assert encoded.reused_from is None
+        source_signature = rag.minhasher.signature(rag._simple_tokenize(original))
+
+        # Edits of the encoded document never reuse its own previous version
+        for content in edits(random.Random(1), words, 3):
+            assert rag.process_document("policy", "Policy", content).reused_from is None
+        rag.process_document("policy", "Policy", original)
+
+        # A copy drifts away from the encoded original one edit at a time: it
+        # reuses the original while close enough, then is encoded itself
+        reencoded = False
+        for content in edits(random.Random(2), words, 40):
+            doc = rag.process_document("copy", "Copy", content)
+            similarity = rag.minhasher.similarity(
+                rag.minhasher.signature(rag._simple_tokenize(content)), source_signature)
+            if reencoded:
+                # Encoded versions are never reused by their own later edits
+                assert doc.reused_from in (None, "policy")
+            elif similarity >= THRESHOLD:
+                assert doc.reused_from == "policy"
+                assert stored_reused_from(rag, "copy") == "policy"
+            else:
+                assert doc.reused_from is None
+                assert stored_reused_from(rag, "copy") is None
+                reencoded = True
+        assert reencoded
+
+        # A reused document is never a source for another
+        rag.process_document("copy", "Copy", next(edits(random.Random(3), words, 1)))
+        assert stored_reused_from(rag, "copy") == "policy"
+        third = rag.process_document("third", "Third", next(edits(random.Random(4), words, 1)))
+        assert third.reused_from == "policy"
+    finally:
+        rag.close()
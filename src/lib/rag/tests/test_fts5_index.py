@@ -0,0 +1,103 @@
+"""
+Contentless FTS5KeywordIndex: updates, removals and migration of stored tables
+"""
+
+import os
+import random
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_index import FTS5KeywordIndex
+
+VOCABULARY = [f"term{i}" for i in range(30)]
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def fresh_index(documents):
+    index = FTS5KeywordIndex(sqlite3.connect(':memory:'), str.split)
+    for doc_id, (title, content) in documents.items():
+        index.add(doc_id, title, content)
+    return index
+
+
+def assert_same_results(index, documents):
+    expected = fresh_index(documents)
+    for term in VOCABULARY[:10]:
+        query = [term, VOCABULARY[-1]]
+        assert index.top_k(query, 5) == pytest.approx(expected.top_k(query, 5))
+        assert index.idf(term) == pytest.approx(expected.idf(term))
+
+
+def assert_no_stored_text(conn, table='documents_fts'):
+    tables = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert f"{table}_content" not in tables
+    assert conn.execute(f"SELECT title, content FROM {table} LIMIT 1").fetchone() == (None, None)
+
+
+@pytest.mark.parametrize('with_source', [True, False])
+def test_updates_and_removals_match_rebuilt_index(with_source):
+    rng = random.Random(5)
+    documents = {f"doc-{i}": (random_text(rng, 3), random_text(rng, 20)) for i in range(20)}
+    conn = sqlite3.connect(':memory:')
+    source = documents.get if with_source else None
+    index = FTS5KeywordIndex(conn, str.split, source=source)
+    for doc_id, (title, content) in documents.items():
+        index.add(doc_id, title, content)
+
+    # The source still holds the indexed text when the index is updated
+    for doc_id in ['doc-1', 'doc-4', 'doc-9']:
+        text = (random_text(rng, 3), random_text(rng, 25))
+        index.add(doc_id, *text)
+        documents[doc_id] = text
+    for doc_id in ['doc-2', 'doc-4']:
+        index.remove(doc_id)
+        del documents[doc_id]
+
+    assert len(index) == len(documents)
+    assert 'doc-4' not in index
+    assert index.doc_terms('doc-9') == {
+        term: documents['doc-9'][1].split().count(term) for term in set(documents['doc-9'][1].split())
+    }
+    assert_same_results(index, documents)
+    assert_no_stored_text(conn)
+
+
+def test_stored_table_is_migrated(tmp_path):
+    rng = random.Random(9)
+    documents = {f"doc-{i}": (random_text(rng, 3), random_text(rng, 20)) for i in range(10)}
+    path = str(tmp_path / 'index.db')
+
+    # The table as created before the index went contentless
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE VIRTUAL TABLE documents_fts USING fts5(title, content, tokenize = 'unicode61')")
+    conn.execute("CREATE TABLE documents_fts_ids (fts_rowid INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE)")
+    conn.execute("CREATE VIRTUAL TABLE documents_fts_instances USING fts5vocab(documents_fts, instance)")
+    for doc_id, (title, content) in documents.items():
+        rowid = conn.execute("INSERT INTO documents_fts_ids (doc_id) VALUES (?)", (doc_id,)).lastrowid
+        conn.execute("INSERT INTO documents_fts (rowid, title, content) VALUES (?, ?, ?)",
+                     (rowid, title, content))
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(path)
+    index = FTS5KeywordIndex(conn, str.split, source=documents.get)
+    conn.commit()
+    assert len(index) == len(documents)
+    assert_same_results(index, documents)
+    assert_no_stored_text(conn)
+
+    # Migrated rows can be replaced, and reopening does not migrate again
+    index.add('doc-3', 'replaced title', random_text(rng, 10))
+    conn.commit()
+    conn.close()
+    conn = sqlite3.connect(path)
+    index = FTS5KeywordIndex(conn, str.split)
+    assert len(index) == len(documents)
+    assert index.top_k(['replaced'], 3)[0][0] == 'doc-3'
@@ -0,0 +1,26 @@
+"""
+Retry limits for ingestion jobs abandoned by dying workers
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_queue import JobQueue
+
+
+def test_jobs_fail_after_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), max_attempts=2)
+    job_id = queue.enqueue('doc-1', 'Policy', 'credit default exposure')['job_id']
+
+    # Each claim is abandoned by a crashed worker and requeued
+    for attempt in range(2):
+        assert [job['id'] for job in queue.claim()] == [job_id]
+        assert queue.requeue_stale(stale_after=-1) == 1
+
+    assert queue.claim() == []
+    job = queue.status(job_id)
+    assert job['status'] == 'failed'
+    assert job['attempts'] == 2
+    assert 'after 2 attempts' in job['error']
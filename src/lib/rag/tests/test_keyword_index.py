@@ -0,0 +1,105 @@
+"""
+Score parity between InvertedBM25Index and rank_bm25.BM25Okapi
+"""
+
+import os
+import random
+import sys
+
+import pytest
+# A development requirement: parity must fail loudly, not skip, without it
+from rank_bm25 import BM25Okapi
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_index import InvertedBM25Index
+
+
+def random_corpus(rng: random.Random):
+    """Small corpora over a small vocabulary, so many IDFs are negative"""
+    vocabulary = [f"t{i}" for i in range(rng.randint(2, 12))]
+    return [
+        [rng.choice(vocabulary) for _ in range(rng.randint(1, 12))]
+        for _ in range(rng.randint(1, 10))
+    ], vocabulary
+
+
+def build(corpus):
+    index = InvertedBM25Index(str.split)
+    for row, tokens in enumerate(corpus):
+        index.add_tokens(f"d{row}", tokens)
+    return index
+
+
+def expected_top_k(corpus, query, k):
+    """Positive BM25Okapi scores by document, and the k-th best of them"""
+    scores = BM25Okapi(corpus).get_scores(query)
+    positive = {f"d{row}": score for row, score in enumerate(scores) if score > 0}
+    ranked = sorted(positive.values(), reverse=True)
+    return positive, ranked[:k]
+
+
+def assert_matches(results, positive, top_scores):
+    # Ties at the boundary may pick different documents, so compare scores
+    assert [score for _, score in results] == pytest.approx(top_scores)
+    for doc_id, score in results:
+        assert score == pytest.approx(positive[doc_id])
+
+
+@pytest.mark.parametrize('prune', [True, False])
+def test_top_k_matches_bm25okapi(prune):
+    rng = random.Random(7)
+    for _ in range(500):
+        corpus, vocabulary = random_corpus(rng)
+        index = build(corpus)
+        query = [rng.choice(vocabulary) for _ in range(rng.randint(1, 4))]
+        k = rng.randint(1, 5)
+
+        positive, top_scores = expected_top_k(corpus, query, k)
+        assert_matches(index.top_k(query, k, prune=prune), positive, top_scores)
+
+
+def test_top_k_many_matches_bm25okapi():
+    rng = random.Random(11)
+    for _ in range(200):
+        corpus, vocabulary = random_corpus(rng)
+        index = build(corpus)
+        queries = [[rng.choice(vocabulary) for _ in range(rng.randint(1, 4))] for _ in range(3)]
+        k = rng.randint(1, 5)
+
+        for query, results in zip(queries, index.top_k_many(queries, k)):
+            positive, top_scores = expected_top_k(corpus, query, k)
+            assert_matches(results, positive, top_scores)
+
+
+def test_negative_average_idf_lowers_scores():
+    # "a" is in every document, so its IDF is floored at epsilon times a
+    # negative average IDF and pulls every score down
+    corpus = [["a", "b"], ["a", "b", "c"], ["a", "c"], ["a", "b", "d"]]
+    index = build(corpus)
+    assert index.idf("a") < 0
+
+    query = ["a", "d"]
+    positive, top_scores = expected_top_k(corpus, query, 2)
+    for prune in (True, False):
+        assert_matches(index.top_k(query, 2, prune=prune), positive, top_scores)
+    assert_matches(index.top_k_many([query], 2)[0], positive, top_scores)
+
+
+def test_replaced_and_removed_documents_match_rebuilt_corpus():
+    rng = random.Random(3)
+    corpus, vocabulary = random_corpus(rng)
+    corpus = corpus + [[rng.choice(vocabulary) for _ in range(5)] for _ in range(4)]
+    index = build(corpus)
+
+    # Replace one document and remove another; scores follow the live corpus
+    corpus[0] = [rng.choice(vocabulary) for _ in range(6)]
+    index.add_tokens("d0", corpus[0])
+    index.remove("d1")
+    live = {f"d{row}": tokens for row, tokens in enumerate(corpus) if row != 1}
+
+    query = vocabulary[:3]
+    scores = BM25Okapi(list(live.values())).get_scores(query)
+    positive = {doc_id: score for doc_id, score in zip(live, scores) if score > 0}
+    top_scores = sorted(positive.values(), reverse=True)[:3]
+    assert_matches(index.top_k(query, 3), positive, top_scores)
@@ -0,0 +1,65 @@
+"""
+HTTP behaviour of the rag_api server
+"""
+
+import json
+import os
+import sys
+import threading
+import urllib.request
+from http.server import HTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag_api import BankingRiskAPI, RAGRequestHandler
+
+DOCUMENTS = [
+    (f"doc-{i}", f"Credit policy {i}", f"credit default exposure liquidity funding review {i} " * 5)
+    for i in range(6)
+]
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    # The default instance keeps its database in the working directory
+    monkeypatch.chdir(tmp_path)
+    api = BankingRiskAPI(collections_dir=str(tmp_path / 'collections'), search_threads=1,
+                         cursor_pages=5)
+    assert not api.mock_mode
+    api.process_documents(DOCUMENTS)
+
+    RAGRequestHandler.api = api
+    httpd = HTTPServer(('127.0.0.1', 0), RAGRequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    api.rag.close()
+
+
+def post(url: str, payload: dict) -> dict:
+    request = urllib.request.Request(url, json.dumps(payload).encode('utf-8'),
+                                     {'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def test_second_page_by_cursor_only(server):
+    first = post(f"{server}/search", {'query': 'credit default', 'top_k': 2})
+    assert len(first['results']) == 2
+    assert first['next_cursor']
+
+    second = post(f"{server}/search", {'cursor': first['next_cursor'], 'top_k': 2})
+    assert 'error' not in second
+    assert len(second['results']) == 2
+    first_ids = {r['document']['id'] for r in first['results']}
+    assert first_ids.isdisjoint(r['document']['id'] for r in second['results'])
+
+
+def test_search_without_query_or_cursor_is_rejected(server):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(f"{server}/search", {'top_k': 2})
+    assert error.value.code == 400
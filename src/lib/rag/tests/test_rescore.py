@@ -0,0 +1,61 @@
+"""
+Rescoring commits page by page and keeps in-memory documents current
+"""
+
+import os
+import pickle
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag_api import BankingRiskAPI
+
+DOCUMENTS = [
+    (f"doc-{i}", f"Exposure {i}", f"counterparty default and credit exposure note {i}")
+    for i in range(5)
+]
+
+
+class CountingLock:
+    """RLock that counts how often it is taken"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.acquired = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.acquired += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+def test_rescore_refreshes_memory_and_releases_the_lock(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    api = BankingRiskAPI(collections_dir=str(tmp_path / 'collections'), search_threads=1)
+    rag = api.rag
+    try:
+        api.process_documents(DOCUMENTS)
+        expected = {doc.id: dict(doc.risk_scores) for doc in rag.document_store.values()}
+
+        # Stale scores, as left by an older scoring version
+        rag.conn.executemany("UPDATE documents SET risk_scores = ? WHERE id = ?",
+                             [(pickle.dumps({}), doc_id) for doc_id, _, _ in DOCUMENTS])
+        rag.conn.commit()
+        for doc in rag.document_store.values():
+            doc.risk_scores = {}
+        generation = rag.generation
+
+        api.lock = CountingLock()
+        result = api.rescore(page_size=2, workers=1)
+        assert result['success'] and result['changed'] == len(DOCUMENTS)
+
+        # Taken per page read and write rather than once for the whole run
+        assert api.lock.acquired >= 2 * 3
+        assert rag.generation != generation
+        assert {doc.id: doc.risk_scores for doc in rag.document_store.values()} == expected
+    finally:
+        rag.close()
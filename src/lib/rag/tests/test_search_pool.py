@@ -0,0 +1,32 @@
+"""
+Search branch threading under the profiler and across collections
+"""
+
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiling import CallProfiler
+from rag_api import BankingRiskAPI
+
+
+def test_branches_run_inline_while_profiling(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    api = BankingRiskAPI(collections_dir=str(tmp_path / 'collections'), search_threads=3)
+    rag = api.rag
+    try:
+        assert rag.search_pool is not None
+        threads = threading.current_thread
+        assert rag._run_branches(threads, threads)[0] is not threading.current_thread()
+        with CallProfiler('search', str(tmp_path)):
+            assert rag._run_branches(threads, threads) == [threading.current_thread()] * 2
+
+        # Collections reuse the default instance's pool and leave it open on close
+        collection = api.collections.get('policies', create=True)
+        assert collection.search_pool is rag.search_pool
+        api.collections.evict('policies')
+        assert rag._run_branches(threads)[0] is not threading.current_thread()
+    finally:
+        rag.close()
@@ -0,0 +1,53 @@
+"""
+Snapshot imports leave the vector index alone when their transaction fails
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('pyarrow')
+
+import snapshot
+from banking_risk_model import BankingRiskRAG
+
+DOCUMENTS = [
+    (f"doc-{i}", f"Review {i}", f"liquidity funding and counterparty default exposure {i}")
+    for i in range(4)
+]
+
+
+def test_failed_import_rolls_back_vectors(tmp_path, monkeypatch):
+    source = BankingRiskRAG(db_path=str(tmp_path / 'source.db'), search_threads=1)
+    target = BankingRiskRAG(db_path=str(tmp_path / 'target.db'), search_threads=1)
+    try:
+        source.process_documents(DOCUMENTS)
+        snapshot.export_snapshot(source, str(tmp_path / 'snapshot'))
+        target.process_documents(DOCUMENTS[:1])
+        positions = dict(target.doc_positions)
+        vectors = target.index.ntotal
+
+        # Fail after the document rows, while reading the alerts
+        read_batches = snapshot._read_batches
+
+        def failing(path, fmt):
+            if 'alerts' in os.path.basename(path):
+                raise OSError("unreadable alerts file")
+            return read_batches(path, fmt)
+
+        monkeypatch.setattr(snapshot, '_read_batches', failing)
+        with pytest.raises(OSError):
+            snapshot.import_snapshot(target, str(tmp_path / 'snapshot'))
+
+        assert target.index.ntotal == vectors
+        assert target.doc_positions == positions
+        assert len(target.document_store) == vectors
+        assert target.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 1
+        assert [doc_id for doc_id, _ in target._semantic_search(
+            target._get_query_embedding("liquidity funding"), 5)] == ["doc-0"]
+    finally:
+        source.close()
+        target.close()
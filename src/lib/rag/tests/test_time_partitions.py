@@ -0,0 +1,78 @@
+"""
+Cold partitions scored with whole-corpus BM25 statistics, and created_at on updates
+"""
+
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from banking_risk_model import BankingRiskRAG
+from keyword_index import InvertedBM25Index
+from time_partitions import TimePartitions
+
+
+def counts(tokens):
+    result = {}
+    for token in tokens:
+        result[token] = result.get(token, 0) + 1
+    return result
+
+
+def test_hot_and_cold_scores_match_one_corpus(tmp_path):
+    rng = random.Random(9)
+    vocabulary = [f"t{i}" for i in range(15)]
+    corpus = [[rng.choice(vocabulary) for _ in range(rng.randint(3, 15))] for _ in range(40)]
+    ids = [f"d{row}" for row in range(len(corpus))]
+
+    # The older half is frozen, the newer half stays in the hot index
+    partitions = TimePartitions(str(tmp_path / 'partitions'), 'quarter')
+    partitions.freeze('2020-Q1', ids[:20], ['2020-01-15'] * 20, np.zeros((20, 4), dtype=np.float32),
+                      [counts(tokens) for tokens in corpus[:20]])
+    hot = InvertedBM25Index(str.split)
+    for doc_id, tokens in zip(ids[20:], corpus[20:]):
+        hot.add_tokens(doc_id, tokens)
+    hot.set_background(*partitions.background())
+
+    query = vocabulary[:4]
+    expected = dict(zip(ids, BM25Okapi(corpus).get_scores(query)))
+    hits = hot.top_k(query, 40) + partitions.top_k_many([query], 40, None, hot.idf,
+                                                         hot.average_length())[0]
+    assert len(hits) == sum(1 for score in expected.values() if score > 0)
+    for doc_id, score in hits:
+        assert score == pytest.approx(expected[doc_id])
+
+
+def test_reprocessed_document_keeps_its_window(tmp_path):
+    db_path = str(tmp_path / 'docs.db')
+    documents = [("policy", "Policy", "credit default exposure review")]
+    documents += [(f"note-{i}", "Note", f"liquidity funding plan {i}") for i in range(5)]
+    rag = BankingRiskRAG(db_path=db_path, search_threads=1, partition_window='quarter')
+    try:
+        rag.process_documents(documents)
+        rag.conn.execute("UPDATE documents SET created_at = '2020-02-01 09:00:00' WHERE id = 'policy'")
+        rag.conn.commit()
+        assert rag.freeze_partitions()['frozen'] == ['2020-Q1']
+
+        rag.process_document("policy", "Policy", "market volatility limits breached")
+        created_at = rag.conn.execute(
+            "SELECT created_at FROM documents WHERE id = 'policy'"
+        ).fetchone()[0]
+        assert created_at == '2020-02-01 09:00:00'
+    finally:
+        rag.close()
+
+    # The edit refreezes the old window on the next load
+    rag = BankingRiskRAG(db_path=db_path, search_threads=1, partition_window='quarter')
+    try:
+        rag.load_from_database()
+        assert "policy" not in rag.doc_positions
+        assert [doc_id for doc_id, _ in rag._keyword_search("volatility", 5)] == ["policy"]
+        assert rag._keyword_search("default", 5) == []
+    finally:
+        rag.close()
@@ -0,0 +1,399 @@
+"""
+Time-partitioned cold storage for the Banking Risk RAG indexes
+Documents are grouped into month, quarter or year windows by created_at. The
+most recent windows stay in the in-memory (hot) indexes; older windows are
+frozen to disk as 8-bit scalar-quantized embeddings and BM25 postings in .npy
+files, memory-mapped the first time a search's date range overlaps them.
+Rows are sorted by created_at, so a date range inside a window is a slice.
+"""
+
+import os
+import json
+import math
+import shutil
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+WINDOWS = ('month', 'quarter', 'year')
+_WINDOW_MONTHS = {'month': 1, 'quarter': 3, 'year': 12}
+
+# Rows dequantized per distance computation in a cold partition
+SEARCH_CHUNK = 1 << 15
+
+# (start, end) as created_at-comparable strings; end is exclusive, None is open
+DateRange = Tuple[Optional[str], Optional[str]]
+
+
+def window_key(created_at: str, window: str) -> str:
+    """Window holding a created_at timestamp, e.g. 2024-07, 2024-Q3 or 2024"""
+    year, month = int(created_at[:4]), int(created_at[5:7])
+    if window == 'year':
+        return f'{year:04d}'
+    if window == 'quarter':
+        return f'{year:04d}-Q{(month - 1) // 3 + 1}'
+    return f'{year:04d}-{month:02d}'
+
+
+def window_bounds(key: str, window: str) -> Tuple[str, str]:
+    """First day of the window and of the one after it"""
+    year = int(key[:4])
+    if window == 'year':
+        month = 1
+    elif window == 'quarter':
+        month = 3 * (int(key[6:]) - 1) + 1
+    else:
+        month = int(key[5:7])
+    end_year, end_month = divmod(year * 12 + month - 1 + _WINDOW_MONTHS[window], 12)
+    return f'{year:04d}-{month:02d}-01', f'{end_year:04d}-{end_month + 1:02d}-01'
+
+
+def parse_date_range(filters: Optional[Dict]) -> Optional[DateRange]:
+    """date_from/date_to filters (inclusive ISO dates) as a DateRange, or None"""
+    date_from = (filters or {}).get('date_from')
+    date_to = (filters or {}).get('date_to')
+    if not date_from and not date_to:
+        return None
+    start = date.fromisoformat(str(date_from)[:10]).isoformat() if date_from else None
+    end = (date.fromisoformat(str(date_to)[:10]) + timedelta(days=1)).isoformat() if date_to else None
+    return start, end
+
+
+def overlaps(bounds: Tuple[str, str], date_range: Optional[DateRange]) -> bool:
+    if date_range is None:
+        return True
+    start, end = date_range
+    return (end is None or bounds[0] < end) and (start is None or bounds[1] > start)
+
+
+class ColdPartition:
+    """One frozen window: quantized vectors and postings, opened on first search"""
+
+    ARRAYS = ('ids', 'dates', 'codes', 'vmin', 'scale', 'norms',
+              'terms', 'term_starts', 'post_rows', 'post_tfs', 'lengths')
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.key = self.meta['key']
+        self.count = self.meta['count']
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._arrays is not None
+
+    def disk_usage(self) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(self.path))
+
+    @classmethod
+    def write(cls, path: str, key: str, window: str, ids: List[str], dates: List[str],
+              embeddings: np.ndarray, counts: List[Dict[str, int]], updated_at: Optional[str] = None,
+              k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25) -> 'ColdPartition':
+        """Freeze rows (already in created_at order, at least one) into a partition directory
+
+        updated_at is the latest update among the rows, to tell when edits
+        to documents that keep their window need a refreeze.
+        """
+        os.makedirs(path)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        # Per-dimension min/max scalar quantization to one byte
+        vmin = embeddings.min(axis=0)
+        scale = (embeddings.max(axis=0) - vmin) / 255
+        scale[scale == 0] = 1
+        codes = np.clip(np.rint((embeddings - vmin) / scale), 0, 255).astype(np.uint8)
+        norms = ((vmin + codes * scale) ** 2).sum(axis=1).astype(np.float32)
+
+        # Postings grouped by term, in row order within each term
+        terms = sorted({term for doc_counts in counts for term in doc_counts})
+        term_index = {term: i for i, term in enumerate(terms)}
+        rows, term_ids, tfs = [], [], []
+        for row, doc_counts in enumerate(counts):
+            for term, tf in doc_counts.items():
+                rows.append(row)
+                term_ids.append(term_index[term])
+                tfs.append(tf)
+        rows = np.array(rows, dtype=np.int32)
+        term_ids = np.array(term_ids, dtype=np.int64)
+        order = np.lexsort((rows, term_ids))
+        term_starts = np.searchsorted(term_ids[order], np.arange(len(terms) + 1))
+        lengths = np.array([sum(doc_counts.values()) for doc_counts in counts], dtype=np.int32)
+
+        doc_freq = np.diff(term_starts).astype(np.float64)
+        idf = np.log(len(ids) - doc_freq + 0.5) - np.log(doc_freq + 0.5)
+        arrays = {
+            'ids': np.array(ids, dtype=str),
+            'dates': np.array(dates, dtype=str),
+            'codes': codes,
+            'vmin': vmin.astype(np.float32),
+            'scale': scale.astype(np.float32),
+            'norms': norms,
+            'terms': np.array(terms, dtype=str),
+            'term_starts': term_starts.astype(np.int64),
+            'post_rows': rows[order],
+            'post_tfs': np.minimum(np.array(tfs, dtype=np.int64)[order], 65535).astype(np.uint16),
+            'lengths': lengths
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), array)
+
+        meta = {
+            'key': key,
+            'window': window,
+            'count': len(ids),
+            'dimension': embeddings.shape[1],
+            'total_length': int(lengths.sum()),
+            'average_idf': float(idf.mean()) if terms else 0.0,
+            'k1': k1,
+            'b': b,
+            'epsilon': epsilon,
+            'updated_at': updated_at,
+            'frozen_at': datetime.now(timezone.utc).isoformat()
+        }
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        return cls(path)
+
+    def open(self) -> Dict[str, np.ndarray]:
+        if self._arrays is None:
+            self._arrays = {
+                name: np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+                for name in self.ARRAYS
+            }
+        return self._arrays
+
+    def close(self):
+        self._arrays = None
+
+    def doc_freq(self) -> Dict[str, int]:
+        """Documents per term, read without opening the partition for search"""
+        terms = np.load(os.path.join(self.path, 'terms.npy'), mmap_mode='r')
+        term_starts = np.load(os.path.join(self.path, 'term_starts.npy'), mmap_mode='r')
+        return dict(zip(terms.tolist(), np.diff(term_starts).tolist()))
+
+    def rows(self, date_range: Optional[DateRange]) -> Tuple[int, int]:
+        """Row slice of the documents inside the date range"""
+        if date_range is None:
+            return 0, self.count
+        dates = self.open()['dates']
+        start, end = date_range
+        lo = int(np.searchsorted(dates, start)) if start else 0
+        hi = int(np.searchsorted(dates, end)) if end else self.count
+        return lo, max(lo, hi)
+
+    def search(self, queries: np.ndarray, k: int,
+               date_range: Optional[DateRange] = None) -> List[List[Tuple[str, float]]]:
+        """Nearest rows by squared L2 distance to the dequantized vectors"""
+        lo, hi = self.rows(date_range)
+        if hi <= lo or k <= 0:
+            return [[] for _ in queries]
+        arrays = self.open()
+        queries = np.asarray(queries, dtype=np.float32)
+
+        # |q - x|^2 = |q|^2 - 2 (q.vmin + (q * scale).codes) + |x|^2
+        query_norms = (queries ** 2).sum(axis=1)[:, None]
+        query_offsets = (queries @ arrays['vmin'])[:, None]
+        scaled = queries * arrays['scale']
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_distances = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(lo, hi, SEARCH_CHUNK):
+            end = min(start + SEARCH_CHUNK, hi)
+            codes = np.asarray(arrays['codes'][start:end], dtype=np.float32)
+            distances = query_norms - 2 * (query_offsets + scaled @ codes.T) + arrays['norms'][start:end]
+            rows = np.broadcast_to(np.arange(start, end), distances.shape)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            best_distances = np.concatenate([best_distances, distances], axis=1)
+            if best_distances.shape[1] > k:
+                keep = np.argpartition(best_distances, k - 1, axis=1)[:, :k]
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_distances = np.take_along_axis(best_distances, keep, axis=1)
+
+        ids = arrays['ids']
+        results = []
+        for rows, distances in zip(best_rows, best_distances):
+            order = np.lexsort((rows, distances))
+            results.append([(str(ids[rows[i]]), float(distances[i])) for i in order])
+        return results
+
+    def top_k(self, query_tokens: List[str], k: int, date_range: Optional[DateRange] = None,
+              idf: Optional[Callable[[str], float]] = None,
+              avgdl: Optional[float] = None) -> List[Tuple[str, float]]:
+        """BM25 top-k over the partition
+
+        idf and avgdl give whole-corpus statistics, so scores are comparable
+        with the hot index and other partitions; without them the partition's
+        own statistics are used.
+        """
+        lo, hi = self.rows(date_range)
+        if hi <= lo or k <= 0 or not self.count:
+            return []
+        arrays = self.open()
+        meta = self.meta
+        k1, b = meta['k1'], meta['b']
+        avgdl = avgdl or meta['total_length'] / self.count
+
+        query_counts: Dict[str, int] = {}
+        for token in query_tokens:
+            query_counts[token] = query_counts.get(token, 0) + 1
+
+        terms = arrays['terms']
+        keys, scores = [], []
+        for term, count in query_counts.items():
+            position = int(np.searchsorted(terms, term))
+            if position >= len(terms) or terms[position] != term:
+                continue
+            start, end = arrays['term_starts'][position:position + 2]
+            if idf is not None:
+                term_idf = idf(term)
+            else:
+                doc_freq = end - start
+                term_idf = math.log(self.count - doc_freq + 0.5) - math.log(doc_freq + 0.5)
+                if term_idf < 0:
+                    term_idf = meta['epsilon'] * meta['average_idf']
+            weight = term_idf * count
+            if weight == 0:
+                continue
+
+            # Rows are sorted within a term, so the date range is a sub-slice
+            postings = arrays['post_rows'][start:end]
+            first = start + int(np.searchsorted(postings, lo))
+            last = start + int(np.searchsorted(postings, hi))
+            rows = np.asarray(arrays['post_rows'][first:last], dtype=np.int64)
+            tfs = np.asarray(arrays['post_tfs'][first:last], dtype=np.float64)
+            norms = k1 * (1 - b + b * arrays['lengths'][rows] / avgdl)
+            keys.append(rows)
+            scores.append(weight * (tfs * (k1 + 1) / (tfs + norms)))
+        if not keys:
+            return []
+
+        rows, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(scores), minlength=len(rows))
+        positive = totals > 0
+        rows, totals = rows[positive], totals[positive]
+        # Highest score first; ties go to the most recent document
+        order = np.lexsort((-rows, -totals))[:k]
+        ids = arrays['ids']
+        return [(str(ids[rows[i]]), float(totals[i])) for i in order]
+
+
+class TimePartitions:
+    """Frozen cold windows under one directory, and which windows are hot"""
+
+    def __init__(self, base_dir: str, window: str = 'quarter', hot_windows: int = 2):
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown partition window: {window}")
+        if hot_windows < 1:
+            raise ValueError("At least one partition window must stay hot")
+        self.base_dir = base_dir
+        self.window = window
+        self.hot_windows = hot_windows
+        self.cold: Dict[str, ColdPartition] = {}
+        self._background = None
+
+        if os.path.isdir(base_dir):
+            for name in sorted(os.listdir(base_dir)):
+                path = os.path.join(base_dir, name)
+                if os.path.exists(os.path.join(path, 'meta.json')) and '.' not in name:
+                    self.cold[name] = ColdPartition(path)
+
+    def hot_keys(self, today: Optional[date] = None) -> List[str]:
+        """The hot windows, newest first"""
+        today = today or datetime.now(timezone.utc).date()
+        months = today.year * 12 + today.month - 1
+        step = _WINDOW_MONTHS[self.window]
+        return [
+            window_key(f'{(months - i * step) // 12:04d}-{(months - i * step) % 12 + 1:02d}', self.window)
+            for i in range(self.hot_windows)
+        ]
+
+    def hot_start(self, today: Optional[date] = None) -> str:
+        """created_at from which documents are hot"""
+        return window_bounds(self.hot_keys(today)[-1], self.window)[0]
+
+    def relevant(self, date_range: Optional[DateRange]) -> List[ColdPartition]:
+        """Cold partitions overlapping the date range, oldest first"""
+        return [
+            partition for key, partition in sorted(self.cold.items())
+            if overlaps(window_bounds(key, self.window), date_range)
+        ]
+
+    def search(self, queries: np.ndarray, k: int,
+               date_range: Optional[DateRange] = None) -> List[List[Tuple[str, float]]]:
+        """Nearest documents per query across the relevant cold partitions"""
+        merged = [[] for _ in queries]
+        for partition in self.relevant(date_range):
+            for hits, partition_hits in zip(merged, partition.search(queries, k, date_range)):
+                hits.extend(partition_hits)
+        return [sorted(hits, key=lambda hit: hit[1])[:k] for hits in merged]
+
+    def top_k_many(self, queries: List[List[str]], k: int, date_range: Optional[DateRange] = None,
+                   idf: Optional[Callable[[str], float]] = None,
+                   avgdl: Optional[float] = None) -> List[List[Tuple[str, float]]]:
+        """BM25 top-k per tokenized query across the relevant cold partitions
+
+        Pass whole-corpus idf and avgdl (see background) to merge the hits
+        with hot ones; partition-local statistics are not comparable.
+        """
+        partitions = self.relevant(date_range)
+        return [
+            sorted((hit for partition in partitions
+                    for hit in partition.top_k(tokens, k, date_range, idf, avgdl)),
+                   key=lambda hit: hit[1], reverse=True)[:k]
+            for tokens in queries
+        ]
+
+    def background(self) -> Tuple[int, int, Dict[str, int]]:
+        """Documents, total length and per-term document counts of all cold partitions"""
+        if self._background is None:
+            num_docs, total_length, doc_freq = 0, 0, {}
+            for partition in self.cold.values():
+                num_docs += partition.count
+                total_length += partition.meta['total_length']
+                for term, freq in partition.doc_freq().items():
+                    doc_freq[term] = doc_freq.get(term, 0) + freq
+            self._background = num_docs, total_length, doc_freq
+        return self._background
+
+    def freeze(self, key: str, ids: List[str], dates: List[str], embeddings: np.ndarray,
+               counts: List[Dict[str, int]], updated_at: Optional[str] = None) -> ColdPartition:
+        """Write (or rewrite) a window's partition, replacing the old files in one rename"""
+        os.makedirs(self.base_dir, exist_ok=True)
+        path = os.path.join(self.base_dir, key)
+        staging, retired = f'{path}.tmp', f'{path}.old'
+        for leftover in (staging, retired):
+            shutil.rmtree(leftover, ignore_errors=True)
+
+        ColdPartition.write(staging, key, self.window, ids, dates, embeddings, counts, updated_at)
+        if os.path.exists(path):
+            # Open memory maps keep reading the retired files until dropped
+            os.rename(path, retired)
+        os.rename(staging, path)
+        shutil.rmtree(retired, ignore_errors=True)
+
+        self.cold[key] = ColdPartition(path)
+        self._background = None
+        return self.cold[key]
+
+    def drop(self, key: str):
+        self._background = None
+        partition = self.cold.pop(key, None)
+        if partition is not None:
+            shutil.rmtree(partition.path, ignore_errors=True)
+
+    def open_count(self) -> int:
+        return sum(1 for partition in self.cold.values() if partition.is_open)
+
+    def describe(self) -> List[Dict]:
+        return [
+            {
+                'window': key,
+                'tier': 'cold',
+                'documents': partition.count,
+                'bytes': partition.disk_usage(),
+                'open': partition.is_open
+            }
+            for key, partition in sorted(self.cold.items())
+        ]